@@ -62,6 +62,12 @@ def api_request(endpoint: str, params: Dict = None) -> Dict:
 
         response = requests.get(url, params=params, timeout=timeout)
         st.write(f"✅ Status Code: {response.status_code}")  # Debug
+
+        # Guardar el desglose de tiempos (Server-Timing) para el panel de debug
+        st.session_state["last_server_timing"] = {
+            "endpoint": endpoint,
+            "timing": response.headers.get("Server-Timing", "")
+        }
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -82,6 +88,22 @@ with st.expander("🔧 Debug Info"):
     except:
         st.write(f"**Secrets available:** No secrets configured")
 
+    # Tiempos de la última petición a la API (cabecera Server-Timing)
+    last_timing = st.session_state.get("last_server_timing")
+    if last_timing and last_timing["timing"]:
+        st.markdown(f"**⏱️ Última petición:** `{last_timing['endpoint']}`")
+        timing_rows = []
+        for entry in last_timing["timing"].split(","):
+            parts = [p.strip() for p in entry.split(";")]
+            metric = {"Métrica": parts[0]}
+            for part in parts[1:]:
+                if part.startswith("dur="):
+                    metric["ms"] = float(part[4:])
+                elif part.startswith("desc="):
+                    metric["Descripción"] = part[5:].strip('"')
+            timing_rows.append(metric)
+        st.dataframe(pd.DataFrame(timing_rows), hide_index=True)
+
     st.markdown("---")
     st.markdown("### ⚠️ Limitaciones de Spotify Development Mode")
     st.info("""
@@ -488,6 +510,17 @@ elif page == "🎤 Comparación de Artistas":
             key="search_artist"
         )
 
+        # Sugerencias desde el índice local (sin llamar a Spotify)
+        if artist_name and len(artist_name.strip()) >= 2:
+            suggestions = api_request(
+                "/api/artists/suggest",
+                params={"q": artist_name, "limit": 5, "fallback": "false"}
+            )
+            if suggestions and suggestions.get("status") == "success":
+                names = [s["name"] for s in suggestions["data"]["suggestions"]]
+                if names:
+                    st.caption(f"💡 Sugerencias: {', '.join(names)}")
+
         col1, col2 = st.columns(2)
 
         with col1:
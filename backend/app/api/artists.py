@@ -1,13 +1,108 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
 from ..core.database import get_db
+from ..core.http_cache import cache_policy, ANALYSIS_MAX_AGE, CATALOG_MAX_AGE, SEARCH_MAX_AGE
+from ..core.metrics import ARTIST_SUGGESTIONS
+from ..core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor
+from ..services.analysis_planner import AnalysisPlan
 from ..services.artist_comparator import ArtistComparator
+from ..services.artist_suggest import get_artist_suggest_index
+from ..services.catalog_browser import list_artist_snapshots, list_artists
+from ..services.similarity_index import get_similarity_index, similarity_index
 
 router = APIRouter(prefix="/api/artists", tags=["Artist Comparison"])
 
+def _similarity_version(path_params, query_params):
+    """Versión del índice de similitud (None si aún no está construido)"""
+    return str(similarity_index.version) if similarity_index.built else None
+
+@router.get("")
+@cache_policy(max_age=CATALOG_MAX_AGE)
+async def list_stored_artists(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Artistas por página"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    genre: Optional[str] = Query(None, description="Solo artistas de este género"),
+    min_popularity: Optional[int] = Query(None, ge=0, le=100, description="Popularidad mínima"),
+    max_popularity: Optional[int] = Query(None, ge=0, le=100, description="Popularidad máxima"),
+    db: Session = Depends(get_db)
+):
+    """
+    📚 Artistas guardados, de más a menos populares
+    
+    - **genre / min_popularity / max_popularity**: Filtros
+    - **cursor**: Paginación por cursor; cada página cuesta lo mismo que la primera
+    - **returns**: Artistas y next_cursor (None en la última página)
+    """
+    try:
+        page = list_artists(
+            db, limit, cursor=cursor, genre=genre,
+            min_popularity=min_popularity, max_popularity=max_popularity
+        )
+        
+        return {
+            "status": "success",
+            "data": {
+                "artists": page["items"],
+                "next_cursor": page["next_cursor"]
+            }
+        }
+        
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error listando artistas: {str(e)}"
+        )
+
+@router.get("/snapshots")
+@cache_policy(max_age=CATALOG_MAX_AGE)
+async def list_stored_artist_snapshots(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Snapshots por página"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    artist_id: Optional[str] = Query(None, description="Solo snapshots de este artista (Spotify ID)"),
+    start_date: Optional[datetime] = Query(None, description="Desde esta fecha (ISO 8601)"),
+    end_date: Optional[datetime] = Query(None, description="Hasta esta fecha (ISO 8601)"),
+    min_popularity: Optional[int] = Query(None, ge=0, le=100, description="Popularidad mínima"),
+    max_popularity: Optional[int] = Query(None, ge=0, le=100, description="Popularidad máxima"),
+    db: Session = Depends(get_db)
+):
+    """
+    🗂️ Snapshots de artistas guardados, del más reciente al más antiguo
+    
+    - **artist_id / start_date / end_date / min_popularity / max_popularity**: Filtros
+    - **cursor**: Paginación por cursor; cada página cuesta lo mismo que la primera
+    - **returns**: Snapshots y next_cursor (None en la última página)
+    """
+    try:
+        page = list_artist_snapshots(
+            db, limit, cursor=cursor, artist_id=artist_id,
+            start_date=start_date, end_date=end_date,
+            min_popularity=min_popularity, max_popularity=max_popularity
+        )
+        
+        return {
+            "status": "success",
+            "data": {
+                "snapshots": page["items"],
+                "next_cursor": page["next_cursor"]
+            }
+        }
+        
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error listando snapshots de artistas: {str(e)}"
+        )
+
 @router.get("/search")
+@cache_policy(max_age=SEARCH_MAX_AGE)
 async def search_artist(
     name: str = Query(..., description="Nombre del artista a buscar"),
     db: Session = Depends(get_db)
@@ -41,7 +136,66 @@ async def search_artist(
             detail=f"Error buscando artista: {str(e)}"
         )
 
+@router.get("/suggest")
+@cache_policy(max_age=CATALOG_MAX_AGE)
+async def suggest_artists(
+    q: str = Query(..., min_length=1, description="Texto escrito por el usuario"),
+    limit: int = Query(10, ge=1, le=50, description="Número máximo de sugerencias"),
+    fallback: bool = Query(True, description="Buscar en Spotify si no hay sugerencias locales"),
+    db: Session = Depends(get_db)
+):
+    """
+    💡 Autocompletado de artistas
+
+    - **q**: Prefijo o parte del nombre (sin importar mayúsculas ni acentos)
+    - **limit**: Número máximo de sugerencias
+    - **fallback**: Si no hay coincidencias locales, una búsqueda en Spotify
+    - **returns**: Artistas ordenados por popularidad (prefijo) y después por parecido (trigramas)
+
+    Se sirve desde el índice en memoria de los artistas guardados; Spotify solo
+    se consulta para nombres desconocidos.
+    """
+    try:
+        # La primera llamada construye el índice: fuera del event loop
+        index = await run_in_threadpool(get_artist_suggest_index, db)
+        suggestions = await run_in_threadpool(index.suggest, q, limit)
+        source = "index"
+
+        if not suggestions and fallback:
+            comparator = ArtistComparator(db)
+            result = await run_in_threadpool(comparator.search_artist, q)
+            if result:
+                # Queda en el índice para las siguientes búsquedas
+                index.upsert(result['id'], result['name'], result['popularity'])
+                suggestions = [{
+                    "id": result['id'],
+                    "name": result['name'],
+                    "popularity": result['popularity'],
+                    "match": "spotify"
+                }]
+                source = "spotify"
+
+        if not suggestions:
+            source = "none"
+        ARTIST_SUGGESTIONS.inc(source=source)
+
+        return {
+            "status": "success",
+            "data": {
+                "query": q,
+                "source": source,
+                "suggestions": suggestions
+            }
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error sugiriendo artistas: {str(e)}"
+        )
+
 @router.get("/analyze/{artist_name}")
+@cache_policy(max_age=ANALYSIS_MAX_AGE)
 async def analyze_artist(
     artist_name: str,
     db: Session = Depends(get_db)
@@ -76,6 +230,7 @@ async def analyze_artist(
         )
 
 @router.get("/compare")
+@cache_policy(max_age=ANALYSIS_MAX_AGE)
 async def compare_artists(
     artists: str = Query(..., description="Nombres de artistas separados por coma"),
     db: Session = Depends(get_db)
@@ -127,6 +282,7 @@ async def compare_artists(
         )
 
 @router.get("/compare/breakbeat")
+@cache_policy(max_age=ANALYSIS_MAX_AGE)
 async def compare_breakbeat_artists(
     db: Session = Depends(get_db)
 ):
@@ -170,6 +326,7 @@ async def compare_breakbeat_artists(
         )
 
 @router.get("/vs")
+@cache_policy(max_age=ANALYSIS_MAX_AGE)
 async def artist_versus(
     artist1: str = Query(..., description="Primer artista"),
     artist2: str = Query(..., description="Segundo artista"),
@@ -228,6 +385,7 @@ async def artist_versus(
         )
 
 @router.get("/underground/comparison")
+@cache_policy(max_age=ANALYSIS_MAX_AGE)
 async def compare_underground_vs_mainstream(
     db: Session = Depends(get_db)
 ):
@@ -242,9 +400,13 @@ async def compare_underground_vs_mainstream(
         
         comparator = ArtistComparator(db)
         
+        # Obtener los datos de todos los artistas en un único plan paralelo
+        plan = AnalysisPlan().add_artists(underground + mainstream)
+        results = await run_in_threadpool(plan.run)
+
         # Comparar grupos
-        underground_result = comparator.compare_artists(underground)
-        mainstream_result = comparator.compare_artists(mainstream)
+        underground_result = comparator.compare_artists(underground, prefetched=results.artists(underground))
+        mainstream_result = comparator.compare_artists(mainstream, prefetched=results.artists(mainstream))
         
         return {
             "status": "success",
@@ -265,4 +427,47 @@ async def compare_underground_vs_mainstream(
         raise HTTPException(
             status_code=500,
             detail=f"Error en comparación underground vs mainstream: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/{artist_id}/similar")
+@cache_policy(max_age=CATALOG_MAX_AGE, validator=_similarity_version)
+async def get_similar_artists(
+    artist_id: str,
+    limit: int = Query(10, ge=1, le=100, description="Número de artistas similares"),
+    db: Session = Depends(get_db)
+):
+    """
+    🧭 Artistas similares
+    
+    - **artist_id**: Spotify ID del artista
+    - **limit**: Número máximo de resultados
+    - **returns**: Artistas más cercanos según energía, bailabilidad, valencia, tempo, popularidad y consistencia
+    
+    Se calcula sobre los snapshots guardados, sin llamar a Spotify.
+    """
+    try:
+        index = get_similarity_index(db)
+        similar = index.query(artist_id, k=limit)
+        
+        if similar is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Artista '{artist_id}' no tiene snapshots guardados"
+            )
+        
+        return {
+            "status": "success",
+            "data": {
+                "artist_id": artist_id,
+                "similar_artists": similar,
+                "indexed_artists": len(index)
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error buscando artistas similares: {str(e)}"
+        )
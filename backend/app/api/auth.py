@@ -0,0 +1,136 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse
+from spotipy.cache_handler import MemoryCacheHandler
+from typing import Optional
+
+from ..core.spotify_auth import build_oauth_manager, get_spotify_client_with_oauth, oauth_quota
+from ..core.spotify_client import InstrumentedSpotify
+from ..core.user_clients import (
+    create_oauth_state, create_session, read_session, user_clients, verify_oauth_state
+)
+
+router = APIRouter(tags=["Auth"])
+
+
+def current_user_id(x_user_session: Optional[str] = Header(None)) -> str:
+    """
+    Usuario de la sesión (cabecera X-User-Session devuelta por /callback)
+    Consulta user_tokens: llamarla desde el threadpool
+    """
+    user_id = read_session(x_user_session) if x_user_session else None
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Sesión de Spotify no válida, inicia sesión en /auth/login")
+    return user_id
+
+
+@router.get("/auth/login")
+async def login(redirect: bool = Query(False, description="Redirigir directamente a Spotify")):
+    """
+    🔐 Inicia el flujo OAuth de Spotify para un usuario
+
+    - **redirect**: Si es True responde con un 307 a Spotify; si no, devuelve la URL
+    - **returns**: URL de autorización (el navegador del usuario vuelve a /callback)
+    """
+    auth_manager = build_oauth_manager(cache_handler=MemoryCacheHandler(), open_browser=False)
+    if auth_manager is None:
+        raise HTTPException(status_code=503, detail="Credenciales de Spotify no configuradas")
+
+    state = await run_in_threadpool(create_oauth_state)
+    authorize_url = auth_manager.get_authorize_url(state=state)
+    if redirect:
+        return RedirectResponse(authorize_url)
+
+    return {
+        "status": "success",
+        "data": {"authorize_url": authorize_url}
+    }
+
+
+def _exchange_code(code: str):
+    auth_manager = build_oauth_manager(cache_handler=MemoryCacheHandler(), open_browser=False)
+    auth_manager.get_access_token(code=code, as_dict=False, check_cache=False)
+    token_info = auth_manager.cache_handler.get_cached_token()
+
+    profile = InstrumentedSpotify(auth=token_info["access_token"], quota_coordinator=oauth_quota()).me()
+    session_nonce = user_clients.save(profile["id"], token_info, display_name=profile.get("display_name"))
+    return profile, session_nonce
+
+
+@router.get("/callback")
+async def callback(
+    code: Optional[str] = None,
+    state: Optional[str] = None,
+    error: Optional[str] = None
+):
+    """
+    🔐 Vuelta del flujo OAuth: guarda el token del usuario y devuelve su sesión
+
+    - **returns**: user_id y session (enviar como cabecera X-User-Session)
+    """
+    if error:
+        raise HTTPException(status_code=400, detail=f"Autorización denegada: {error}")
+    if not code or not state or not await run_in_threadpool(verify_oauth_state, state):
+        raise HTTPException(status_code=400, detail="Parámetros OAuth no válidos o caducados")
+
+    try:
+        profile, session_nonce = await run_in_threadpool(_exchange_code, code)
+
+        return {
+            "status": "success",
+            "data": {
+                "user_id": profile["id"],
+                "display_name": profile.get("display_name"),
+                "session": create_session(profile["id"], session_nonce)
+            }
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Error completing Spotify login: {str(e)}"
+        )
+
+
+@router.get("/auth/me")
+async def me(x_user_session: Optional[str] = Header(None)):
+    """
+    👤 Perfil de Spotify del usuario de la sesión (con su propio token)
+    """
+    user_id = await run_in_threadpool(current_user_id, x_user_session)
+    client = await run_in_threadpool(get_spotify_client_with_oauth, user_id)
+    if client is None:
+        raise HTTPException(status_code=401, detail="Usuario sin token de Spotify, inicia sesión en /auth/login")
+
+    try:
+        profile = await run_in_threadpool(client.me)
+
+        return {
+            "status": "success",
+            "data": {
+                "user_id": profile["id"],
+                "display_name": profile.get("display_name"),
+                "country": profile.get("country"),
+                "product": profile.get("product")
+            }
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error getting Spotify profile: {str(e)}"
+        )
+
+
+@router.post("/auth/logout")
+async def logout(x_user_session: Optional[str] = Header(None)):
+    """
+    🔐 Borra el token del usuario de la sesión
+    """
+    user_id = await run_in_threadpool(current_user_id, x_user_session)
+    await run_in_threadpool(user_clients.remove, user_id)
+
+    return {
+        "status": "success",
+        "data": {"user_id": user_id}
+    }
@@ -1,26 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from datetime import datetime
 from typing import List, Optional
 
 from ..core.database import get_db
+from ..core.http_cache import cache_policy, ANALYSIS_MAX_AGE, CATALOG_MAX_AGE
+from ..core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor
+from ..services.analysis_planner import AnalysisPlan
+from ..services.catalog_browser import list_genre_snapshots
 from ..services.genre_analyzer import GenreAnalyzer
+from ..services.genre_catalog import artists_by_genre, genre_artist_stats, normalize_genre
+from ..services.underground_ranking import get_underground_leaderboards, genre_leaderboard, artist_leaderboard
 
 router = APIRouter(prefix="/api/genres", tags=["Genre Analysis"])
 
+def _underground_version(path_params, query_params):
+    """Versión del ranking underground (None si hay que analizar en vivo)"""
+    if query_params.get("live", "").lower() in ("1", "true", "yes", "on"):
+        return None
+    if not genre_leaderboard.built or genre_leaderboard.total_scored == 0:
+        return None
+    return (
+        f"{genre_leaderboard.version}:{genre_leaderboard.total_scored}:"
+        f"{artist_leaderboard.version}:{artist_leaderboard.total_scored}"
+    )
+
 @router.get("/analyze/{genre}")
+@cache_policy(max_age=ANALYSIS_MAX_AGE)
 async def analyze_single_genre(
     genre: str,
+    max_playlists: Optional[int] = Query(None, ge=1, le=200, description="Máximo de playlists a muestrear"),
+    max_tracks_per_playlist: Optional[int] = Query(None, ge=1, le=1000, description="Máximo de tracks por playlist"),
+    max_total_tracks: Optional[int] = Query(None, ge=1, le=5000, description="Máximo de tracks analizados"),
+    adaptive: bool = Query(False, description="Muestrear por rondas hasta que los intervalos de confianza sean estrechos"),
+    precision: Optional[float] = Query(None, gt=0, le=1, description="Ancho máximo del intervalo como fracción del rango (por defecto 0.05)"),
     db: Session = Depends(get_db)
 ):
     """
     🎵 Analiza un género musical específico
     
     - **genre**: Nombre del género (breakbeat, electronic, pop, etc.)
+    - **max_playlists / max_tracks_per_playlist / max_total_tracks**: Presupuesto de muestreo (por defecto 8/8/20)
+    - **adaptive**: Modo adaptativo, el presupuesto pasa a ser un máximo (por defecto 20/25/500)
+    - **precision**: Precisión objetivo del modo adaptativo
     - **returns**: Análisis completo con métricas de audio y popularidad
     """
     try:
         analyzer = GenreAnalyzer(db)
-        result = analyzer.analyze_genre(genre.lower())
+        result = analyzer.analyze_genre(
+            genre.lower(),
+            max_playlists=max_playlists,
+            max_tracks_per_playlist=max_tracks_per_playlist,
+            max_total_tracks=max_total_tracks,
+            adaptive=adaptive,
+            precision=precision
+        )
         
         return {
             "status": "success",
@@ -34,14 +69,19 @@ async def analyze_single_genre(
         )
 
 @router.get("/analyze/multiple")
+@cache_policy(max_age=ANALYSIS_MAX_AGE)
 async def analyze_multiple_genres(
     genres: Optional[str] = "breakbeat,electronic,pop,rock",
+    max_playlists: Optional[int] = Query(None, ge=1, le=200, description="Máximo de playlists a muestrear por género"),
+    max_tracks_per_playlist: Optional[int] = Query(None, ge=1, le=1000, description="Máximo de tracks por playlist"),
+    max_total_tracks: Optional[int] = Query(None, ge=1, le=5000, description="Máximo de tracks analizados por género"),
     db: Session = Depends(get_db)
 ):
     """
     🎯 Analiza múltiples géneros y los compara
     
     - **genres**: Lista de géneros separados por coma
+    - **max_playlists / max_tracks_per_playlist / max_total_tracks**: Presupuesto de muestreo por género
     - **returns**: Análisis comparativo con rankings y underground gems
     """
     try:
@@ -50,7 +90,11 @@ async def analyze_multiple_genres(
         # Parsear géneros
         genre_list = [g.strip().lower() for g in genres.split(",")]
         
-        result = analyzer.analyze_multiple_genres(genre_list)
+        result = analyzer.analyze_multiple_genres(genre_list, sampling={
+            'max_playlists': max_playlists,
+            'max_tracks_per_playlist': max_tracks_per_playlist,
+            'max_total_tracks': max_total_tracks
+        })
         
         return {
             "status": "success",
@@ -64,39 +108,60 @@ async def analyze_multiple_genres(
         )
 
 @router.get("/underground")
+@cache_policy(max_age=CATALOG_MAX_AGE, validator=_underground_version)
 async def find_underground_genres(
+    limit: int = Query(5, ge=1, le=50, description="Número de gems a devolver"),
+    live: bool = Query(False, description="Analizar géneros candidatos en vivo en lugar de usar el catálogo"),
     db: Session = Depends(get_db)
 ):
     """
     💎 Encuentra géneros underground automáticamente
     
-    Analiza géneros enfocándose en encontrar "gems" underground:
+    Rankea todos los géneros y artistas guardados enfocándose en encontrar "gems" underground:
     - Baja popularidad mainstream  
     - Alta energía musical
     - Potencial de crecimiento
+    
+    Si el catálogo está vacío (o `live=true`) analiza en vivo un grupo de géneros candidatos.
     """
     try:
-        analyzer = GenreAnalyzer(db)
+        leaderboards = get_underground_leaderboards(db)
+        genre_ranking = leaderboards["genres"]
+        artist_ranking = leaderboards["artists"]
+        
+        analysis_summary = {}
+        source = "catalog"
+        
+        if live or genre_ranking.total_scored == 0:
+            analyzer = GenreAnalyzer(db)
 
-        # OPTIMIZADO: Reducido a 5 géneros para evitar timeouts en Development Mode
-        # Géneros candidatos a ser underground (reducido de 8 a 5)
-        underground_candidates = [
-            'breakbeat', 'drum-and-bass', 'dubstep',
-            'hardstyle', 'psytrance'
-        ]
+            # OPTIMIZADO: Reducido a 5 géneros para evitar timeouts en Development Mode
+            # Géneros candidatos a ser underground (reducido de 8 a 5)
+            underground_candidates = [
+                'breakbeat', 'drum-and-bass', 'dubstep',
+                'hardstyle', 'psytrance'
+            ]
 
-        result = analyzer.analyze_multiple_genres(underground_candidates)
-        
-        # Filtrar solo los underground gems
-        underground_gems = result.get('comparison', {}).get('underground_gems', [])
+            # Los snapshots guardados también actualizan el ranking global
+            result = analyzer.analyze_multiple_genres(underground_candidates)
+            analysis_summary = result.get('comparison', {})
+            underground_gems = analysis_summary.get('underground_gems', [])[:limit]
+            total_analyzed = len(underground_candidates)
+            source = "live"
+        else:
+            underground_gems = genre_ranking.top(limit)
+            total_analyzed = genre_ranking.total_scored
         
         return {
             "status": "success",
             "data": {
                 "underground_genres": underground_gems,
-                "analysis_summary": result.get('comparison', {}),
-                "total_analyzed": len(underground_candidates),
-                "gems_found": len(underground_gems)
+                "underground_artists": artist_ranking.top(limit),
+                "analysis_summary": analysis_summary,
+                "total_analyzed": total_analyzed,
+                "artists_analyzed": artist_ranking.total_scored,
+                "gems_found": len(underground_gems),
+                "source": source
             }
         }
         
@@ -107,6 +172,7 @@ async def find_underground_genres(
         )
 
 @router.get("/compare")
+@cache_policy(max_age=ANALYSIS_MAX_AGE)
 async def compare_genres(
     genre1: str = "breakbeat",
     genre2: str = "electronic",
@@ -120,11 +186,11 @@ async def compare_genres(
     - **returns**: Comparación detallada lado a lado
     """
     try:
-        analyzer = GenreAnalyzer(db)
-        
-        # Analizar ambos géneros
-        result1 = analyzer.analyze_genre(genre1.lower())
-        result2 = analyzer.analyze_genre(genre2.lower())
+        # Analizar ambos géneros en paralelo (una sola vez si son el mismo)
+        plan = AnalysisPlan().add_genres([genre1, genre2])
+        results = await run_in_threadpool(plan.run)
+        result1 = results.genre(genre1)
+        result2 = results.genre(genre2)
         
         # Crear comparación directa
         comparison = {
@@ -150,6 +216,7 @@ async def compare_genres(
         )
 
 @router.get("/trending")
+@cache_policy(max_age=ANALYSIS_MAX_AGE)
 async def get_trending_analysis(
     db: Session = Depends(get_db)
 ):
@@ -168,9 +235,12 @@ async def get_trending_analysis(
         # Géneros underground (reducido de 4 a 2)
         underground = ['breakbeat', 'drum-and-bass']
 
-        # Analizar ambos grupos
-        mainstream_result = analyzer.analyze_multiple_genres(mainstream)
-        underground_result = analyzer.analyze_multiple_genres(underground)
+        # Analizar todos los géneros de ambos grupos en un único plan paralelo
+        plan = AnalysisPlan().add_genres(mainstream + underground)
+        results = await run_in_threadpool(plan.run)
+
+        mainstream_result = analyzer.analyze_multiple_genres(mainstream, prefetched=results.genres(mainstream))
+        underground_result = analyzer.analyze_multiple_genres(underground, prefetched=results.genres(underground))
         
         return {
             "status": "success",
@@ -191,6 +261,113 @@ async def get_trending_analysis(
             detail=f"Error in trending analysis: {str(e)}"
         )
 
+@router.get("/snapshots")
+@cache_policy(max_age=CATALOG_MAX_AGE)
+async def list_stored_genre_snapshots(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Snapshots por página"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    genre: Optional[str] = Query(None, description="Solo snapshots de este género"),
+    start_date: Optional[datetime] = Query(None, description="Desde esta fecha (ISO 8601)"),
+    end_date: Optional[datetime] = Query(None, description="Hasta esta fecha (ISO 8601)"),
+    min_popularity: Optional[float] = Query(None, ge=0, le=100, description="Popularidad media mínima"),
+    max_popularity: Optional[float] = Query(None, ge=0, le=100, description="Popularidad media máxima"),
+    db: Session = Depends(get_db)
+):
+    """
+    🗂️ Snapshots de géneros guardados, del más reciente al más antiguo
+    
+    - **genre / start_date / end_date / min_popularity / max_popularity**: Filtros
+    - **cursor**: Paginación por cursor; cada página cuesta lo mismo que la primera
+    - **returns**: Snapshots y next_cursor (None en la última página)
+    """
+    try:
+        page = list_genre_snapshots(
+            db, limit, cursor=cursor, genre=genre,
+            start_date=start_date, end_date=end_date,
+            min_popularity=min_popularity, max_popularity=max_popularity
+        )
+        
+        return {
+            "status": "success",
+            "data": {
+                "snapshots": page["items"],
+                "next_cursor": page["next_cursor"]
+            }
+        }
+        
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error listing genre snapshots: {str(e)}"
+        )
+
+@router.get("/{genre}/artists")
+@cache_policy(max_age=CATALOG_MAX_AGE)
+async def list_genre_artists(
+    genre: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Artistas por página"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    min_popularity: Optional[int] = Query(None, ge=0, le=100, description="Popularidad mínima"),
+    max_popularity: Optional[int] = Query(None, ge=0, le=100, description="Popularidad máxima"),
+    db: Session = Depends(get_db)
+):
+    """
+    🏷️ Artistas guardados de un género, de más a menos populares
+    
+    - **genre**: Nombre del género (tal y como lo devuelve Spotify)
+    - **cursor**: Paginación por cursor; cada página cuesta lo mismo que la primera
+    - **returns**: Artistas y next_cursor (None en la última página)
+    
+    Se consulta el índice artist_genres, sin llamar a Spotify.
+    """
+    try:
+        page = artists_by_genre(
+            db, genre, limit, cursor=cursor,
+            min_popularity=min_popularity, max_popularity=max_popularity
+        )
+        
+        return {
+            "status": "success",
+            "data": {
+                "genre": normalize_genre(genre),
+                "artists": page["items"],
+                "next_cursor": page["next_cursor"]
+            }
+        }
+        
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error listing artists for genre {genre}: {str(e)}"
+        )
+
+@router.get("/{genre}/artists/stats")
+@cache_policy(max_age=CATALOG_MAX_AGE)
+async def genre_artists_stats(
+    genre: str,
+    db: Session = Depends(get_db)
+):
+    """
+    📊 Agregados de los artistas guardados de un género
+    
+    - **returns**: Número de artistas, popularidad media/mínima/máxima e histograma por tramos de 10
+    """
+    try:
+        return {
+            "status": "success",
+            "data": genre_artist_stats(db, genre)
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error aggregating artists for genre {genre}: {str(e)}"
+        )
+
 # Funciones auxiliares
 def _calculate_avg_popularity(analysis_result):
     """Calcula popularidad promedio de un análisis"""
@@ -0,0 +1,209 @@
+"""
+Pool de credenciales de Spotify (Client Credentials)
+Las cuotas de Development Mode son por app: con varios pares client_id/secret las
+llamadas se reparten según la cuota libre de cada uno, y un 429 o fallos seguidos
+sacan temporalmente al par afectado del reparto
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import Gauge, SPOTIFY_CREDENTIAL_CALLS, registry
+from .rate_limit import QUOTA_KEY_PREFIX, QuotaCoordinator
+from .token_cache import client_key, shared_client_credentials
+
+# Fallos seguidos (5xx / red) que sacan a una credencial del reparto
+CREDENTIAL_FAILURE_THRESHOLD = 3
+
+# Tiempo fuera del reparto tras esos fallos (segundos)
+CREDENTIAL_FAILURE_COOLDOWN_SECONDS = 30
+
+
+def load_credentials() -> List[Tuple[str, str]]:
+    """
+    Pares (client_id, client_secret) configurados
+
+    SPOTIFY_CREDENTIALS="id1:secret1,id2:secret2" o, si no está, el par
+    clásico SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET
+    """
+    pairs = []
+    for item in os.getenv("SPOTIFY_CREDENTIALS", "").split(","):
+        client_id, _, client_secret = item.strip().partition(":")
+        if client_id and client_secret:
+            pairs.append((client_id, client_secret))
+
+    if not pairs:
+        client_id = os.getenv("SPOTIFY_CLIENT_ID")
+        client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+        if client_id and client_secret:
+            pairs.append((client_id, client_secret))
+
+    # Sin duplicados, conservando el orden
+    return list(dict.fromkeys(pairs))
+
+
+class Credential:
+    """
+    Un par client_id/secret con su token compartido, su cuota y su estado
+    """
+
+    def __init__(self, client_id: str, client_secret: str):
+        self.client_id = client_id
+        self.label = client_key(client_id)
+        self.auth_manager = shared_client_credentials(client_id, client_secret)
+        self.quota = QuotaCoordinator(prefix=f"{QUOTA_KEY_PREFIX}:{self.label}")
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.calls = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def cooling_down(self, now: float) -> bool:
+        return self.cooldown_until > now
+
+    def as_dict(self) -> Dict:
+        now = time.time()
+        remaining, blocked = self.quota.remaining()
+        return {
+            "client": self.label,
+            "available": not self.cooling_down(now) and blocked == 0,
+            "cooldown_seconds": round(max(self.cooldown_until - now, blocked), 1),
+            "quota_remaining": round(remaining, 3),
+            "quota_degraded": self.quota.degraded,
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error
+        }
+
+
+class CredentialPool:
+    """
+    Elige credencial para cada llamada
+
+    - Descarta las que están en cooldown (429 con Retry-After o fallos seguidos)
+    - Entre las disponibles, la de mayor cuota libre en la ventana actual
+      (empate: la que menos llamadas lleva)
+    - Si todas están fuera, la que antes vuelve
+    """
+
+    def __init__(self, credentials: List[Tuple[str, str]]):
+        self.credentials = [Credential(client_id, secret) for client_id, secret in credentials]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    def select(self) -> Credential:
+        if len(self.credentials) == 1:
+            return self.credentials[0]
+
+        now = time.time()
+        candidates = []
+        for credential in self.credentials:
+            remaining, blocked = credential.quota.remaining()
+            wait = max(credential.cooldown_until - now, blocked, 0.0)
+            candidates.append((wait, -remaining, credential.calls, credential))
+
+        wait, _, _, credential = min(candidates, key=lambda c: c[:3])
+        if wait > 0:
+            print(f"⚠️ Todas las credenciales de Spotify en cooldown, usando {credential.label} (vuelve en {wait:.1f}s)")
+        return credential
+
+    def available(self) -> int:
+        now = time.time()
+        return sum(1 for c in self.credentials if not c.cooling_down(now))
+
+    def record_success(self, credential: Credential):
+        with self._lock:
+            credential.calls += 1
+            credential.consecutive_failures = 0
+        SPOTIFY_CREDENTIAL_CALLS.inc(client=credential.label, outcome="ok")
+
+    def record_rate_limited(self, credential: Credential, retry_after: float):
+        with self._lock:
+            credential.calls += 1
+            credential.rate_limited += 1
+            credential.cooldown_until = max(credential.cooldown_until, time.time() + retry_after)
+        credential.quota.block(retry_after)
+        SPOTIFY_CREDENTIAL_CALLS.inc(client=credential.label, outcome="rate_limited")
+
+    def record_failure(self, credential: Credential, error: str):
+        with self._lock:
+            credential.calls += 1
+            credential.errors += 1
+            credential.consecutive_failures += 1
+            credential.last_error = error
+            if credential.consecutive_failures >= CREDENTIAL_FAILURE_THRESHOLD:
+                credential.cooldown_until = time.time() + CREDENTIAL_FAILURE_COOLDOWN_SECONDS
+                print(f"⚠️ Credencial {credential.label} fuera del reparto {CREDENTIAL_FAILURE_COOLDOWN_SECONDS}s ({error})")
+        SPOTIFY_CREDENTIAL_CALLS.inc(client=credential.label, outcome="error")
+
+    def snapshot(self) -> List[Dict]:
+        return [credential.as_dict() for credential in self.credentials]
+
+
+_current: ContextVar[Optional[Credential]] = ContextVar("spotify_credential", default=None)
+
+
+@contextmanager
+def use_credential(credential: Credential):
+    """
+    Fija la credencial de las llamadas hechas dentro del bloque (la lee PooledAuthManager)
+    """
+    token = _current.set(credential)
+    try:
+        yield credential
+    finally:
+        _current.reset(token)
+
+
+class PooledAuthManager:
+    """
+    Auth manager para spotipy que entrega el token de la credencial elegida
+    para la llamada en curso
+    """
+
+    def __init__(self, pool: CredentialPool):
+        self.pool = pool
+
+    def get_access_token(self, as_dict=False, check_cache=True):
+        credential = _current.get() or self.pool.select()
+        return credential.auth_manager.get_access_token(as_dict=as_dict, check_cache=check_cache)
+
+
+_pool: Optional[CredentialPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_credential_pool() -> Optional[CredentialPool]:
+    """
+    Pool del proceso, o None si no hay credenciales configuradas
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            credentials = load_credentials()
+            if not credentials:
+                return None
+            _pool = CredentialPool(credentials)
+            print(f"🔑 Pool de credenciales de Spotify: {len(_pool)} par(es)")
+        return _pool
+
+
+def _credential_availability() -> Dict:
+    if _pool is None:
+        return {}
+    now = time.time()
+    return {(c.label,): 0 if c.cooling_down(now) else 1 for c in _pool.credentials}
+
+
+SPOTIFY_CREDENTIAL_AVAILABLE = registry.register(Gauge(
+    "spotify_credential_available", "Credenciales de Spotify en el reparto (1) o en cooldown (0)",
+    labels=("client",), callback=_credential_availability
+))
@@ -5,6 +5,8 @@ import os
 from dotenv import load_dotenv
 import logging
 
+from .timing import instrument_database
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -27,6 +29,9 @@ engine = create_engine(
 # Crear sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Tiempo de queries y commits para la cabecera Server-Timing
+instrument_database(engine, SessionLocal)
+
 # Base para modelos
 Base = declarative_base()
 
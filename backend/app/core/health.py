@@ -0,0 +1,152 @@
+"""
+Health checks en segundo plano (liveness / readiness)
+Las sondas de dependencias se ejecutan en un hilo a intervalo fijo y los
+endpoints solo leen el estado cacheado: sondear /health no cuesta llamadas a Spotify
+"""
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from .spotify_client import call_tracker
+
+# Intervalo entre rondas de sondas (segundos)
+HEALTH_REFRESH_SECONDS = float(os.getenv("HEALTH_REFRESH_SECONDS", 15))
+
+# Latencias guardadas por sonda
+PROBE_HISTORY_SIZE = 20
+
+# Fallos seguidos (429/5xx/red) en llamadas reales para dar Spotify por degradado
+SPOTIFY_FAILURE_THRESHOLD = 5
+
+
+class ProbeState:
+    """
+    Último resultado de una sonda e historial de latencias
+    """
+
+    def __init__(self, name: str, critical: bool):
+        self.name = name
+        self.critical = critical
+        self.ok: Optional[bool] = None
+        self.status = "pending"
+        self.checked_at: Optional[str] = None
+        self.history = deque(maxlen=PROBE_HISTORY_SIZE)
+
+    def record(self, ok: bool, status: str, latency: float):
+        self.ok = ok
+        self.status = status
+        self.checked_at = datetime.utcnow().isoformat()
+        self.history.append({"at": self.checked_at, "ok": ok, "latency_ms": round(latency * 1000, 2)})
+
+    def as_dict(self) -> Dict:
+        latencies = [h["latency_ms"] for h in self.history]
+        return {
+            "ok": self.ok,
+            "status": self.status,
+            "critical": self.critical,
+            "checked_at": self.checked_at,
+            "avg_latency_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+            "history": list(self.history)
+        }
+
+
+class HealthMonitor:
+    """
+    Ejecuta las sondas registradas en un hilo de fondo y guarda su estado
+    """
+
+    def __init__(self, interval: float = HEALTH_REFRESH_SECONDS):
+        self.interval = interval
+        self._probes: Dict[str, Tuple[Callable[[], Tuple[bool, str]], ProbeState]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = time.time()
+
+    def register(self, name: str, probe: Callable[[], Tuple[bool, str]], critical: bool = True):
+        """
+        Args:
+            probe: Función sin argumentos -> (ok, estado legible)
+            critical: Si es False un fallo no marca el servicio como no listo
+        """
+        self._probes[name] = (probe, ProbeState(name, critical))
+
+    def refresh(self):
+        for name, (probe, state) in self._probes.items():
+            start = time.perf_counter()
+            try:
+                ok, status = probe()
+            except Exception as e:
+                ok, status = False, f"error: {str(e)}"
+            with self._lock:
+                state.record(ok, status, time.perf_counter() - start)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def state(self, name: str) -> Optional[ProbeState]:
+        entry = self._probes.get(name)
+        return entry[1] if entry else None
+
+    def ready(self) -> bool:
+        with self._lock:
+            return all(state.ok for _, state in self._probes.values() if state.critical)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {name: state.as_dict() for name, (_, state) in self._probes.items()}
+
+
+def database_probe(engine) -> Callable[[], Tuple[bool, str]]:
+    def probe():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True, "connected"
+    return probe
+
+
+def spotify_probe(client_factory: Callable) -> Callable[[], Tuple[bool, str]]:
+    """
+    Sonda sin llamadas a la API: comprueba que hay un token válido (cacheado por
+    spotipy, solo se renueva al caducar) y el resultado de las llamadas reales recientes
+    """
+    def probe():
+        client = client_factory()
+        if client is None:
+            return False, "disconnected"
+
+        auth_manager = client.auth_manager or client.client_credentials_manager
+        if auth_manager is not None and not auth_manager.get_access_token(as_dict=False):
+            return False, "error: no access token"
+
+        calls = call_tracker.snapshot()
+        if calls["consecutive_failures"] >= SPOTIFY_FAILURE_THRESHOLD:
+            return False, f"degraded: {calls['consecutive_failures']} fallos seguidos ({calls['last_error']})"
+        return True, "connected"
+    return probe
+
+
+health_monitor = HealthMonitor()
@@ -0,0 +1,187 @@
+"""
+Caché HTTP (ETag / Cache-Control / 304) para los endpoints de análisis
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+# Frescura (segundos) por tipo de endpoint
+ANALYSIS_MAX_AGE = 600  # Análisis en vivo contra Spotify
+SEARCH_MAX_AGE = 3600  # Metadata de artistas (cambia poco)
+CATALOG_MAX_AGE = 300  # Datos servidos desde los snapshots guardados
+
+# Máximo de respuestas guardadas en memoria
+RESPONSE_CACHE_SIZE = 512
+
+
+def cache_policy(max_age: int, validator: Optional[Callable[[Dict, Dict], Optional[str]]] = None):
+    """
+    Declara la política de caché HTTP de un endpoint
+
+    Args:
+        max_age: Segundos de frescura (Cache-Control max-age)
+        validator: Función (path_params, query_params) -> versión de los datos
+            (p.ej. IDs de snapshots). Permite responder 304 sin ejecutar el endpoint.
+            Si devuelve None se usa el hash del contenido.
+    """
+    def decorator(endpoint):
+        endpoint.cache_policy = {"max_age": max_age, "validator": validator}
+        return endpoint
+    return decorator
+
+
+def make_etag(*parts: str) -> str:
+    return '"' + hashlib.sha1("|".join(parts).encode()).hexdigest() + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _cache_headers(etag: str, max_age: int) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+
+
+def _is_error_payload(body: bytes) -> bool:
+    """
+    Algunos análisis devuelven 200 con un error dentro de `data` (p.ej. rate limiting):
+    esos no se guardan
+    """
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return True
+    data = payload.get("data") if isinstance(payload, dict) else None
+    return isinstance(data, dict) and "error" in data
+
+
+class ResponseCache:
+    """
+    Caché LRU en memoria de respuestas JSON con caducidad
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, etag: str, body: bytes, max_age: int):
+        with self._lock:
+            self._entries[key] = (etag, body, time.monotonic() + max_age)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+class HTTPCacheMiddleware(BaseHTTPMiddleware):
+    """
+    Aplica la política declarada con @cache_policy a las peticiones GET:
+    - Con validador: el ETag sale de la versión de los datos y un If-None-Match
+      coincidente devuelve 304 sin ejecutar el endpoint.
+    - Sin validador: la respuesta se guarda durante max-age con un ETag del
+      hash del contenido; las repeticiones se sirven (o responden 304) sin recalcular.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        # Las peticiones perfiladas deben ejecutar el endpoint
+        if request.method != "GET" or request.scope.get("profiling"):
+            return await call_next(request)
+
+        route_policy = self._find_policy(request)
+        if route_policy is None:
+            return await call_next(request)
+
+        policy, path_params = route_policy
+        max_age = policy["max_age"]
+        key = f"{request.url.path}?{request.url.query}"
+
+        # 1. Validador barato (IDs/versiones de snapshots)
+        version = None
+        if policy["validator"] is not None:
+            version = policy["validator"](path_params, dict(request.query_params))
+
+        if version is not None:
+            etag = make_etag(key, version)
+            if _etag_matches(request, etag):
+                return Response(status_code=304, headers=_cache_headers(etag, max_age))
+
+            response = await call_next(request)
+            if response.status_code == 200:
+                response.headers.update(_cache_headers(etag, max_age))
+            return response
+
+        # 2. Respuesta guardada y aún fresca
+        cached = response_cache.get(key)
+        if cached is not None:
+            etag, body, _ = cached
+            if _etag_matches(request, etag):
+                return Response(status_code=304, headers=_cache_headers(etag, max_age))
+            return Response(content=body, media_type="application/json", headers=_cache_headers(etag, max_age))
+
+        # 3. Calcular, hashear el contenido y guardar
+        response = await call_next(request)
+        if response.status_code != 200 or not response.headers.get("content-type", "").startswith("application/json"):
+            return response
+
+        # El endpoint pudo cargar los datos que usa el validador (primera petición)
+        if policy["validator"] is not None:
+            version = policy["validator"](path_params, dict(request.query_params))
+            if version is not None:
+                response.headers.update(_cache_headers(make_etag(key, version), max_age))
+                return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        etag = make_etag(hashlib.sha1(body).hexdigest())
+        headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+        headers.update(_cache_headers(etag, max_age))
+
+        if _is_error_payload(body):
+            headers.pop("ETag")
+            headers["Cache-Control"] = "no-store"
+            return Response(content=body, status_code=200, headers=headers)
+
+        response_cache.set(key, etag, body, max_age)
+
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=_cache_headers(etag, max_age))
+        return Response(content=body, status_code=200, headers=headers)
+
+    def _find_policy(self, request: Request) -> Optional[tuple]:
+        for route in request.app.routes:
+            match, child_scope = route.matches(request.scope)
+            if match == Match.FULL:
+                policy = getattr(getattr(route, "endpoint", None), "cache_policy", None)
+                if policy is None:
+                    return None
+                return policy, child_scope.get("path_params", {})
+        return None
@@ -0,0 +1,286 @@
+"""
+Métricas en formato Prometheus (texto de exposición 0.0.4)
+Implementación mínima sin dependencias: contadores, gauges e histogramas con etiquetas
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.routing import Match
+
+# Buckets de latencia (segundos)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """
+    Gauge con valores fijados a mano o leídos en cada scrape mediante un callback
+    """
+    kind = "gauge"
+
+    def __init__(self, *args, callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        if self._callback is not None:
+            try:
+                items = list(self._callback().items())
+            except Exception:
+                items = []
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [conteos por bucket..., +Inf], suma
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v[0]), v[1]) for k, v in self._values.items()]
+
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Rutas HTTP
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta",
+    labels=("method", "route", "status")
+))
+
+# Llamadas a Spotify
+SPOTIFY_REQUESTS = registry.register(Counter(
+    "spotify_requests_total", "Llamadas a la API de Spotify por endpoint y estado",
+    labels=("endpoint", "status")
+))
+SPOTIFY_REQUEST_DURATION = registry.register(Histogram(
+    "spotify_request_duration_seconds", "Latencia de las llamadas a Spotify por endpoint",
+    labels=("endpoint",)
+))
+SPOTIFY_RATE_LIMITED = registry.register(Counter(
+    "spotify_rate_limited_total", "Respuestas 429 de Spotify por endpoint",
+    labels=("endpoint",)
+))
+RATE_LIMIT_WAIT = registry.register(Counter(
+    "spotify_rate_limit_wait_seconds_total", "Tiempo esperado por rate limiting",
+    labels=("source",)
+))
+SPOTIFY_QUOTA_ACQUISITIONS = registry.register(Counter(
+    "spotify_quota_acquisitions_total", "Peticiones de cuota global (granted / waited / timeout)",
+    labels=("result",)
+))
+SPOTIFY_QUOTA_DEGRADED = registry.register(Gauge(
+    "spotify_quota_degraded", "1 si el coordinador de cuota usa la contabilidad local por fallo de Redis",
+    labels=("coordinator",)
+))
+SPOTIFY_QUEUE_DEPTH = registry.register(Gauge(
+    "spotify_queue_depth", "Llamadas a Spotify esperando cuota por clase (interactive / background)",
+    labels=("class",)
+))
+SPOTIFY_QUEUE_WAIT = registry.register(Histogram(
+    "spotify_queue_wait_seconds", "Espera por cuota de las llamadas a Spotify por clase",
+    labels=("class",)
+))
+SPOTIFY_CREDENTIAL_CALLS = registry.register(Counter(
+    "spotify_credential_calls_total", "Llamadas a Spotify por credencial y resultado (ok / rate_limited / error)",
+    labels=("client", "outcome")
+))
+SPOTIFY_TOKEN_REFRESHES = registry.register(Counter(
+    "spotify_token_refreshes_total", "Renovaciones del token de Client Credentials (ahead / expired)",
+    labels=("reason",)
+))
+
+# Base de datos
+DB_POOL_CHECKOUTS = registry.register(Counter(
+    "db_pool_checkouts_total", "Conexiones sacadas del pool de SQLAlchemy"
+))
+SNAPSHOT_WRITES = registry.register(Counter(
+    "snapshot_writes_total", "Snapshots guardados por tabla",
+    labels=("table",)
+))
+
+# Servicios
+ARTIST_NAME_RESOLUTIONS = registry.register(Counter(
+    "artist_name_resolutions_total", "Resolución nombre -> ID de artista sin búsqueda en Spotify (hit / miss)",
+    labels=("result",)
+))
+ARTIST_SUGGESTIONS = registry.register(Counter(
+    "artist_suggestions_total", "Autocompletado de artistas por origen de las sugerencias (index / spotify / none)",
+    labels=("source",)
+))
+
+
+def register_engine_pool(engine):
+    """
+    Expone el estado del pool de conexiones de un engine de SQLAlchemy
+    """
+    from sqlalchemy import event
+
+    pool = engine.pool
+
+    def pool_state():
+        state = {}
+        for name in ("size", "checkedout", "overflow", "checkedin"):
+            reader = getattr(pool, name, None)
+            if reader is not None:
+                state[(name,)] = reader()
+        return state
+
+    registry.register(Gauge(
+        "db_pool_connections", "Estado del pool de SQLAlchemy (size, checkedout, overflow, checkedin)",
+        labels=("state",), callback=pool_state
+    ))
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc()
+
+
+def route_template(request: Request) -> str:
+    """
+    Plantilla de la ruta (p.ej. /api/genres/analyze/{genre}) para no crear una serie por URL
+    """
+    for route in request.app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    """
+    Mide la latencia de cada petición por método, ruta y estado
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=request.method, route=route_template(request), status=str(status)
+            )
@@ -0,0 +1,120 @@
+"""
+Migraciones de datos al arrancar
+create_all crea las tablas nuevas pero no rellena datos ni añade índices a tablas
+existentes; cada migración se aplica una sola vez y queda registrada en
+schema_migrations. Entre workers, el primero que registra la migración la ejecuta
+(en la misma transacción) y el resto la saltan.
+
+Uso manual: python -m app.core.migrations
+"""
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, delete, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from ..models.artist import Artist, ArtistGenre, ArtistSnapshot
+from ..models.genre import GenreSnapshot
+from ..models.user import UserToken
+
+# Artistas por lote en los backfills
+BACKFILL_BATCH_SIZE = 1000
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations", metadata,
+    Column("name", String(100), primary_key=True),
+    Column("applied_at", DateTime, default=datetime.utcnow)
+)
+
+
+def backfill_artist_genres(connection: Connection):
+    """
+    Rellena artist_genres desde el JSON Artist.genres, por lotes de IDs
+    """
+    from ..services.genre_catalog import genre_rows
+
+    table = ArtistGenre.__table__
+    last_id = ""
+    total = 0
+    while True:
+        batch = connection.execute(
+            select(Artist.id, Artist.genres, Artist.popularity)
+            .where(Artist.id > last_id)
+            .order_by(Artist.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+
+        rows = [row for artist_id, genres, popularity in batch for row in genre_rows(artist_id, genres, popularity)]
+        ids = [artist_id for artist_id, _, _ in batch]
+        connection.execute(delete(table).where(table.c.artist_id.in_(ids)))
+        if rows:
+            connection.execute(insert(table), rows)
+
+        total += len(rows)
+        last_id = batch[-1][0]
+
+    print(f"🏷️ artist_genres: {total} filas")
+
+
+def create_listing_indexes(connection: Connection):
+    """
+    Índices compuestos de los listados paginados en tablas ya existentes
+    (create_all solo los crea con la tabla)
+    """
+    for model in (Artist, ArtistSnapshot, GenreSnapshot):
+        for index in model.__table__.indexes:
+            if len(index.columns) > 1:
+                index.create(connection, checkfirst=True)
+
+
+def add_session_nonce(connection: Connection):
+    """
+    Columna session_nonce en user_tokens ya existentes; las filas quedan sin sesión
+    vigente y sus usuarios vuelven a iniciar sesión
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns(UserToken.__tablename__)}
+    if "session_nonce" not in columns:
+        connection.execute(text(f"ALTER TABLE {UserToken.__tablename__} ADD COLUMN session_nonce VARCHAR(64)"))
+
+
+# En orden de aplicación; los nombres no se cambian una vez publicados
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_backfill_artist_genres", backfill_artist_genres),
+    ("0002_listing_indexes", create_listing_indexes),
+    ("0003_user_session_nonce", add_session_nonce),
+]
+
+
+def run_migrations(engine: Engine):
+    """
+    Aplica las migraciones pendientes (después de create_all)
+    """
+    metadata.create_all(bind=engine)
+
+    for name, migration in MIGRATIONS:
+        with engine.connect() as connection:
+            if connection.execute(select(schema_migrations.c.name).where(schema_migrations.c.name == name)).first():
+                continue
+
+        try:
+            with engine.begin() as connection:
+                connection.execute(insert(schema_migrations).values(name=name, applied_at=datetime.utcnow()))
+                migration(connection)
+            print(f"🛠️ Migración aplicada: {name}")
+        except IntegrityError as e:
+            # Normalmente otro worker la ha registrado a la vez; si no, se reintenta al arrancar
+            print(f"⏭️ Migración {name} no aplicada por este worker: {e.orig}")
+        except Exception as e:
+            print(f"❌ Error aplicando la migración {name}: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    run_migrations(engine)
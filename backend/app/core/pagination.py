@@ -0,0 +1,102 @@
+"""
+Paginación por cursor (keyset) para los listados sobre tablas grandes
+En vez de OFFSET, cada página continúa desde los valores de la última fila de la
+anterior (WHERE (a, b) < (:a, :b) ORDER BY a DESC, b DESC), así que con un índice
+sobre esas columnas la página 1000 cuesta lo mismo que la primera
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# Tamaño de página por defecto y máximo de los listados
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Cursor opaco (base64 url-safe) con los valores de ordenación de una fila
+    """
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _matches_type(value: Any, column) -> bool:
+    """
+    El valor del cursor es del tipo de la columna (bool no cuenta como número)
+    """
+    expected = column.type.python_type
+    if isinstance(value, bool):
+        return expected is bool
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    """
+    Valores de ordenación de un cursor, comprobados contra el tipo de cada columna
+    """
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(raw, list) or len(raw) != len(columns):
+            raise InvalidCursor("Cursor no válido")
+        values = [_decode_value(v) for v in raw]
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor("Cursor no válido")
+    if not all(_matches_type(value, column) for value, column in zip(values, columns)):
+        raise InvalidCursor("Cursor no válido")
+    return values
+
+
+def keyset_page(
+    query: Query,
+    columns: Sequence,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+    key: Optional[Callable[[Any], Sequence[Any]]] = None
+) -> Dict:
+    """
+    Una página de la consulta ordenada por `columns` (todas en el mismo sentido;
+    la última debe ser única para que el orden sea total)
+
+    - key: extrae de cada fila los valores de `columns` (por defecto, los atributos
+      con el mismo nombre)
+    - returns: {"items": filas, "next_cursor": cursor de la siguiente página o None}
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        boundary = tuple_(*columns)
+        query = query.filter(boundary < tuple_(*values) if descending else boundary > tuple_(*values))
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    if key is None:
+        key = lambda row: [getattr(row, column.key) for column in columns]
+
+    next_cursor = encode_cursor(key(rows[limit - 1])) if len(rows) > limit else None
+    return {"items": rows[:limit], "next_cursor": next_cursor}
@@ -0,0 +1,225 @@
+"""
+Profiling bajo demanda de peticiones reales (perfilador por muestreo)
+Se activa con ?_profile=1 o la cabecera X-Profile: 1, protegido por PROFILING_TOKEN
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+# Sin token configurado el hook está desactivado
+PROFILING_TOKEN_ENV = "PROFILING_TOKEN"
+PROFILE_HEADER = "x-profile"
+PROFILE_TOKEN_HEADER = "x-profile-token"
+
+# Intervalo de muestreo y poda del árbol (nodos con menos del 0.5% de las muestras)
+PROFILE_INTERVAL_SECONDS = 0.005
+PROFILE_MIN_FRACTION = 0.005
+
+# Perfiles recientes consultables por ID
+MAX_STORED_PROFILES = 20
+
+# Solo se miran los frames del código de la app
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PROFILER_FILE = os.path.abspath(__file__)
+
+
+def profiling_token() -> Optional[str]:
+    return os.getenv(PROFILING_TOKEN_ENV) or None
+
+
+def is_authorized(request: Request) -> bool:
+    token = profiling_token()
+    supplied = request.headers.get(PROFILE_TOKEN_HEADER, "")
+    return token is not None and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def _frame_label(code) -> str:
+    filename = os.path.relpath(code.co_filename, os.path.dirname(APP_ROOT))
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Muestrea periódicamente las pilas de todos los hilos (sys._current_frames)
+    y acumula las que pasan por código de la app en un árbol de llamadas.
+
+    Funciona igual para endpoints async (hilo del event loop) y sync (threadpool).
+    Con peticiones concurrentes también se muestrean las demás: es una vista
+    de dónde está el proceso mientras dura la petición perfilada.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples = 0
+        self.root: Dict = {"children": {}, "samples": 0, "self": 0}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != own_ident:
+                    self._add_stack(frame)
+
+    def _add_stack(self, frame):
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        stack.reverse()
+
+        # Recortar hasta el primer frame de la app (fuera quedan uvicorn/anyio/starlette)
+        start = next(
+            (i for i, code in enumerate(stack)
+             if code.co_filename.startswith(APP_ROOT) and code.co_filename != _PROFILER_FILE),
+            None
+        )
+        if start is None:
+            return
+
+        self.samples += 1
+        node = self.root
+        node["samples"] += 1
+        for code in stack[start:]:
+            label = _frame_label(code)
+            child = node["children"].get(label)
+            if child is None:
+                child = node["children"][label] = {"children": {}, "samples": 0, "self": 0}
+            child["samples"] += 1
+            node = child
+        node["self"] += 1
+
+    def call_tree(self, min_fraction: float = PROFILE_MIN_FRACTION) -> List[Dict]:
+        min_samples = max(1, int(self.samples * min_fraction))
+
+        def build(children: Dict) -> List[Dict]:
+            nodes = []
+            for label, child in sorted(children.items(), key=lambda item: -item[1]["samples"]):
+                if child["samples"] < min_samples:
+                    continue
+                nodes.append({
+                    "function": label,
+                    "samples": child["samples"],
+                    "percent": round(100 * child["samples"] / self.samples, 1),
+                    "self_samples": child["self"],
+                    "children": build(child["children"])
+                })
+            return nodes
+
+        return build(self.root["children"]) if self.samples else []
+
+    def hot_functions(self, limit: int = 15) -> List[Dict]:
+        """
+        Funciones con más tiempo propio (muestras en la cima de la pila)
+        """
+        totals: Dict[str, int] = {}
+
+        def walk(children: Dict):
+            for label, child in children.items():
+                if child["self"]:
+                    totals[label] = totals.get(label, 0) + child["self"]
+                walk(child["children"])
+
+        walk(self.root["children"])
+        ranked = sorted(totals.items(), key=lambda item: -item[1])[:limit]
+        return [
+            {"function": label, "self_samples": count, "percent": round(100 * count / self.samples, 1)}
+            for label, count in ranked
+        ]
+
+
+class ProfileStore:
+    """
+    Últimos perfiles generados, para recuperarlos por ID
+    """
+
+    def __init__(self, max_entries: int = MAX_STORED_PROFILES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def add(self, profile: Dict) -> str:
+        profile_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+profile_store = ProfileStore()
+
+
+def _wants_profile(request: Request) -> bool:
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get("_profile")
+    return (flag or "").lower() in ("1", "true", "yes", "on")
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """
+    Ejecuta la petición bajo el perfilador y devuelve el árbol de llamadas
+    en lugar del cuerpo normal. La caché HTTP se salta para perfilar el cálculo real.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        # Sin PROFILING_TOKEN el hook no existe: el flag se ignora y la petición sigue igual
+        if profiling_token() is None or not _wants_profile(request):
+            return await call_next(request)
+
+        if not is_authorized(request):
+            return JSONResponse(status_code=403, content={"detail": "Profiling no autorizado"})
+
+        request.scope["profiling"] = True
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            response = await call_next(request)
+            # Consumir el cuerpo dentro del perfil (respuestas en streaming)
+            async for _ in response.body_iterator:
+                pass
+        finally:
+            profiler.stop()
+
+        profile = {
+            "method": request.method,
+            "path": request.url.path,
+            "status_code": response.status_code,
+            "duration_ms": round(profiler.duration * 1000, 1),
+            "interval_ms": profiler.interval * 1000,
+            "samples": profiler.samples,
+            "hot_functions": profiler.hot_functions(),
+            "call_tree": profiler.call_tree()
+        }
+        profile_id = profile_store.add(profile)
+
+        return JSONResponse(
+            content={"status": "success", "data": {"profile_id": profile_id, **profile}},
+            headers={"Cache-Control": "no-store"}
+        )
@@ -0,0 +1,409 @@
+"""
+Cuota global de llamadas a Spotify compartida entre workers y réplicas
+Todas las llamadas piden cuota a un coordinador (Redis si hay REDIS_URL, memoria
+del proceso si no) antes de salir: el presupuesto es uno solo para todo el despliegue.
+Las llamadas interactivas tienen prioridad sobre el trabajo en segundo plano.
+"""
+import math
+import os
+import random
+import socket
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from .metrics import (
+    RATE_LIMIT_WAIT, SPOTIFY_QUOTA_ACQUISITIONS, SPOTIFY_QUOTA_DEGRADED, SPOTIFY_QUEUE_DEPTH, SPOTIFY_QUEUE_WAIT
+)
+from .redis_client import get_redis
+from .timing import span
+
+# Presupuesto global (unidades de peso por segundo, para todos los workers)
+SPOTIFY_CALLS_PER_SECOND = float(os.getenv("SPOTIFY_CALLS_PER_SECOND", 10))
+
+# Ventana de contabilidad (segundos)
+QUOTA_WINDOW_SECONDS = 1.0
+
+# Espera máxima por cuota; pasado este tiempo la llamada sale igualmente
+QUOTA_MAX_WAIT_SECONDS = float(os.getenv("QUOTA_MAX_WAIT_SECONDS", 30))
+
+# Tras un fallo de Redis se usa la cuota local y se vuelve a probar Redis pasado este tiempo
+QUOTA_REDIS_RETRY_SECONDS = float(os.getenv("QUOTA_REDIS_RETRY_SECONDS", 30))
+
+# Un participante deja de contar para el reparto si no pide cuota en este tiempo
+PARTICIPANT_TTL_SECONDS = 10
+
+# Fracción del presupuesto que un participante puede usar por encima de su parte
+# justa; el resto de la ventana queda reservado para los que no la han agotado
+BORROW_FRACTION = 0.8
+
+# Peso por endpoint (los no listados pesan 1). Ampliable con
+# SPOTIFY_ENDPOINT_WEIGHTS="GET search=3,GET artists/{id}/albums=2"
+DEFAULT_ENDPOINT_WEIGHTS = {
+    "GET search": 2,
+    "GET audio-features": 2,
+    "GET playlists/{id}/tracks": 2,
+}
+
+QUOTA_KEY_PREFIX = "spotify:quota"
+
+# Clases de llamada: las interactivas (peticiones de usuario) pasan primero; las de
+# segundo plano (precálculo, refrescos, backfill) solo usan la capacidad sobrante
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+CALL_CLASSES = (INTERACTIVE, BACKGROUND)
+
+# Fracción de cada ventana que puede consumir el trabajo en segundo plano
+# (el resto queda siempre libre para las llamadas interactivas de cualquier worker)
+BACKGROUND_BUDGET_FRACTION = float(os.getenv("BACKGROUND_BUDGET_FRACTION", 0.7))
+
+# Cada cuánto revisa la cola una llamada en segundo plano cedida a las interactivas
+BACKGROUND_YIELD_SECONDS = 0.05
+
+_call_class: ContextVar[str] = ContextVar("spotify_call_class", default=INTERACTIVE)
+
+
+def current_call_class() -> str:
+    return _call_class.get()
+
+
+@contextmanager
+def call_class(name: str):
+    """
+    Clase de las llamadas a Spotify hechas dentro del bloque
+
+    Uso:
+        with call_class(BACKGROUND):
+            GenreAnalyzer(db).analyze_genre('breakbeat')
+    """
+    if name not in CALL_CLASSES:
+        raise ValueError(f"Clase de llamada desconocida: {name}")
+    token = _call_class.set(name)
+    try:
+        yield
+    finally:
+        _call_class.reset(token)
+
+
+def endpoint_weights() -> Dict[str, int]:
+    weights = dict(DEFAULT_ENDPOINT_WEIGHTS)
+    for item in os.getenv("SPOTIFY_ENDPOINT_WEIGHTS", "").split(","):
+        if "=" not in item:
+            continue
+        endpoint, weight = item.rsplit("=", 1)
+        try:
+            weights[endpoint.strip()] = max(int(weight), 1)
+        except ValueError:
+            print(f"⚠️ Peso no válido para {endpoint.strip()}: {weight}")
+    return weights
+
+
+class MemoryQuotaBackend:
+    """
+    Contabilidad en memoria del proceso (un solo worker, o tests sin Redis)
+    Misma lógica que el script de Redis
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._window = None
+        self._used: Dict[str, int] = defaultdict(int)
+        self._participants: Dict[str, float] = {}
+        self._blocked_until = 0.0
+
+    def try_acquire(self, participant: str, weight: int, budget: int, window: float) -> float:
+        """
+        Devuelve 0 si concede la cuota, o los segundos a esperar antes de reintentar
+        """
+        now = time.time()
+        with self._lock:
+            if self._blocked_until > now:
+                return self._blocked_until - now
+
+            current = math.floor(now / window)
+            if current != self._window:
+                self._window = current
+                self._used = defaultdict(int)
+            wait = (current + 1) * window - now
+
+            self._participants[participant] = now
+            for name, seen in list(self._participants.items()):
+                if seen < now - PARTICIPANT_TTL_SECONDS:
+                    del self._participants[name]
+
+            used = sum(self._used.values())
+            if used + weight > budget:
+                return wait
+            if self._used[participant] + weight > budget / len(self._participants) and used + weight > budget * BORROW_FRACTION:
+                return wait
+
+            self._used[participant] += weight
+            return 0.0
+
+    def block(self, seconds: float):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.time() + seconds)
+
+    def usage(self, window: float) -> Tuple[int, float]:
+        """
+        (peso consumido en la ventana actual, segundos de bloqueo restantes)
+        """
+        now = time.time()
+        with self._lock:
+            used = sum(self._used.values()) if self._window == math.floor(now / window) else 0
+            return used, max(self._blocked_until - now, 0.0)
+
+    def describe(self) -> str:
+        return "memory"
+
+
+# KEYS[1]: prefijo; ARGV: participante, peso, presupuesto, ventana_ms, ttl_participante_ms, fracción_préstamo
+# Usa el reloj de Redis para que todas las réplicas compartan las mismas ventanas
+_ACQUIRE_SCRIPT = """
+local prefix = KEYS[1]
+local blocked = redis.call('PTTL', prefix .. ':blocked')
+if blocked > 0 then return blocked end
+
+local t = redis.call('TIME')
+local now_ms = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window_ms = tonumber(ARGV[4])
+local window = math.floor(now_ms / window_ms)
+local wait_ms = (window + 1) * window_ms - now_ms
+
+local participants = prefix .. ':participants'
+redis.call('ZADD', participants, now_ms, ARGV[1])
+redis.call('ZREMRANGEBYSCORE', participants, '-inf', now_ms - tonumber(ARGV[5]))
+redis.call('PEXPIRE', participants, ARGV[5])
+local n = redis.call('ZCARD', participants)
+
+local global_key = prefix .. ':w:' .. window
+local own_key = global_key .. ':' .. ARGV[1]
+local used = tonumber(redis.call('GET', global_key) or '0')
+local mine = tonumber(redis.call('GET', own_key) or '0')
+local weight = tonumber(ARGV[2])
+local budget = tonumber(ARGV[3])
+
+if used + weight > budget then return wait_ms end
+if mine + weight > budget / n and used + weight > budget * tonumber(ARGV[6]) then return wait_ms end
+
+redis.call('INCRBY', global_key, weight)
+redis.call('PEXPIRE', global_key, window_ms * 2)
+redis.call('INCRBY', own_key, weight)
+redis.call('PEXPIRE', own_key, window_ms * 2)
+return 0
+"""
+
+
+class RedisQuotaBackend:
+    """
+    Contabilidad compartida en Redis (script Lua atómico por petición de cuota)
+    """
+
+    def __init__(self, redis_client, prefix: str = QUOTA_KEY_PREFIX):
+        self.redis = redis_client
+        self.prefix = prefix
+        self._acquire = redis_client.register_script(_ACQUIRE_SCRIPT)
+
+    def try_acquire(self, participant: str, weight: int, budget: int, window: float) -> float:
+        wait_ms = self._acquire(
+            keys=[self.prefix],
+            args=[participant, weight, budget, int(window * 1000), int(PARTICIPANT_TTL_SECONDS * 1000), BORROW_FRACTION]
+        )
+        return int(wait_ms) / 1000
+
+    def block(self, seconds: float):
+        # Un 429 en cualquier worker pausa a todos durante el Retry-After
+        key = f"{self.prefix}:blocked"
+        ms = max(int(seconds * 1000), 1)
+        if self.redis.pttl(key) < ms:
+            self.redis.set(key, 1, px=ms)
+
+    def usage(self, window: float) -> Tuple[int, float]:
+        # Ventana según el reloj local: solo orienta la elección de credencial
+        window_ms = int(window * 1000)
+        current = int(time.time() * 1000) // window_ms
+        pipe = self.redis.pipeline()
+        pipe.get(f"{self.prefix}:w:{current}")
+        pipe.pttl(f"{self.prefix}:blocked")
+        used, blocked_ms = pipe.execute()
+        return int(used or 0), max(blocked_ms, 0) / 1000
+
+    def describe(self) -> str:
+        return "redis"
+
+
+class QuotaCoordinator:
+    """
+    Reparte un presupuesto global de llamadas entre todos los participantes
+
+    - Cada llamada consume su peso de endpoint de la ventana actual
+    - Reparto justo: cada participante activo tiene derecho a presupuesto / N; puede
+      tomar prestada capacidad ociosa hasta BORROW_FRACTION del total
+    - Un 429 bloquea a todos los participantes durante el Retry-After
+    - Si Redis falla se sigue con la contabilidad local del proceso y se vuelve a
+      probar Redis cada QUOTA_REDIS_RETRY_SECONDS (gauge spotify_quota_degraded)
+    - Prioridad: en el proceso, las llamadas en segundo plano esperan mientras haya
+      interactivas en cola; entre procesos, solo pueden consumir
+      BACKGROUND_BUDGET_FRACTION de cada ventana
+    """
+
+    def __init__(self, backend=None, calls_per_second: float = SPOTIFY_CALLS_PER_SECOND,
+                 window: float = QUOTA_WINDOW_SECONDS, weights: Optional[Dict[str, int]] = None,
+                 max_wait: float = QUOTA_MAX_WAIT_SECONDS, prefix: str = QUOTA_KEY_PREFIX):
+        self._backend = backend
+        self.prefix = prefix
+        self._backend_lock = threading.Lock()
+        # Backend Redis apartado mientras se usa la cuota local, y cuándo reintentarlo
+        self._degraded_from = None
+        self._retry_at = 0.0
+        self.window = window
+        self.budget = max(int(calls_per_second * window), 1)
+        self.weights = weights if weights is not None else endpoint_weights()
+        self.max_wait = max_wait
+        self.participant = f"{socket.gethostname()}:{os.getpid()}"
+        self._queue = threading.Condition()
+        self._waiting = {name: 0 for name in CALL_CLASSES}
+
+    @property
+    def backend(self):
+        if self._degraded_from is not None and time.monotonic() >= self._retry_at:
+            with self._backend_lock:
+                if self._degraded_from is not None and time.monotonic() >= self._retry_at:
+                    # Se vuelve a Redis; si sigue caído, la próxima llamada cae otra vez a local
+                    print(f"🔁 Cuota de Spotify {self.prefix}: reintentando Redis")
+                    self._backend, self._degraded_from = self._degraded_from, None
+                    SPOTIFY_QUOTA_DEGRADED.set(0, coordinator=self.prefix)
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    redis_client = get_redis()
+                    self._backend = (
+                        RedisQuotaBackend(redis_client, self.prefix) if redis_client is not None else MemoryQuotaBackend()
+                    )
+                    print(f"🚦 Cuota de Spotify {self.prefix}: {self.budget} por {self.window:g}s ({self._backend.describe()})")
+        return self._backend
+
+    def _fallback(self, error: Exception):
+        with self._backend_lock:
+            if self._degraded_from is None:
+                print(f"⚠️ Coordinador de cuota no disponible ({error}), usando cuota local "
+                      f"durante {QUOTA_REDIS_RETRY_SECONDS:g}s")
+                self._degraded_from = self._backend
+                self._backend = MemoryQuotaBackend()
+            self._retry_at = time.monotonic() + QUOTA_REDIS_RETRY_SECONDS
+            SPOTIFY_QUOTA_DEGRADED.set(1, coordinator=self.prefix)
+
+    @property
+    def degraded(self) -> bool:
+        return self._degraded_from is not None
+
+    def weight(self, endpoint: str) -> int:
+        return min(self.weights.get(endpoint, 1), self.budget)
+
+    def budget_for(self, klass: str) -> int:
+        if klass == BACKGROUND:
+            return max(int(self.budget * BACKGROUND_BUDGET_FRACTION), 1)
+        return self.budget
+
+    def remaining(self) -> Tuple[float, float]:
+        """
+        (fracción del presupuesto libre en la ventana actual, segundos de bloqueo por 429)
+        """
+        try:
+            used, blocked = self.backend.usage(self.window)
+        except Exception:
+            return 1.0, 0.0
+        return max(1 - used / self.budget, 0.0), blocked
+
+    def queue_depth(self) -> Dict[str, int]:
+        with self._queue:
+            return dict(self._waiting)
+
+    def acquire(self, endpoint: str) -> float:
+        """
+        Bloquea hasta obtener cuota para una llamada (según la clase del contexto
+        actual); devuelve los segundos esperados
+        """
+        klass = current_call_class()
+        budget = self.budget_for(klass)
+        weight = min(self.weight(endpoint), budget)
+
+        with self._queue:
+            self._waiting[klass] += 1
+        SPOTIFY_QUEUE_DEPTH.inc(**{"class": klass})
+        start = time.perf_counter()
+        try:
+            return self._acquire(endpoint, klass, weight, budget)
+        finally:
+            with self._queue:
+                self._waiting[klass] -= 1
+                self._queue.notify_all()
+            SPOTIFY_QUEUE_DEPTH.dec(**{"class": klass})
+            SPOTIFY_QUEUE_WAIT.observe(time.perf_counter() - start, **{"class": klass})
+
+    def _yield_to_interactive(self):
+        with self._queue:
+            while self._waiting[INTERACTIVE] > 0:
+                self._queue.wait(BACKGROUND_YIELD_SECONDS)
+
+    def _acquire(self, endpoint: str, klass: str, weight: int, budget: int) -> float:
+        waited = 0.0
+
+        while True:
+            if klass == BACKGROUND:
+                with span("sleep"):
+                    self._yield_to_interactive()
+
+            try:
+                wait = self.backend.try_acquire(self.participant, weight, budget, self.window)
+            except Exception as e:
+                self._fallback(e)
+                continue
+
+            if wait <= 0:
+                SPOTIFY_QUOTA_ACQUISITIONS.inc(result="waited" if waited else "granted")
+                return waited
+
+            if waited + wait > self.max_wait:
+                print(f"⚠️ Sin cuota para {endpoint} tras {waited:.1f}s, se llama igualmente")
+                SPOTIFY_QUOTA_ACQUISITIONS.inc(result="timeout")
+                return waited
+
+            # Jitter para que los workers bloqueados no reintenten a la vez
+            wait += random.uniform(0, 0.05)
+            with span("sleep"):
+                time.sleep(wait)
+            RATE_LIMIT_WAIT.inc(wait, source="quota")
+            waited += wait
+
+    def block(self, seconds: float):
+        try:
+            self.backend.block(seconds)
+        except Exception as e:
+            self._fallback(e)
+            self.backend.block(seconds)
+
+
+class CallClassMiddleware(BaseHTTPMiddleware):
+    """
+    Permite a clientes internos (cron, scripts de backfill) marcar sus peticiones como
+    segundo plano con la cabecera X-Call-Class: background. Solo se puede bajar la prioridad.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        if request.headers.get("x-call-class", "").lower() != BACKGROUND:
+            return await call_next(request)
+        token = _call_class.set(BACKGROUND)
+        try:
+            return await call_next(request)
+        finally:
+            _call_class.reset(token)
+
+
+quota = QuotaCoordinator()
@@ -0,0 +1,31 @@
+"""
+Conexión compartida a Redis (opcional)
+Solo se usa si hay REDIS_URL y el paquete redis está instalado; si no, cada
+módulo recurre a su alternativa local (fichero, memoria)
+"""
+import os
+import threading
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Cliente Redis del proceso, o None si no está configurado / disponible
+    """
+    global _client
+
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        return None
+
+    with _lock:
+        if _client is None:
+            try:
+                import redis
+            except ImportError:
+                print("⚠️ REDIS_URL definido pero el paquete redis no está instalado")
+                return None
+            _client = redis.Redis.from_url(redis_url, socket_timeout=2, socket_connect_timeout=2)
+        return _client
@@ -3,32 +3,82 @@ Sistema de autenticación OAuth para Spotify
 Permite autenticación de usuario para acceder a audio features en Development Mode
 """
 import os
-from spotipy.oauth2 import SpotifyOAuth, SpotifyClientCredentials
-import spotipy
+from spotipy.oauth2 import SpotifyOAuth
 
-def get_spotify_client_with_oauth():
+from .credential_pool import PooledAuthManager, get_credential_pool, load_credentials
+from .spotify_client import InstrumentedSpotify
+
+
+def _use_accounts_url(auth_manager):
     """
-    Cliente Spotify con OAuth (requiere autenticación de usuario)
-    Usar para features avanzados como audio-features en Development Mode
+    Apunta el auth manager a otro servidor de cuentas (SPOTIFY_ACCOUNTS_URL),
+    p.ej. el stand-in local de tools/spotify_stub.py
     """
-    client_id = os.getenv("SPOTIFY_CLIENT_ID")
-    client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-    redirect_uri = os.getenv("SPOTIFY_REDIRECT_URI", "http://localhost:8000/callback")
+    accounts_url = os.getenv("SPOTIFY_ACCOUNTS_URL")
+    if accounts_url:
+        accounts_url = accounts_url.rstrip("/")
+        auth_manager.OAUTH_TOKEN_URL = f"{accounts_url}/api/token"
+        if hasattr(auth_manager, "OAUTH_AUTHORIZE_URL"):
+            auth_manager.OAUTH_AUTHORIZE_URL = f"{accounts_url}/authorize"
+    return auth_manager
 
-    if not client_id or not client_secret:
+# Permisos pedidos al usuario
+OAUTH_SCOPE = "user-library-read user-top-read"
+
+
+def build_oauth_manager(cache_handler=None, manager_class=SpotifyOAuth, open_browser=True):
+    """
+    SpotifyOAuth contra la app principal (primer par configurado)
+
+    Args:
+        cache_handler: Dónde guardar el token (por defecto el fichero local .spotify_cache)
+        manager_class: SpotifyOAuth o una subclase (ver user_clients.UserOAuth)
+    """
+    credentials = load_credentials()
+    if not credentials:
         return None
 
+    client_id, client_secret = credentials[0]
+    auth_manager = manager_class(
+        client_id=client_id,
+        client_secret=client_secret,
+        redirect_uri=os.getenv("SPOTIFY_REDIRECT_URI", "http://localhost:8000/callback"),
+        scope=OAUTH_SCOPE,
+        cache_path=None if cache_handler is not None else ".spotify_cache",
+        cache_handler=cache_handler,
+        open_browser=open_browser
+    )
+    return _use_accounts_url(auth_manager)
+
+
+def oauth_quota():
+    """
+    Cuota de la app principal (la de build_oauth_manager): los clientes OAuth
+    gastan del mismo presupuesto que sus llamadas con Client Credentials
+    """
+    pool = get_credential_pool()
+    return pool.credentials[0].quota if pool is not None else None
+
+
+def get_spotify_client_with_oauth(user_id=None):
+    """
+    Cliente Spotify con OAuth (requiere autenticación de usuario)
+    Usar para features avanzados como audio-features en Development Mode
+
+    Args:
+        user_id: Usuario autenticado vía /auth/login (token en BD, sin navegador).
+                 Sin user_id se usa el flujo local de un solo usuario (.spotify_cache)
+    """
+    if user_id is not None:
+        from .user_clients import user_clients
+        return user_clients.get(user_id)
+
     try:
-        auth_manager = SpotifyOAuth(
-            client_id=client_id,
-            client_secret=client_secret,
-            redirect_uri=redirect_uri,
-            scope="user-library-read user-top-read",
-            cache_path=".spotify_cache",
-            open_browser=True
-        )
-
-        return spotipy.Spotify(auth_manager=auth_manager)
+        auth_manager = build_oauth_manager()
+        if auth_manager is None:
+            return None
+
+        return InstrumentedSpotify(auth_manager=auth_manager, quota_coordinator=oauth_quota())
     except Exception as e:
         print(f"Error en OAuth: {e}")
         return None
@@ -38,19 +88,17 @@ def get_spotify_client_credentials():
     """
     Cliente Spotify con Client Credentials (sin autenticación de usuario)
     Funciona para búsquedas básicas
+    Las llamadas se reparten entre las credenciales del pool (ver credential_pool.py)
+    y cada token es compartido entre clientes y workers (ver token_cache.py)
     """
-    client_id = os.getenv("SPOTIFY_CLIENT_ID")
-    client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-
-    if not client_id or not client_secret:
+    pool = get_credential_pool()
+    if pool is None:
         return None
 
     try:
-        client_credentials_manager = SpotifyClientCredentials(
-            client_id=client_id,
-            client_secret=client_secret
-        )
-        return spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+        for credential in pool.credentials:
+            _use_accounts_url(credential.auth_manager)
+        return InstrumentedSpotify(auth_manager=PooledAuthManager(pool), pool=pool)
     except Exception as e:
         print(f"Error en Client Credentials: {e}")
         return None
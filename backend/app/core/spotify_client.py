@@ -0,0 +1,181 @@
+"""
+Cliente Spotify instrumentado
+Punto único por el que pasan todas las llamadas a la API de Spotify
+"""
+import os
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+import requests
+import spotipy
+from spotipy.exceptions import SpotifyException
+
+from .metrics import (
+    SPOTIFY_REQUESTS, SPOTIFY_REQUEST_DURATION, SPOTIFY_RATE_LIMITED, RATE_LIMIT_WAIT
+)
+from .credential_pool import use_credential
+from .rate_limit import quota
+from .timing import span
+
+# Los IDs de Spotify son base62 de 22 caracteres
+_SPOTIFY_ID = re.compile(r"^[0-9A-Za-z]{22}$")
+
+# Base de la API (se puede apuntar al stand-in local, ver tools/spotify_stub.py)
+DEFAULT_API_BASE_URL = "https://api.spotify.com/v1/"
+
+# Reintentos ante 429 respetando Retry-After
+MAX_RATE_LIMIT_RETRIES = 3
+MAX_RETRY_AFTER_SECONDS = 30
+
+
+def api_base_url() -> str:
+    """
+    Base de la API de Spotify (SPOTIFY_API_BASE_URL), siempre terminada en /
+    """
+    return os.getenv("SPOTIFY_API_BASE_URL", DEFAULT_API_BASE_URL).rstrip("/") + "/"
+
+
+def endpoint_name(method: str, url: str, prefix: str = "") -> str:
+    """
+    Normaliza una URL de Spotify a un nombre de endpoint (p.ej. GET playlists/{id}/tracks)
+    """
+    path = url[len(prefix):] if prefix and url.startswith(prefix) else url
+    path = re.sub(r"^https?://[^/]+/v1/", "", path).split("?")[0].strip("/")
+    segments = ["{id}" if _SPOTIFY_ID.match(s) else s for s in path.split("/")]
+    return f"{method} {'/'.join(segments)}"
+
+
+def throttle(seconds: float, source: str = "throttle"):
+    """
+    Pausa deliberada entre llamadas a Spotify (contabilizada como espera por rate limiting)
+    """
+    with span("sleep"):
+        time.sleep(seconds)
+    RATE_LIMIT_WAIT.inc(seconds, source=source)
+
+
+class SpotifyCallTracker:
+    """
+    Resultado de las últimas llamadas reales a Spotify (para el health check pasivo)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_success = None
+        self.last_failure = None
+        self.last_error = None
+        self.consecutive_failures = 0
+
+    def success(self):
+        with self._lock:
+            self.last_success = time.time()
+            self.consecutive_failures = 0
+
+    def failure(self, error: str):
+        with self._lock:
+            self.last_failure = time.time()
+            self.last_error = error
+            self.consecutive_failures += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "last_success": self.last_success,
+                "last_failure": self.last_failure,
+                "last_error": self.last_error,
+                "consecutive_failures": self.consecutive_failures
+            }
+
+
+call_tracker = SpotifyCallTracker()
+
+
+class InstrumentedSpotify(spotipy.Spotify):
+    """
+    spotipy.Spotify con métricas por endpoint (llamadas, latencia, 429).
+    Los 429 se sacan de los reintentos automáticos de spotipy para respetar
+    Retry-After aquí y poder medir la espera. Cada intento consume cuota global
+    (ver rate_limit.py).
+    """
+
+    def __init__(self, *args, pool=None, quota_coordinator=None, **kwargs):
+        """
+        Args:
+            pool: CredentialPool opcional; cada intento elige credencial (y su cuota)
+                  y un 429 pasa al siguiente par disponible en lugar de esperar
+            quota_coordinator: Cuota de los clientes sin pool (por defecto la global);
+                  los clientes OAuth usan la de la app con la que se autorizaron
+        """
+        kwargs.setdefault("status_forcelist", (500, 502, 503, 504))
+        super().__init__(*args, **kwargs)
+        self.prefix = api_base_url()
+        self.pool = pool
+        self.quota = quota_coordinator or quota
+
+    def _build_session(self):
+        super()._build_session()
+        # urllib3 reintenta por su cuenta los 429 con Retry-After aunque no estén en
+        # status_forcelist: se desactiva para que lleguen aquí (métricas, cuota, failover)
+        for scheme in ("http://", "https://"):
+            adapter = self._session.get_adapter(scheme)
+            adapter.max_retries = adapter.max_retries.new(respect_retry_after_header=False)
+
+    def _internal_call(self, method, url, payload, params):
+        endpoint = endpoint_name(method, url, self.prefix)
+
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            credential = self.pool.select() if self.pool is not None else None
+            (credential.quota if credential is not None else self.quota).acquire(endpoint)
+            start = time.perf_counter()
+            try:
+                with span("spotify"), (use_credential(credential) if credential is not None else nullcontext()):
+                    result = super()._internal_call(method, url, payload, params)
+                SPOTIFY_REQUESTS.inc(endpoint=endpoint, status="200")
+                call_tracker.success()
+                if credential is not None:
+                    self.pool.record_success(credential)
+                return result
+            except SpotifyException as e:
+                SPOTIFY_REQUESTS.inc(endpoint=endpoint, status=str(e.http_status))
+                # 4xx (p.ej. 403 de audio features) son respuestas válidas del servicio
+                if e.http_status == 429 or e.http_status >= 500:
+                    call_tracker.failure(f"{e.http_status} en {endpoint}")
+                else:
+                    call_tracker.success()
+                if credential is not None:
+                    if e.http_status == 429:
+                        self.pool.record_rate_limited(credential, self._retry_after(e))
+                    elif e.http_status >= 500:
+                        self.pool.record_failure(credential, f"{e.http_status} en {endpoint}")
+                    else:
+                        self.pool.record_success(credential)
+                if e.http_status != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise
+
+                SPOTIFY_RATE_LIMITED.inc(endpoint=endpoint)
+                retry_after = self._retry_after(e)
+                if credential is not None:
+                    if self.pool.available():
+                        print(f"🔀 Spotify 429 en {endpoint} con {credential.label}, reintentando con otra credencial")
+                        continue
+                else:
+                    self.quota.block(retry_after)
+                print(f"⏳ Spotify 429 en {endpoint}, esperando {retry_after}s")
+                throttle(retry_after, source="retry_after")
+            except requests.RequestException as e:
+                call_tracker.failure(f"{type(e).__name__} en {endpoint}")
+                if credential is not None:
+                    self.pool.record_failure(credential, f"{type(e).__name__} en {endpoint}")
+                raise
+            finally:
+                SPOTIFY_REQUEST_DURATION.observe(time.perf_counter() - start, endpoint=endpoint)
+
+    @staticmethod
+    def _retry_after(error: SpotifyException) -> float:
+        try:
+            retry_after = float(error.headers.get("Retry-After", 1))
+        except (TypeError, ValueError):
+            retry_after = 1.0
+        return min(max(retry_after, 0.0), MAX_RETRY_AFTER_SECONDS)
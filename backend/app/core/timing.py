@@ -0,0 +1,188 @@
+"""
+Desglose por petición del tiempo gastado (cabecera Server-Timing)
+Spotify, esperas deliberadas, base de datos y cómputo
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Categorías exclusivas: no se solapan entre sí, el resto del tiempo es cómputo
+EXCLUSIVE_CATEGORIES = {
+    "spotify": "Spotify API",
+    "sleep": "Esperas por rate limiting",
+    "db": "Base de datos",
+}
+
+# Cabecera para pedir el bloque _timings en el JSON (también ?_timings=1)
+TIMINGS_HEADER = "x-debug-timings"
+
+
+class RequestTimings:
+    """
+    Acumulador de tiempos de una petición (compartido por los hilos que la atienden)
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, category: str, seconds: float):
+        with self._lock:
+            self.totals[category] = self.totals.get(category, 0.0) + seconds
+            self.counts[category] = self.counts.get(category, 0) + 1
+
+    def summary(self) -> Dict[str, Dict]:
+        total = time.perf_counter() - self.started
+        with self._lock:
+            totals = dict(self.totals)
+            counts = dict(self.counts)
+
+        exclusive = sum(totals.get(c, 0.0) for c in EXCLUSIVE_CATEGORIES)
+        summary = {
+            name: {"ms": round(seconds * 1000, 1), "count": counts[name]}
+            for name, seconds in totals.items()
+        }
+        summary["compute"] = {"ms": round(max(total - exclusive, 0.0) * 1000, 1)}
+        summary["total"] = {"ms": round(total * 1000, 1)}
+        return summary
+
+    def server_timing(self) -> str:
+        entries = []
+        for name, data in self.summary().items():
+            entry = f"{name};dur={data['ms']}"
+            description = EXCLUSIVE_CATEGORIES.get(name)
+            if "count" in data:
+                description = f"{description or name} ({data['count']})"
+            if description:
+                entry += f';desc="{description}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+_active: ContextVar[frozenset] = ContextVar("active_spans", default=frozenset())
+_commit_state = threading.local()
+
+
+def record(category: str, seconds: float):
+    """
+    Suma tiempo a la petición en curso (no hace nada fuera de una petición)
+    """
+    timings = _current.get()
+    if timings is not None and category not in _active.get():
+        timings.add(category, seconds)
+
+
+@contextmanager
+def span(category: str):
+    """
+    Mide un bloque. Los spans anidados de la misma categoría no se cuentan dos veces.
+    """
+    timings = _current.get()
+    if timings is None or category in _active.get():
+        yield
+        return
+
+    token = _active.set(_active.get() | {category})
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _active.reset(token)
+        timings.add(category, time.perf_counter() - start)
+
+
+def timed(category: str):
+    """
+    Decorador: mide cada llamada a un método de servicio como un span
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_database(engine, session_factory):
+    """
+    Mide queries (eventos de cursor) y commits (eventos de sesión) como tiempo "db".
+    Las sentencias del flush dentro de un commit solo cuentan en el commit.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("timing_starts", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["timing_starts"].pop()
+        if not getattr(_commit_state, "start", None):
+            record("db", time.perf_counter() - start)
+
+    @event.listens_for(session_factory, "before_commit")
+    def _before_commit(session):
+        _commit_state.start = time.perf_counter()
+
+    def _end_commit(session):
+        start = getattr(_commit_state, "start", None)
+        _commit_state.start = None
+        if start:
+            record("db", time.perf_counter() - start)
+
+    event.listen(session_factory, "after_commit", _end_commit)
+    event.listen(session_factory, "after_rollback", _end_commit)
+
+
+def _wants_json_timings(request: Request) -> bool:
+    flag = request.headers.get(TIMINGS_HEADER) or request.query_params.get("_timings")
+    return (flag or "").lower() in ("1", "true", "yes", "on")
+
+
+class TimingMiddleware(BaseHTTPMiddleware):
+    """
+    Abre un acumulador por petición y devuelve el desglose en Server-Timing
+    (y como bloque `_timings` del JSON si se pide con X-Debug-Timings: 1)
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await call_next(request)
+        finally:
+            _current.reset(token)
+
+        if not _wants_json_timings(request) or not response.headers.get("content-type", "").startswith("application/json"):
+            response.headers["Server-Timing"] = timings.server_timing()
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+
+        headers = {
+            k: v for k, v in response.headers.items()
+            if k.lower() not in ("content-length", "etag", "cache-control")
+        }
+        headers["Cache-Control"] = "no-store"
+        if isinstance(payload, dict):
+            payload["_timings"] = timings.summary()
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers["Server-Timing"] = timings.server_timing()
+
+        return Response(content=body, status_code=response.status_code, headers=headers)
@@ -0,0 +1,313 @@
+"""
+Token de Client Credentials compartido entre workers
+El token vive en un almacén común (fichero con lock o Redis si hay REDIS_URL) y un
+hilo lo renueva antes de que caduque: las peticiones no pagan el refresco
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from spotipy.cache_handler import CacheHandler
+from spotipy.oauth2 import SpotifyClientCredentials
+
+from .metrics import Gauge, SPOTIFY_TOKEN_REFRESHES, registry
+from .redis_client import get_redis
+from .timing import span
+
+try:
+    import fcntl
+except ImportError:  # Windows: el lock de fichero solo protege dentro del proceso
+    fcntl = None
+
+# Margen antes de la caducidad en el que se renueva el token (segundos)
+TOKEN_REFRESH_AHEAD_SECONDS = float(os.getenv("TOKEN_REFRESH_AHEAD_SECONDS", 300))
+
+# Directorio del almacén en fichero (compartido por los workers de la máquina)
+TOKEN_CACHE_DIR = os.getenv("TOKEN_CACHE_DIR", tempfile.gettempdir())
+
+# Cada cuánto el refresher vuelve a mirar el almacén como máximo (otro worker pudo renovarlo)
+MAX_REFRESH_CHECK_SECONDS = 60
+
+# Espera máxima por el lock de refresco cuando el token ya ha caducado
+REFRESH_LOCK_TIMEOUT_SECONDS = 10
+
+
+def client_key(client_id: str) -> str:
+    return hashlib.sha1(client_id.encode()).hexdigest()[:12]
+
+
+class FileTokenStore(CacheHandler):
+    """
+    Token en un fichero JSON; el refresco se serializa entre procesos con flock
+    """
+
+    def __init__(self, client_id: str, directory: str = TOKEN_CACHE_DIR):
+        base = os.path.join(directory, f"spotify_token_{client_key(client_id)}")
+        self.path = base + ".json"
+        self.lock_path = base + ".lock"
+        self._thread_lock = threading.Lock()
+
+    def get_cached_token(self) -> Optional[Dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_token_to_cache(self, token_info: Dict):
+        # Escritura atómica: los lectores nunca ven un fichero a medias
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".spotify_token_")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(token_info, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el token en {self.path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @contextmanager
+    def refresh_lock(self, blocking: bool = True):
+        """
+        Lock exclusivo de refresco; produce False si no se consiguió
+        """
+        if not self._thread_lock.acquire(blocking, REFRESH_LOCK_TIMEOUT_SECONDS if blocking else -1):
+            yield False
+            return
+        try:
+            if fcntl is None:
+                yield True
+                return
+            with open(self.lock_path, "a") as lock_file:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                try:
+                    fcntl.flock(lock_file, flags)
+                except BlockingIOError:
+                    yield False
+                    return
+                try:
+                    yield True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+    def describe(self) -> str:
+        return f"file:{self.path}"
+
+
+class RedisTokenStore(CacheHandler):
+    """
+    Token en Redis (compartido también entre máquinas); lock de refresco con SET NX
+    """
+
+    def __init__(self, client_id: str, redis_client):
+        key = client_key(client_id)
+        self.redis = redis_client
+        self.key = f"spotify:token:{key}"
+        self.lock_key = f"spotify:token:{key}:lock"
+
+    def get_cached_token(self) -> Optional[Dict]:
+        try:
+            raw = self.redis.get(self.key)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            print(f"⚠️ Error leyendo el token de Redis: {e}")
+            return None
+
+    def save_token_to_cache(self, token_info: Dict):
+        try:
+            ttl = max(int(token_info["expires_at"] - time.time()), 1)
+            self.redis.set(self.key, json.dumps(token_info), ex=ttl)
+        except Exception as e:
+            print(f"⚠️ Error guardando el token en Redis: {e}")
+
+    @contextmanager
+    def refresh_lock(self, blocking: bool = True):
+        owner = uuid.uuid4().hex
+        deadline = time.time() + REFRESH_LOCK_TIMEOUT_SECONDS
+        try:
+            acquired = bool(self.redis.set(self.lock_key, owner, nx=True, ex=REFRESH_LOCK_TIMEOUT_SECONDS))
+            while not acquired and blocking and time.time() < deadline:
+                time.sleep(0.05)
+                acquired = bool(self.redis.set(self.lock_key, owner, nx=True, ex=REFRESH_LOCK_TIMEOUT_SECONDS))
+        except Exception as e:
+            # Sin Redis se refresca igualmente (cada worker por su cuenta)
+            print(f"⚠️ Lock de Redis no disponible: {e}")
+            yield True
+            return
+
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    if self.redis.get(self.lock_key) in (owner, owner.encode()):
+                        self.redis.delete(self.lock_key)
+                except Exception:
+                    pass
+
+    def describe(self) -> str:
+        return f"redis:{self.key}"
+
+
+def build_token_store(client_id: str) -> CacheHandler:
+    """
+    RedisTokenStore si hay REDIS_URL y el paquete redis está instalado; si no, FileTokenStore
+    """
+    redis_client = get_redis()
+    if redis_client is not None:
+        return RedisTokenStore(client_id, redis_client)
+    return FileTokenStore(client_id)
+
+
+class SharedClientCredentials(SpotifyClientCredentials):
+    """
+    Client Credentials con token compartido y renovación anticipada
+
+    - El token se lee del almacén común y se guarda en memoria mientras esté lejos de caducar
+    - Un hilo de fondo lo renueva TOKEN_REFRESH_AHEAD_SECONDS antes de la caducidad;
+      con varios workers solo uno consigue el lock y los demás leen el nuevo del almacén
+    - Si aun así caduca (p.ej. arranque en frío), la petición lo renueva bajo lock bloqueante
+    """
+
+    def __init__(self, client_id: str, client_secret: str, store: Optional[CacheHandler] = None,
+                 refresh_ahead: float = TOKEN_REFRESH_AHEAD_SECONDS):
+        super().__init__(
+            client_id=client_id,
+            client_secret=client_secret,
+            cache_handler=store or build_token_store(client_id)
+        )
+        self.refresh_ahead = refresh_ahead
+        self._token: Optional[Dict] = None
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # --- API de spotipy ---
+
+    def get_access_token(self, as_dict=False, check_cache=True):
+        token_info = self._current_token() if check_cache else None
+        if token_info is None or self.is_token_expired(token_info):
+            token_info = self._refresh(blocking=True, reason="expired")
+
+        # El refresher arranca con un token ya cargado para calcular su primer vencimiento
+        self._ensure_refresher()
+
+        return token_info if as_dict else token_info["access_token"]
+
+    def get_cached_token(self) -> Optional[Dict]:
+        return self._current_token()
+
+    # --- Estado ---
+
+    def _needs_refresh(self, token_info: Dict) -> bool:
+        return token_info["expires_at"] - time.time() < self.refresh_ahead
+
+    def _current_token(self) -> Optional[Dict]:
+        """
+        Token en memoria; solo se relee el almacén cuando entra en la ventana de refresco
+        """
+        token_info = self._token
+        if token_info is None or self._needs_refresh(token_info):
+            stored = self.cache_handler.get_cached_token()
+            if stored and (token_info is None or stored["expires_at"] > token_info["expires_at"]):
+                token_info = self._token = stored
+        return token_info
+
+    def _refresh(self, blocking: bool, reason: str) -> Optional[Dict]:
+        with self.cache_handler.refresh_lock(blocking) as acquired:
+            if not acquired:
+                if blocking:
+                    raise RuntimeError("No se pudo obtener el lock de refresco del token de Spotify")
+                return None
+
+            # Otro worker pudo renovarlo mientras esperábamos el lock
+            stored = self.cache_handler.get_cached_token()
+            if stored and not self._needs_refresh(stored):
+                self._token = stored
+                return stored
+
+            with span("spotify"):
+                token_info = self._request_access_token()
+            token_info = self._add_custom_values_to_token_info(token_info)
+            token_info["obtained_at"] = int(time.time())
+            self.cache_handler.save_token_to_cache(token_info)
+            self._token = token_info
+
+        SPOTIFY_TOKEN_REFRESHES.inc(reason=reason)
+        print(f"🔑 Token de Spotify renovado ({reason}, {self.cache_handler.describe()})")
+        return token_info
+
+    def token_age(self) -> Optional[float]:
+        token_info = self._token
+        if token_info is None or "obtained_at" not in token_info:
+            return None
+        return time.time() - token_info["obtained_at"]
+
+    # --- Refresco en segundo plano ---
+
+    def _ensure_refresher(self):
+        if self._refresher is not None:
+            return
+        with self._refresher_lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._run, name="spotify-token-refresher", daemon=True)
+                self._refresher.start()
+
+    def _next_check(self) -> float:
+        token_info = self._token
+        if token_info is None:
+            return MAX_REFRESH_CHECK_SECONDS
+        due = token_info["expires_at"] - self.refresh_ahead - time.time()
+        return min(max(due, 1), MAX_REFRESH_CHECK_SECONDS)
+
+    def _run(self):
+        while not self._stop.wait(self._next_check()):
+            token_info = self._current_token()
+            if token_info is not None and not self._needs_refresh(token_info):
+                continue
+            try:
+                self._refresh(blocking=False, reason="ahead")
+            except Exception as e:
+                print(f"⚠️ Error renovando el token de Spotify: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+
+_managers: Dict[str, SharedClientCredentials] = {}
+_managers_lock = threading.Lock()
+
+
+def shared_client_credentials(client_id: str, client_secret: str) -> SharedClientCredentials:
+    """
+    Auth manager único por client_id en el proceso (lo comparten todos los clientes)
+    """
+    with _managers_lock:
+        manager = _managers.get(client_id)
+        if manager is None or manager.client_secret != client_secret:
+            manager = _managers[client_id] = SharedClientCredentials(client_id, client_secret)
+        return manager
+
+
+def _token_ages() -> Dict:
+    ages = {}
+    for client_id, manager in list(_managers.items()):
+        age = manager.token_age()
+        if age is not None:
+            ages[(client_key(client_id),)] = round(age, 1)
+    return ages
+
+
+SPOTIFY_TOKEN_AGE = registry.register(Gauge(
+    "spotify_token_age_seconds", "Antigüedad del token de Client Credentials en uso",
+    labels=("client",), callback=_token_ages
+))
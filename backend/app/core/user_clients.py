@@ -0,0 +1,410 @@
+"""
+Clientes Spotify por usuario (OAuth multiusuario)
+Los tokens de cada usuario viven en BD (user_tokens); los clientes se guardan en una
+caché LRU y un hilo renueva sus tokens antes de que caduquen, fuera del camino de las peticiones
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from spotipy.cache_handler import CacheHandler
+from spotipy.oauth2 import SpotifyOAuth, SpotifyOauthError
+
+from .database import SessionLocal
+from .metrics import Counter, Gauge, registry
+from .spotify_auth import build_oauth_manager, oauth_quota
+from .spotify_client import InstrumentedSpotify
+from .timing import span
+from .token_cache import TOKEN_REFRESH_AHEAD_SECONDS
+from ..models.user import OAuthState, UserToken
+
+# Clientes de usuario en memoria por proceso
+USER_CLIENT_CACHE_SIZE = int(os.getenv("USER_CLIENT_CACHE_SIZE", 256))
+
+# Cada cuánto el refresher revisa los tokens de los clientes en caché (segundos)
+USER_REFRESH_CHECK_SECONDS = 30
+
+# Validez del parámetro state del flujo OAuth (segundos)
+OAUTH_STATE_MAX_AGE_SECONDS = 600
+
+# Validez de las sesiones X-User-Session (segundos, por defecto 30 días)
+SESSION_MAX_AGE_SECONDS = int(os.getenv("SESSION_MAX_AGE_SECONDS", 30 * 24 * 3600))
+
+USER_CLIENT_CACHE_EVENTS = registry.register(Counter(
+    "user_client_cache_total", "Caché de clientes por usuario (hit / load / miss / eviction)",
+    labels=("result",)
+))
+USER_TOKEN_REFRESHES = registry.register(Counter(
+    "spotify_user_token_refreshes_total", "Renovaciones de tokens OAuth de usuario (ahead / expired)",
+    labels=("reason",)
+))
+
+
+# --- Sesiones y state firmados (SECRET_KEY) ---
+
+_fallback_secret = secrets.token_bytes(32)
+
+
+def _secret() -> bytes:
+    secret = os.getenv("SECRET_KEY")
+    # Sin SECRET_KEY las sesiones solo valen en este proceso
+    return secret.encode() if secret else _fallback_secret
+
+
+def check_secret_key():
+    """
+    Al arrancar: sin SECRET_KEY cada worker firma con su propia clave y las sesiones
+    y el state de OAuth fallan según el worker que responda
+    """
+    if os.getenv("SECRET_KEY"):
+        return
+    if int(os.getenv("WEB_CONCURRENCY", "1") or 1) > 1:
+        raise RuntimeError("SECRET_KEY es obligatoria con varios workers (WEB_CONCURRENCY > 1)")
+    print("🚨 SECRET_KEY no configurada: las sesiones de usuario solo valen en este proceso "
+          "y se pierden al reiniciar. Configúrala antes de usar varios workers.")
+
+
+def _sign(value: str) -> str:
+    digest = hmac.new(_secret(), value.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def _unsign(signed: str) -> Optional[str]:
+    value, _, signature = (signed or "").rpartition(".")
+    if not value or not hmac.compare_digest(_sign(value), signature):
+        return None
+    return value
+
+
+def create_session(user_id: str, nonce: str) -> str:
+    """
+    Token opaco que identifica al usuario en las peticiones (cabecera X-User-Session)
+
+    Lleva el nonce de sesión guardado en user_tokens (cambia en cada login y
+    desaparece con el logout) y la fecha de emisión (caduca a SESSION_MAX_AGE_SECONDS)
+    """
+    value = f"{user_id}:{nonce}:{int(time.time())}"
+    return f"{value}.{_sign(value)}"
+
+
+def read_session(session: str, session_factory=SessionLocal) -> Optional[str]:
+    """
+    user_id de una sesión válida, o None si la firma no cuadra, ha caducado o
+    fue revocada (nuevo login o logout)
+    """
+    value = _unsign(session)
+    if value is None:
+        return None
+    try:
+        user_id, nonce, issued_at = value.rsplit(":", 2)
+        issued_at = int(issued_at)
+    except ValueError:
+        return None
+    if time.time() - issued_at > SESSION_MAX_AGE_SECONDS:
+        return None
+
+    db = session_factory()
+    try:
+        row = db.get(UserToken, user_id)
+        current = row.session_nonce if row else None
+    finally:
+        db.close()
+    if not current or not hmac.compare_digest(current, nonce):
+        return None
+    return user_id
+
+
+def create_oauth_state(session_factory=SessionLocal) -> str:
+    """
+    state firmado para /auth/login; se registra en BD para que sea de un solo uso
+    """
+    nonce = f"{secrets.token_urlsafe(16)}:{int(time.time())}"
+    db = session_factory()
+    try:
+        # De paso, fuera los state caducados que nunca volvieron
+        expired = datetime.utcnow() - timedelta(seconds=OAUTH_STATE_MAX_AGE_SECONDS)
+        db.query(OAuthState).filter(OAuthState.created_at < expired).delete()
+        db.add(OAuthState(nonce=nonce))
+        db.commit()
+    finally:
+        db.close()
+    return f"{nonce}.{_sign(nonce)}"
+
+
+def verify_oauth_state(state: str, session_factory=SessionLocal) -> bool:
+    """
+    Valida y consume el state: un /callback repetido con el mismo state falla
+    """
+    nonce = _unsign(state)
+    if nonce is None:
+        return False
+    try:
+        issued_at = int(nonce.rsplit(":", 1)[1])
+    except (IndexError, ValueError):
+        return False
+    if time.time() - issued_at > OAUTH_STATE_MAX_AGE_SECONDS:
+        return False
+
+    db = session_factory()
+    try:
+        consumed = db.query(OAuthState).filter(OAuthState.nonce == nonce).delete()
+        db.commit()
+    finally:
+        db.close()
+    return consumed == 1
+
+
+# --- Almacén de tokens ---
+
+class DatabaseTokenHandler(CacheHandler):
+    """
+    Token de un usuario en la tabla user_tokens, con copia en memoria
+    """
+
+    def __init__(self, user_id: str, session_factory=SessionLocal):
+        self.user_id = user_id
+        self._session_factory = session_factory
+        self._token: Optional[Dict] = None
+        self._locked_row: Optional[UserToken] = None
+
+    def get_cached_token(self) -> Optional[Dict]:
+        if self._token is None:
+            self._token = self.load()
+        return self._token
+
+    def load(self) -> Optional[Dict]:
+        db = self._session_factory()
+        try:
+            row = db.get(UserToken, self.user_id)
+            return row.to_token_info() if row else None
+        finally:
+            db.close()
+
+    def save_token_to_cache(self, token_info: Dict, display_name: Optional[str] = None,
+                            session_nonce: Optional[str] = None):
+        if self._locked_row is not None:
+            # Renovación en curso: se escribe en la fila bloqueada (misma transacción)
+            self._apply(self._locked_row, token_info, display_name, session_nonce)
+        else:
+            db = self._session_factory()
+            try:
+                row = db.get(UserToken, self.user_id)
+                if row is None:
+                    row = UserToken(user_id=self.user_id)
+                    db.add(row)
+                self._apply(row, token_info, display_name, session_nonce)
+                db.commit()
+            finally:
+                db.close()
+        self._token = token_info
+
+    @staticmethod
+    def _apply(row: UserToken, token_info: Dict, display_name: Optional[str], session_nonce: Optional[str] = None):
+        row.access_token = token_info["access_token"]
+        row.refresh_token = token_info.get("refresh_token") or row.refresh_token
+        row.token_type = token_info.get("token_type", "Bearer")
+        row.scope = token_info.get("scope")
+        row.expires_at = token_info["expires_at"]
+        if display_name is not None:
+            row.display_name = display_name
+        if session_nonce is not None:
+            row.session_nonce = session_nonce
+
+    @contextmanager
+    def locked(self):
+        """
+        Fila del usuario bloqueada (SELECT ... FOR UPDATE) para renovar sin carreras
+        entre workers; produce el token_info actual o None si el usuario no existe
+        """
+        db = self._session_factory()
+        try:
+            row = db.query(UserToken).filter(UserToken.user_id == self.user_id).with_for_update().first()
+            self._locked_row = row
+            try:
+                yield row.to_token_info() if row else None
+            finally:
+                self._locked_row = None
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def remember(self, token_info: Dict):
+        self._token = token_info
+
+    def delete(self):
+        db = self._session_factory()
+        try:
+            db.query(UserToken).filter(UserToken.user_id == self.user_id).delete()
+            db.commit()
+        finally:
+            db.close()
+        self._token = None
+
+
+class UserOAuth(SpotifyOAuth):
+    """
+    SpotifyOAuth sin flujo interactivo: si el usuario no tiene token en BD hay que
+    pasar por /auth/login. Las renovaciones se serializan por usuario.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._refresh_lock = threading.Lock()
+
+    def get_access_token(self, code=None, as_dict=False, check_cache=True):
+        token_info = self.cache_handler.get_cached_token()
+        if token_info is None:
+            raise SpotifyOauthError("Usuario sin token de Spotify, requiere /auth/login")
+        if self.is_token_expired(token_info):
+            token_info = self.refresh(reason="expired")
+        return token_info if as_dict else token_info["access_token"]
+
+    def expires_in(self) -> Optional[float]:
+        token_info = self.cache_handler.get_cached_token()
+        return token_info["expires_at"] - time.time() if token_info else None
+
+    def refresh(self, reason: str, ahead: float = 0) -> Dict:
+        with self._refresh_lock, self.cache_handler.locked() as token_info:
+            if token_info is None:
+                raise SpotifyOauthError("Usuario sin token de Spotify, requiere /auth/login")
+
+            # Otro worker pudo renovarlo mientras esperábamos el lock
+            if token_info["expires_at"] - time.time() > max(ahead, 60):
+                self.cache_handler.remember(token_info)
+                return token_info
+
+            with span("spotify"):
+                token_info = self.refresh_access_token(token_info["refresh_token"])
+
+        USER_TOKEN_REFRESHES.inc(reason=reason)
+        return token_info
+
+
+# --- Caché de clientes ---
+
+class UserClientCache:
+    """
+    Clientes InstrumentedSpotify por usuario con expulsión LRU
+
+    - get() no toca la red: el token se lee de BD la primera vez y luego de memoria
+    - Un hilo de fondo renueva los tokens que caducan en menos de refresh_ahead segundos
+    - Seguro entre hilos; entre workers la renovación se serializa con la fila en BD
+    """
+
+    def __init__(self, capacity: int = USER_CLIENT_CACHE_SIZE, refresh_ahead: float = TOKEN_REFRESH_AHEAD_SECONDS):
+        self.capacity = capacity
+        self.refresh_ahead = refresh_ahead
+        self._clients: "OrderedDict[str, InstrumentedSpotify]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def get(self, user_id: str) -> Optional[InstrumentedSpotify]:
+        with self._lock:
+            client = self._clients.get(user_id)
+            if client is not None:
+                self._clients.move_to_end(user_id)
+                USER_CLIENT_CACHE_EVENTS.inc(result="hit")
+                return client
+
+        # Construcción fuera del lock (lee la BD)
+        handler = DatabaseTokenHandler(user_id)
+        if handler.get_cached_token() is None:
+            USER_CLIENT_CACHE_EVENTS.inc(result="miss")
+            return None
+        auth_manager = build_oauth_manager(cache_handler=handler, manager_class=UserOAuth, open_browser=False)
+        if auth_manager is None:
+            return None
+        client = InstrumentedSpotify(auth_manager=auth_manager, quota_coordinator=oauth_quota())
+
+        with self._lock:
+            existing = self._clients.get(user_id)
+            if existing is not None:
+                self._clients.move_to_end(user_id)
+                return existing
+            self._clients[user_id] = client
+            USER_CLIENT_CACHE_EVENTS.inc(result="load")
+            while len(self._clients) > self.capacity:
+                self._clients.popitem(last=False)
+                USER_CLIENT_CACHE_EVENTS.inc(result="eviction")
+
+        self._ensure_refresher()
+        return client
+
+    def save(self, user_id: str, token_info: Dict, display_name: Optional[str] = None) -> str:
+        """
+        Guarda el token obtenido en /callback (sustituye al cliente en caché si lo había)
+        y devuelve el nonce de la nueva sesión (las sesiones anteriores dejan de valer)
+        """
+        session_nonce = secrets.token_urlsafe(16)
+        DatabaseTokenHandler(user_id).save_token_to_cache(token_info, display_name, session_nonce=session_nonce)
+        self.discard(user_id)
+        return session_nonce
+
+    def discard(self, user_id: str):
+        with self._lock:
+            self._clients.pop(user_id, None)
+
+    def remove(self, user_id: str):
+        """
+        Logout: borra el token de BD y el cliente de la caché
+        """
+        DatabaseTokenHandler(user_id).delete()
+        self.discard(user_id)
+
+    # --- Renovación anticipada ---
+
+    def refresh_due(self):
+        with self._lock:
+            clients = list(self._clients.items())
+
+        for user_id, client in clients:
+            auth_manager = client.auth_manager
+            expires_in = auth_manager.expires_in()
+            if expires_in is None or expires_in > self.refresh_ahead:
+                continue
+            try:
+                auth_manager.refresh(reason="ahead", ahead=self.refresh_ahead)
+            except SpotifyOauthError as e:
+                # Token revocado o usuario borrado: fuera de la caché
+                print(f"⚠️ No se pudo renovar el token de {user_id}: {e}")
+                self.discard(user_id)
+            except Exception as e:
+                print(f"⚠️ Error renovando el token de {user_id}: {e}")
+
+    def _ensure_refresher(self):
+        if self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._run, name="user-token-refresher", daemon=True)
+                self._refresher.start()
+
+    def _run(self):
+        while not self._stop.wait(USER_REFRESH_CHECK_SECONDS):
+            self.refresh_due()
+
+    def stop(self):
+        self._stop.set()
+
+
+user_clients = UserClientCache()
+
+registry.register(Gauge(
+    "user_client_cache_size", "Clientes de usuario en la caché del proceso",
+    callback=lambda: {(): len(user_clients)}
+))
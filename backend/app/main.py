@@ -1,19 +1,28 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-import os
 from dotenv import load_dotenv
 
 # Importar configuración de base de datos
 from .core.database import get_db, create_tables, engine
+from .core.credential_pool import get_credential_pool, load_credentials
+from .core.health import health_monitor, database_probe, spotify_probe
+from .core.http_cache import HTTPCacheMiddleware
+from .core.migrations import run_migrations
+from .core.metrics import MetricsMiddleware, registry, register_engine_pool
+from .core.spotify_auth import get_spotify_client_credentials
+from .core.timing import TimingMiddleware
+from .core.user_clients import check_secret_key, user_clients
+from .core.profiling import ProfilingMiddleware, is_authorized, profile_store
+from .core.rate_limit import CallClassMiddleware
 from .models.genre import Base as GenreBase
 from .models.artist import Base as ArtistBase
+from .models.user import Base as UserBase
 
 # Importar routers de API
-from .api import genres, artists
+from .api import genres, artists, auth
 
 # Cargar variables de entorno
 load_dotenv()
@@ -26,7 +35,24 @@ app = FastAPI(
     docs_url="/docs"
 )
 
-# Configurar CORS
+# Caché HTTP (ETag / Cache-Control / 304)
+app.add_middleware(HTTPCacheMiddleware)
+
+# Prioridad de las llamadas a Spotify (X-Call-Class: background para trabajo por lotes)
+app.add_middleware(CallClassMiddleware)
+
+# Métricas Prometheus (latencia por ruta, incluye las respuestas 304 de la caché)
+app.add_middleware(MetricsMiddleware)
+register_engine_pool(engine)
+
+# Desglose de tiempos por petición (Server-Timing; bloque _timings con X-Debug-Timings: 1)
+app.add_middleware(TimingMiddleware)
+
+# Profiling bajo demanda (?_profile=1 + X-Profile-Token), por fuera del resto para ver toda la petición
+app.add_middleware(ProfilingMiddleware)
+
+# Configurar CORS (el último añadido es el más externo: también cubre las respuestas
+# servidas desde la caché HTTP, los 304 y los perfiles)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -38,6 +64,7 @@ app.add_middleware(
 # Incluir routers de API
 app.include_router(genres.router)
 app.include_router(artists.router)
+app.include_router(auth.router)
 
 # Cliente Spotify
 spotify_client = None
@@ -47,38 +74,38 @@ def get_spotify_client():
     global spotify_client
     
     if spotify_client is None:
-        client_id = os.getenv("SPOTIFY_CLIENT_ID")
-        client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-        
-        if not client_id or not client_secret:
-            return None
-            
-        try:
-            client_credentials_manager = SpotifyClientCredentials(
-                client_id=client_id,
-                client_secret=client_secret
-            )
-            spotify_client = spotipy.Spotify(
-                client_credentials_manager=client_credentials_manager
-            )
-        except Exception as e:
-            print(f"Error inicializando Spotify: {e}")
-            return None
+        spotify_client = get_spotify_client_credentials()
     
     return spotify_client
 
+# Sondas de dependencias (en segundo plano; /health solo lee el estado cacheado)
+health_monitor.register("database", database_probe(engine))
+health_monitor.register("spotify", spotify_probe(get_spotify_client), critical=False)
+
 # Evento de startup - crear tablas
 @app.on_event("startup")
 async def startup_event():
     """Crear tablas al iniciar la aplicación"""
+    # Sin SECRET_KEY y con varios workers no se arranca (ver check_secret_key)
+    check_secret_key()
     try:
-        # Crear todas las tablas de géneros y artistas
+        # Crear todas las tablas de géneros, artistas y usuarios
         GenreBase.metadata.create_all(bind=engine)
         ArtistBase.metadata.create_all(bind=engine)
+        UserBase.metadata.create_all(bind=engine)
         print("✅ Tablas de base de datos creadas correctamente")
+        run_migrations(engine)
     except Exception as e:
         print(f"❌ Error creando tablas: {e}")
 
+    health_monitor.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Parar el refresco de health checks y de tokens de usuario"""
+    health_monitor.stop()
+    user_clients.stop()
+
 @app.get("/")
 async def root():
     """Endpoint raíz"""
@@ -110,38 +137,61 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
-    """Verificar salud del sistema"""
-    
-    # Probar conexión con base de datos
-    try:
-        db.execute(text("SELECT 1"))
-        database_status = "connected"
-    except Exception as e:
-        database_status = f"error: {str(e)}"
-    
-    # Probar conexión con Spotify
-    spotify = get_spotify_client()
-    spotify_status = "disconnected"
-    
-    if spotify:
-        try:
-            result = spotify.search(q="test", type="artist", limit=1)
-            spotify_status = "connected"
-        except Exception as e:
-            spotify_status = f"error: {str(e)}"
+async def health_check():
+    """Verificar salud del sistema (estado cacheado por el monitor de fondo)"""
+    database = health_monitor.state("database")
+    spotify = health_monitor.state("spotify")
+    database_status = database.status
+    spotify_status = spotify.status
+    pool = get_credential_pool()
     
     return {
         "status": "healthy",
         "database": database_status,
         "spotify_api": spotify_status,
-        "credentials_configured": bool(os.getenv("SPOTIFY_CLIENT_ID") and os.getenv("SPOTIFY_CLIENT_SECRET")),
+        "credentials_configured": bool(load_credentials()),
         "features_available": {
-            "genre_analysis": database_status == "connected" and spotify_status == "connected",
-            "artist_comparison": database_status == "connected" and spotify_status == "connected"
-        }
+            "genre_analysis": database.ok is True and spotify.ok is True,
+            "artist_comparison": database.ok is True and spotify.ok is True
+        },
+        "checks": health_monitor.snapshot(),
+        "spotify_credentials": pool.snapshot() if pool is not None else []
     }
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness: el proceso responde (sin tocar dependencias)"""
+    return {"status": "alive", "health_monitor_running": health_monitor.running}
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness: dependencias críticas OK según la última ronda de sondas"""
+    ready = health_monitor.ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": health_monitor.snapshot()}
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas en formato Prometheus"""
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request):
+    """Recuperar un perfil generado con ?_profile=1"""
+    if not is_authorized(request):
+        raise HTTPException(status_code=403, detail="Profiling no autorizado")
+
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Perfil '{profile_id}' no encontrado")
+
+    return {"status": "success", "data": profile}
+
 @app.get("/test/search/{artist_name}")
 async def test_search_artist(artist_name: str):
     """Probar búsqueda de artista"""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -9,6 +9,10 @@ class Artist(Base):
     Información básica de artistas para comparación
     """
     __tablename__ = "artists"
+    __table_args__ = (
+        # Listado por popularidad con paginación por cursor
+        Index("ix_artists_popularity_id", "popularity", "id"),
+    )
     
     id = Column(String(50), primary_key=True, index=True)  # Spotify ID
     name = Column(String(200), nullable=False, index=True)
@@ -28,6 +32,11 @@ class ArtistSnapshot(Base):
     Snapshots históricos de métricas de artistas
     """
     __tablename__ = "artist_snapshots"
+    __table_args__ = (
+        # Listados por fecha (de un artista o de todos) con paginación por cursor
+        Index("ix_artist_snapshots_artist_date_id", "artist_id", "date", "id"),
+        Index("ix_artist_snapshots_date_id", "date", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     artist_id = Column(String(50), nullable=False, index=True)
@@ -48,4 +57,38 @@ class ArtistSnapshot(Base):
     avg_track_popularity = Column(Float, default=0.0)
     
     def __repr__(self):
-        return f"<ArtistSnapshot {self.artist_id} - {self.date.strftime('%Y-%m-%d')}>"
\ No newline at end of file
+        return f"<ArtistSnapshot {self.artist_id} - {self.date.strftime('%Y-%m-%d')}>"
+
+class ArtistAlias(Base):
+    """
+    Nombres con los que se ha buscado un artista (nombre normalizado -> Spotify ID)
+    """
+    __tablename__ = "artist_aliases"
+
+    alias = Column(String(200), primary_key=True)  # Normalizado (ver artist_resolver.normalize_name)
+    artist_id = Column(String(50), nullable=False, index=True)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ArtistAlias {self.alias} -> {self.artist_id}>"
+
+class ArtistGenre(Base):
+    """
+    Relación artista <-> género (normalizada desde Artist.genres)
+    La popularidad se copia del artista para listar y agregar un género
+    solo con el índice (genre, popularity, artist_id)
+    """
+    __tablename__ = "artist_genres"
+    __table_args__ = (
+        Index("ix_artist_genres_genre_popularity", "genre", "popularity", "artist_id"),
+    )
+
+    artist_id = Column(String(50), primary_key=True)
+    genre = Column(String(100), primary_key=True)
+    popularity = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<ArtistGenre {self.artist_id} - {self.genre}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -9,6 +9,11 @@ class GenreSnapshot(Base):
     Almacena snapshots diarios de métricas de géneros musicales
     """
     __tablename__ = "genre_snapshots"
+    __table_args__ = (
+        # Listados por fecha (de un género o de todos) con paginación por cursor
+        Index("ix_genre_snapshots_genre_date_id", "genre", "date", "id"),
+        Index("ix_genre_snapshots_date_id", "date", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     genre = Column(String(50), nullable=False, index=True)
@@ -52,4 +57,45 @@ class GenreTrend(Base):
     market_share = Column(Float, default=0.0)
     
     def __repr__(self):
-        return f"<GenreTrend {self.genre} - {self.trend_direction}>"
\ No newline at end of file
+        return f"<GenreTrend {self.genre} - {self.trend_direction}>"
+
+class GenrePlaylist(Base):
+    """
+    Catálogo persistente de playlists usadas para analizar cada género
+    """
+    __tablename__ = "genre_playlists"
+    __table_args__ = (
+        UniqueConstraint('genre', 'playlist_id', name='uq_genre_playlist'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    genre = Column(String(50), nullable=False, index=True)
+    playlist_id = Column(String(50), nullable=False)  # Spotify ID
+    name = Column(String(200))
+    track_count = Column(Integer, default=0)
+    snapshot_id = Column(String(100))  # Cambia cuando la playlist se modifica
+    
+    # Tracks ya descargados (id, name, popularity, artist)
+    tracks = Column(JSON)
+    tracks_scanned = Column(Integer, default=0)  # Items de la playlist ya recorridos
+    
+    # Timestamps
+    discovered_at = Column(DateTime, default=datetime.utcnow)
+    tracks_fetched_at = Column(DateTime)
+    
+    def __repr__(self):
+        return f"<GenrePlaylist {self.genre} - {self.name}>"
+
+class GenrePlaylistDiscovery(Base):
+    """
+    Última búsqueda de playlists en Spotify de cada género
+    Evita repetir la búsqueda en géneros nicho con menos playlists que el presupuesto
+    """
+    __tablename__ = "genre_playlist_discoveries"
+    
+    genre = Column(String(50), primary_key=True)
+    searched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    requested_playlists = Column(Integer, default=0)  # Presupuesto de playlists de esa búsqueda
+    
+    def __repr__(self):
+        return f"<GenrePlaylistDiscovery {self.genre} - {self.searched_at}>"
@@ -0,0 +1,54 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.ext.declarative import declarative_base
+from datetime import datetime
+import time
+
+Base = declarative_base()
+
+class UserToken(Base):
+    """
+    Tokens OAuth de usuarios de Spotify (uno por usuario)
+    """
+    __tablename__ = "user_tokens"
+
+    user_id = Column(String(100), primary_key=True, index=True)  # Spotify user ID
+    display_name = Column(String(200))
+
+    # Token OAuth (formato token_info de spotipy)
+    access_token = Column(Text, nullable=False)
+    refresh_token = Column(Text, nullable=False)
+    token_type = Column(String(20), default="Bearer")
+    scope = Column(String(500))
+    expires_at = Column(Integer, nullable=False)  # Epoch (segundos)
+
+    # Sesión vigente (X-User-Session): se renueva en cada login y desaparece con el logout
+    session_nonce = Column(String(64))
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_token_info(self):
+        return {
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "token_type": self.token_type,
+            "scope": self.scope,
+            "expires_at": self.expires_at,
+            "expires_in": max(self.expires_at - int(time.time()), 0)
+        }
+
+    def __repr__(self):
+        return f"<UserToken {self.user_id}>"
+
+class OAuthState(Base):
+    """
+    Parámetros state emitidos por /auth/login pendientes de usar (un solo uso)
+    """
+    __tablename__ = "oauth_states"
+
+    nonce = Column(String(100), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<OAuthState {self.nonce}>"
@@ -0,0 +1,129 @@
+"""
+Planificador de análisis por petición
+Reúne los sub-análisis (géneros y artistas) que necesita una ruta, elimina
+duplicados y los ejecuta en paralelo: la ruta cuesta lo que su hoja más lenta
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ..core.database import SessionLocal
+from .artist_comparator import ArtistComparator
+from .genre_analyzer import GenreAnalyzer
+
+# Hojas en paralelo por plan (cada una con su sesión de BD y su cliente Spotify)
+MAX_PLANNER_WORKERS = 4
+
+
+def _genre_key(genre: str, sampling: Dict) -> Tuple:
+    return (genre.lower(), tuple(sorted((k, v) for k, v in sampling.items() if v is not None)))
+
+
+def _artist_key(artist_name: str) -> str:
+    return artist_name.strip().casefold()
+
+
+class AnalysisResults:
+    """
+    Resultados de un plan ejecutado, consultables con los mismos argumentos
+    con los que se añadieron las hojas
+    """
+
+    def __init__(self, genres: Dict[Tuple, Dict], artists: Dict[str, Optional[Dict]]):
+        self._genres = genres
+        self._artists = artists
+
+    def genre(self, genre: str, **sampling) -> Dict:
+        return self._genres[_genre_key(genre, sampling)]
+
+    def genres(self, genres: List[str], **sampling) -> Dict[str, Dict]:
+        return {genre: self.genre(genre, **sampling) for genre in genres}
+
+    def artist(self, artist_name: str) -> Optional[Dict]:
+        return self._artists[_artist_key(artist_name)]
+
+    def artists(self, artist_names: List[str]) -> Dict[str, Optional[Dict]]:
+        return {name: self.artist(name) for name in artist_names}
+
+
+class AnalysisPlan:
+    """
+    Plan de sub-análisis de una petición
+
+    Uso:
+        plan = AnalysisPlan()
+        plan.add_genres(['pop', 'rock'])
+        plan.add_genres(['rock', 'breakbeat'])  # 'rock' se analiza una sola vez
+        results = plan.run()
+        results.genre('rock')
+    """
+
+    def __init__(self, max_workers: int = MAX_PLANNER_WORKERS):
+        self.max_workers = max_workers
+        self._genres: Dict[Tuple, Tuple[str, Dict]] = {}
+        self._artists: Dict[str, str] = {}
+
+    def add_genre(self, genre: str, **sampling) -> "AnalysisPlan":
+        self._genres.setdefault(_genre_key(genre, sampling), (genre.lower(), sampling))
+        return self
+
+    def add_genres(self, genres: List[str], **sampling) -> "AnalysisPlan":
+        for genre in genres:
+            self.add_genre(genre, **sampling)
+        return self
+
+    def add_artist(self, artist_name: str) -> "AnalysisPlan":
+        self._artists.setdefault(_artist_key(artist_name), artist_name)
+        return self
+
+    def add_artists(self, artist_names: List[str]) -> "AnalysisPlan":
+        for artist_name in artist_names:
+            self.add_artist(artist_name)
+        return self
+
+    @property
+    def size(self) -> int:
+        return len(self._genres) + len(self._artists)
+
+    def run(self) -> AnalysisResults:
+        """
+        Ejecuta todas las hojas en paralelo (bloqueante)
+        """
+        print(f"🗺️ Plan de análisis: {len(self._genres)} géneros, {len(self._artists)} artistas")
+
+        leaves = (
+            [("genre", key, args) for key, args in self._genres.items()] +
+            [("artist", key, name) for key, name in self._artists.items()]
+        )
+        genres: Dict[Tuple, Dict] = {}
+        artists: Dict[str, Optional[Dict]] = {}
+
+        if not leaves:
+            return AnalysisResults(genres, artists)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(leaves))) as pool:
+            # Cada hoja hereda el contexto de la petición (Server-Timing)
+            futures = [
+                (kind, key, pool.submit(contextvars.copy_context().run, self._run_leaf, kind, args))
+                for kind, key, args in leaves
+            ]
+            for kind, key, future in futures:
+                (genres if kind == "genre" else artists)[key] = future.result()
+
+        return AnalysisResults(genres, artists)
+
+    @staticmethod
+    def _run_leaf(kind: str, args):
+        db = SessionLocal()
+        try:
+            if kind == "genre":
+                genre, sampling = args
+                try:
+                    return GenreAnalyzer(db).analyze_genre(genre, **sampling)
+                except Exception as e:
+                    print(f"❌ Error analizando {genre}: {str(e)}")
+                    return {"error": str(e), "genre": genre}
+
+            return ArtistComparator(db).get_artist_complete_data(args)
+        finally:
+            db.close()
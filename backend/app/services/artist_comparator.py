@@ -1,13 +1,18 @@
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 import numpy as np
 from datetime import datetime
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
-import os
-import time
 
-from ..models.artist import Artist, ArtistSnapshot
+from ..core.metrics import SNAPSHOT_WRITES
+from ..core.spotify_client import throttle
+from ..core.spotify_auth import get_spotify_client_credentials
+from ..core.timing import timed
+from ..models.artist import Artist, ArtistAlias, ArtistSnapshot
+from .artist_resolver import artist_resolver, get_artist_resolver
+from .artist_suggest import artist_suggest_index
+from .genre_catalog import sync_artist_genres
+from .similarity_index import similarity_index
+from .underground_ranking import artist_entry, artist_leaderboard
 
 class ArtistComparator:
     """
@@ -19,19 +24,7 @@ class ArtistComparator:
         self.db = db
         
         # Inicializar cliente Spotify
-        client_id = os.getenv("SPOTIFY_CLIENT_ID")
-        client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-        
-        if client_id and client_secret:
-            client_credentials_manager = SpotifyClientCredentials(
-                client_id=client_id,
-                client_secret=client_secret
-            )
-            self.sp = spotipy.Spotify(
-                client_credentials_manager=client_credentials_manager
-            )
-        else:
-            self.sp = None
+        self.sp = get_spotify_client_credentials()
         
         # Límites para Development Mode
         self.MAX_TOP_TRACKS = 5  # Reducido
@@ -40,23 +33,27 @@ class ArtistComparator:
     def search_artist(self, artist_name: str) -> Optional[Dict]:
         """
         Busca un artista por nombre
+        Los artistas ya conocidos (tabla artists o búsquedas previas) se piden
+        directamente por ID, sin llamada de búsqueda
         """
         if not self.sp:
             return None
         
         try:
+            artist_id = self._resolve_artist_id(artist_name)
+            if artist_id:
+                try:
+                    return self._artist_summary(self.sp.artist(artist_id))
+                except Exception as e:
+                    print(f"⚠️ Artista {artist_id} no disponible por ID, buscando por nombre: {str(e)}")
+                    self._forget_search(artist_name, artist_id)
+            
             results = self.sp.search(q=artist_name, type='artist', limit=1)
             
             if results['artists']['items']:
                 artist = results['artists']['items'][0]
-                return {
-                    'id': artist['id'],
-                    'name': artist['name'],
-                    'popularity': artist['popularity'],
-                    'followers': artist['followers']['total'],
-                    'genres': artist['genres'],
-                    'image': artist['images'][0]['url'] if artist['images'] else None
-                }
+                self._remember_search(artist_name, artist['id'])
+                return self._artist_summary(artist)
             
             return None
             
@@ -64,6 +61,57 @@ class ArtistComparator:
             print(f"Error buscando artista {artist_name}: {str(e)}")
             return None
     
+    @staticmethod
+    def _artist_summary(artist: Dict) -> Dict:
+        return {
+            'id': artist['id'],
+            'name': artist['name'],
+            'popularity': artist['popularity'],
+            'followers': artist['followers']['total'],
+            'genres': artist['genres'],
+            'image': artist['images'][0]['url'] if artist['images'] else None
+        }
+    
+    def _resolve_artist_id(self, artist_name: str) -> Optional[str]:
+        if self.db is None:
+            return None
+        try:
+            return get_artist_resolver(self.db).resolve(artist_name)
+        except Exception as e:
+            print(f"⚠️ Error resolviendo {artist_name}: {e}")
+            return None
+    
+    def _remember_search(self, artist_name: str, artist_id: str):
+        """
+        Guarda el texto buscado como alias del artista encontrado
+        """
+        alias = artist_resolver.learn(artist_name, artist_id)
+        if alias is None or self.db is None:
+            return
+        try:
+            self.db.merge(ArtistAlias(alias=alias[:200], artist_id=artist_id))
+            self.db.commit()
+        except Exception as e:
+            print(f"⚠️ Error guardando alias {alias}: {e}")
+            self.db.rollback()
+    
+    def _forget_search(self, artist_name: str, artist_id: str):
+        """
+        Deja de resolver `artist_name` a un artista que ya no está disponible
+        """
+        alias = artist_resolver.forget(artist_name, artist_id)
+        if alias is None or self.db is None:
+            return
+        try:
+            self.db.query(ArtistAlias).filter(
+                ArtistAlias.alias == alias[:200], ArtistAlias.artist_id == artist_id
+            ).delete()
+            self.db.commit()
+        except Exception as e:
+            print(f"⚠️ Error borrando alias {alias}: {e}")
+            self.db.rollback()
+    
+    @timed("artist_data")
     def get_artist_complete_data(self, artist_name: str) -> Optional[Dict]:
         """
         Obtiene datos completos de un artista
@@ -81,7 +129,7 @@ class ArtistComparator:
             
             artist_id = artist_data['id']
             
-            time.sleep(0.3)
+            throttle(0.3)
             
             # Obtener top tracks (reducido a 5)
             top_tracks = self.sp.artist_top_tracks(artist_id)
@@ -93,7 +141,7 @@ class ArtistComparator:
             tracks = top_tracks['tracks'][:self.MAX_TOP_TRACKS]
             track_ids = [track['id'] for track in tracks]
             
-            time.sleep(0.3)
+            throttle(0.3)
             
             # Obtener audio features
             audio_features = []
@@ -125,7 +173,7 @@ class ArtistComparator:
                 artist_data['note'] = "Audio features not available"
             
             # Información de álbumes
-            time.sleep(0.3)
+            throttle(0.3)
             albums = self.sp.artist_albums(artist_id, album_type='album', limit=10)
             artist_data['total_albums'] = albums['total']
             
@@ -150,9 +198,13 @@ class ArtistComparator:
             print(f"❌ Error obteniendo datos de {artist_name}: {str(e)}")
             return None
     
-    def compare_artists(self, artist_names: List[str]) -> Dict:
+    def compare_artists(self, artist_names: List[str],
+                        prefetched: Optional[Dict[str, Optional[Dict]]] = None) -> Dict:
         """
         Compara múltiples artistas
+
+        `prefetched` permite pasar datos ya obtenidos (p.ej. por AnalysisPlan):
+        esos artistas no se vuelven a pedir a Spotify.
         """
         if len(artist_names) < 2:
             return {"error": "Se necesitan al menos 2 artistas para comparar"}
@@ -163,18 +215,22 @@ class ArtistComparator:
         print(f"🥊 Comparando {len(artist_names)} artistas...")
         
         artists_data = {}
+        prefetched = prefetched or {}
+        pending = [name for name in artist_names if name not in prefetched]
         
-        for i, artist_name in enumerate(artist_names):
-            print(f"📊 Artista {i+1}/{len(artist_names)}: {artist_name}")
-            
-            artist_data = self.get_artist_complete_data(artist_name)
+        for artist_name in artist_names:
+            if artist_name in prefetched:
+                artist_data = prefetched[artist_name]
+            else:
+                print(f"📊 Artista {pending.index(artist_name)+1}/{len(pending)}: {artist_name}")
+                artist_data = self.get_artist_complete_data(artist_name)
+                
+                # Delay entre artistas
+                if artist_name != pending[-1]:
+                    throttle(1)
             
             if artist_data:
                 artists_data[artist_name] = artist_data
-            
-            # Delay entre artistas
-            if i < len(artist_names) - 1:
-                time.sleep(1)
         
         if len(artists_data) < 2:
             return {"error": "No se pudieron obtener datos de suficientes artistas"}
@@ -190,6 +246,7 @@ class ArtistComparator:
             "analysis_date": datetime.now().isoformat()
         }
     
+    @timed("artist_comparison")
     def _perform_comparison(self, artists_data: Dict) -> Dict:
         """
         Realiza el análisis comparativo
@@ -312,6 +369,7 @@ class ArtistComparator:
                 # Actualizar
                 existing.popularity = artist_data['popularity']
                 existing.followers = artist_data['followers']
+                existing.genres = artist_data['genres']
                 existing.updated_at = datetime.utcnow()
             else:
                 # Crear nuevo
@@ -324,6 +382,9 @@ class ArtistComparator:
                 )
                 self.db.add(new_artist)
             
+            # Relación artista <-> género indexada (misma transacción)
+            sync_artist_genres(self.db, artist_data['id'], artist_data['genres'], artist_data['popularity'])
+            
             # Crear snapshot
             snapshot = ArtistSnapshot(
                 artist_id=artist_data['id'],
@@ -340,6 +401,20 @@ class ArtistComparator:
             
             self.db.add(snapshot)
             self.db.commit()
+            SNAPSHOT_WRITES.inc(table="artist_snapshots")
+            
+            # Mantener actualizados los índices de nombres, sugerencias y similitud y el ranking underground (si ya están cargados)
+            if artist_resolver.built:
+                artist_resolver.add(artist_data['name'], artist_data['id'])
+            if artist_suggest_index.built:
+                artist_suggest_index.upsert(artist_data['id'], artist_data['name'], artist_data['popularity'])
+            if similarity_index.built:
+                similarity_index.upsert(artist_data['id'], artist_data['name'], artist_data)
+            if artist_leaderboard.built:
+                artist_leaderboard.update(artist_data['id'], artist_entry(
+                    artist_data['id'], artist_data['name'], artist_data['popularity'],
+                    artist_data.get('avg_energy', 0), artist_data.get('avg_danceability', 0)
+                ))
             
             print(f"💾 Datos guardados en BD para {artist_data['name']}")
             
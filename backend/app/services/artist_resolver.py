@@ -0,0 +1,134 @@
+"""
+Resolución nombre de artista -> Spotify ID
+Índice en memoria por nombre normalizado (sin mayúsculas ni diacríticos, con alias)
+construido desde la tabla artists y las búsquedas ya hechas: los artistas conocidos
+se piden directamente por ID, sin llamada de búsqueda
+"""
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.metrics import ARTIST_NAME_RESOLUTIONS
+from ..models.artist import Artist, ArtistAlias
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_name(name: str) -> str:
+    """
+    'Beyoncé ' -> 'beyonce'; 'Simon & Garfunkel' -> 'simon and garfunkel'
+    """
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = _NON_WORD.sub(" ", text.replace("&", " and ").replace("_", " "))
+    return " ".join(text.split())
+
+
+def name_variants(name: str) -> List[str]:
+    """
+    Claves con las que se indexa un nombre: normalizado y sin 'the' inicial
+    """
+    key = normalize_name(name)
+    if not key:
+        return []
+    if key.startswith("the ") and len(key) > 4:
+        return [key, key[4:]]
+    return [key]
+
+
+class ArtistResolver:
+    """
+    Dos niveles:
+    - alias: textos de búsqueda ya resueltos por Spotify (exactos, el último gana)
+    - nombres: variantes de los nombres canónicos; si dos artistas comparten
+      una variante, esa variante queda ambigua y no resuelve
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._aliases: Dict[str, str] = {}
+        self._names: Dict[str, Optional[str]] = {}
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def build(self, db: Session):
+        with self._lock:
+            for artist_id, name in db.query(Artist.id, Artist.name).yield_per(10000):
+                self._add_name(name, artist_id)
+            for alias, artist_id in db.query(ArtistAlias.alias, ArtistAlias.artist_id).yield_per(10000):
+                self._aliases[alias] = artist_id
+            self.built = True
+
+        print(f"🔤 Índice de nombres de artistas construido con {len(self._names)} claves y {len(self._aliases)} alias")
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Spotify ID del artista, o None si no se conoce (o es ambiguo)
+        """
+        with self._lock:
+            artist_id = self._aliases.get(normalize_name(name))
+            if artist_id is None:
+                for key in name_variants(name):
+                    artist_id = self._names.get(key)
+                    if artist_id is not None:
+                        break
+
+        ARTIST_NAME_RESOLUTIONS.inc(result="hit" if artist_id else "miss")
+        return artist_id
+
+    def add(self, name: str, artist_id: str):
+        with self._lock:
+            self._add_name(name, artist_id)
+
+    def learn(self, query: str, artist_id: str) -> Optional[str]:
+        """
+        Registra el texto de una búsqueda resuelta; devuelve el alias normalizado
+        """
+        alias = normalize_name(query)
+        if not alias:
+            return None
+        with self._lock:
+            self._aliases[alias] = artist_id
+        return alias
+
+    def forget(self, query: str, artist_id: str) -> Optional[str]:
+        """
+        Olvida que `query` resuelve a `artist_id` (alias y variantes de nombre);
+        devuelve el alias normalizado para borrarlo también de artist_aliases
+        """
+        alias = normalize_name(query)
+        with self._lock:
+            if self._aliases.get(alias) == artist_id:
+                del self._aliases[alias]
+            for key in name_variants(query):
+                if self._names.get(key) == artist_id:
+                    del self._names[key]
+        return alias or None
+
+    def _add_name(self, name: str, artist_id: str):
+        for key in name_variants(name):
+            if key not in self._names:
+                self._names[key] = artist_id
+            elif self._names[key] != artist_id:
+                self._names[key] = None  # Ambiguo
+
+
+# Índice compartido por todo el proceso
+artist_resolver = ArtistResolver()
+_build_lock = threading.Lock()
+
+
+def get_artist_resolver(db: Session) -> ArtistResolver:
+    """
+    Devuelve el índice global, construyéndolo la primera vez que se usa
+    """
+    if not artist_resolver.built:
+        with _build_lock:
+            if not artist_resolver.built:
+                artist_resolver.build(db)
+    return artist_resolver
@@ -0,0 +1,235 @@
+"""
+Autocompletado de artistas sin llamar a Spotify
+Índice en memoria sobre los nombres guardados en la tabla artists:
+- prefijos: lista ordenada de claves (una por palabra del nombre) recorrida con bisect;
+  los prefijos cortos, que abarcan miles de claves, guardan su top por popularidad
+- trigramas: trigrama -> IDs, para coincidencias aproximadas (erratas, partes del nombre)
+Los resultados se ordenan por popularidad y el índice se actualiza al guardar artistas
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.artist import Artist
+from .artist_resolver import normalize_name
+
+# Prefijos de hasta esta longitud sirven su top por popularidad precalculado
+# (se calcula la primera vez que se piden y se mantiene con upsert)
+SHORT_PREFIX_LENGTH = 3
+
+# Tamaño del top de cada prefijo corto (máximo de limit en /api/artists/suggest)
+SHORT_PREFIX_TOP_SIZE = 50
+
+# Longitud mínima de la consulta para buscar por trigramas
+FUZZY_MIN_QUERY_LENGTH = 3
+
+# Similitud mínima (Jaccard de trigramas) de una coincidencia aproximada
+FUZZY_MIN_SIMILARITY = 0.3
+
+
+def trigrams(key: str) -> Set[str]:
+    """
+    'daft punk' -> {'  d', ' da', 'daf', ..., 'nk '}
+    """
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def word_keys(key: str) -> List[str]:
+    """
+    Claves de prefijo de un nombre: desde el inicio de cada palabra
+    ('the prodigy' -> ['the prodigy', 'prodigy'])
+    """
+    keys = [key]
+    for position, char in enumerate(key):
+        if char == " ":
+            keys.append(key[position + 1:])
+    return keys
+
+
+class ArtistSuggestIndex:
+    """
+    Sugerencias de artistas por prefijo y, si faltan, por trigramas
+
+    - Prefijo: la consulta normalizada es prefijo de alguna palabra del nombre;
+      se ordenan por popularidad
+    - Aproximadas: comparten suficientes trigramas con la consulta;
+      se ordenan por similitud y después por popularidad
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Tuple[str, int, str, int]] = {}  # id -> (nombre, popularidad, clave, nº trigramas)
+        self._keys: List[Tuple[str, str]] = []  # (clave de palabra, id) ordenadas
+        self._grams: Dict[str, Set[str]] = {}
+        self._top: Dict[str, List[Tuple[int, str, str]]] = {}  # prefijo corto -> [(-popularidad, nombre, id)]
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self, db: Session):
+        with self._lock:
+            self._entries, self._keys, self._grams, self._top = {}, [], {}, {}
+            for artist_id, name, popularity in db.query(Artist.id, Artist.name, Artist.popularity).yield_per(10000):
+                key = normalize_name(name)
+                if not key:
+                    continue
+                grams = trigrams(key)
+                self._entries[artist_id] = (name, popularity or 0, key, len(grams))
+                self._keys.extend((word, artist_id) for word in word_keys(key))
+                for gram in grams:
+                    self._grams.setdefault(gram, set()).add(artist_id)
+            self._keys.sort()
+            self.built = True
+
+        print(f"🔎 Índice de sugerencias construido con {len(self._entries)} artistas")
+
+    def upsert(self, artist_id: str, name: str, popularity: int):
+        """
+        Añade o actualiza un artista (si el nombre no cambia solo se toca la popularidad)
+        """
+        key = normalize_name(name)
+        if not key:
+            return
+        with self._lock:
+            previous = self._entries.get(artist_id)
+            if previous is not None and previous[2] != key:
+                self._remove(artist_id, previous[2])
+            grams = trigrams(key)
+            self._entries[artist_id] = (name, popularity or 0, key, len(grams))
+            if previous is None or previous[2] != key:
+                for word in word_keys(key):
+                    insort(self._keys, (word, artist_id))
+                for gram in grams:
+                    self._grams.setdefault(gram, set()).add(artist_id)
+            self._update_top(artist_id, key)
+
+    def _update_top(self, artist_id: str, key: str):
+        """
+        Recoloca al artista en los tops de sus prefijos cortos ya calculados
+        """
+        rank = self._rank(artist_id)
+        for prefix in self._short_prefixes(key):
+            top = self._top.get(prefix)
+            if top is None:
+                continue
+            full = len(top) >= SHORT_PREFIX_TOP_SIZE
+            position = next((i for i, item in enumerate(top) if item[2] == artist_id), None)
+            if position is not None:
+                del top[position]
+                if full and top and rank > top[-1]:
+                    # Baja por debajo del último: puede haber otro mejor fuera del top
+                    del self._top[prefix]
+                    continue
+            elif full and rank > top[-1]:
+                continue
+            insort(top, rank)
+            del top[SHORT_PREFIX_TOP_SIZE:]
+
+    @staticmethod
+    def _short_prefixes(key: str) -> Set[str]:
+        return {word[:length] for word in word_keys(key) for length in range(1, min(len(word), SHORT_PREFIX_LENGTH) + 1)}
+
+    def _rank(self, artist_id: str) -> Tuple[int, str, str]:
+        name, popularity = self._entries[artist_id][:2]
+        return -popularity, name, artist_id
+
+    def _remove(self, artist_id: str, key: str):
+        for prefix in self._short_prefixes(key):
+            top = self._top.get(prefix)
+            if top is not None and any(item[2] == artist_id for item in top):
+                del self._top[prefix]
+        for word in word_keys(key):
+            position = bisect_left(self._keys, (word, artist_id))
+            if position < len(self._keys) and self._keys[position] == (word, artist_id):
+                del self._keys[position]
+        for gram in trigrams(key):
+            ids = self._grams.get(gram)
+            if ids is not None:
+                ids.discard(artist_id)
+                if not ids:
+                    del self._grams[gram]
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict]:
+        key = normalize_name(query)
+        if not key:
+            return []
+
+        with self._lock:
+            if len(key) <= SHORT_PREFIX_LENGTH and limit <= SHORT_PREFIX_TOP_SIZE:
+                ranked = [artist_id for _, _, artist_id in self._short_prefix_top(key)[:limit]]
+                prefix_ids = set(ranked)
+            else:
+                prefix_ids = self._prefix_matches(key)
+                ranked = [rank[2] for rank in heapq.nsmallest(limit, map(self._rank, prefix_ids))]
+            results = [self._suggestion(artist_id, "prefix") for artist_id in ranked]
+
+            if len(results) < limit and len(key) >= FUZZY_MIN_QUERY_LENGTH:
+                for artist_id, similarity in self._fuzzy_matches(key, exclude=prefix_ids)[:limit - len(results)]:
+                    results.append(self._suggestion(artist_id, "fuzzy", similarity))
+
+        return results
+
+    def _prefix_matches(self, key: str) -> Set[str]:
+        ids = set()
+        position = bisect_left(self._keys, (key,))
+        while position < len(self._keys) and self._keys[position][0].startswith(key):
+            ids.add(self._keys[position][1])
+            position += 1
+        return ids
+
+    def _short_prefix_top(self, prefix: str) -> List[Tuple[int, str, str]]:
+        """
+        Los SHORT_PREFIX_TOP_SIZE artistas más populares con una palabra que empieza
+        por `prefix`; se recorre el rango completo la primera vez y queda guardado
+        """
+        top = self._top.get(prefix)
+        if top is None:
+            top = heapq.nsmallest(SHORT_PREFIX_TOP_SIZE, map(self._rank, self._prefix_matches(prefix)))
+            self._top[prefix] = top
+        return top
+
+    def _fuzzy_matches(self, key: str, exclude: Set[str]) -> List[Tuple[str, float]]:
+        query_grams = trigrams(key)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._grams.get(gram, ()))
+
+        matches = []
+        for artist_id, count in shared.items():
+            if artist_id in exclude:
+                continue
+            similarity = count / (len(query_grams) + self._entries[artist_id][3] - count)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                matches.append((artist_id, similarity))
+
+        matches.sort(key=lambda m: (-m[1], -self._entries[m[0]][1]))
+        return matches
+
+    def _suggestion(self, artist_id: str, match: str, similarity: Optional[float] = None) -> Dict:
+        name, popularity = self._entries[artist_id][:2]
+        suggestion = {"id": artist_id, "name": name, "popularity": popularity, "match": match}
+        if similarity is not None:
+            suggestion["similarity"] = round(similarity, 3)
+        return suggestion
+
+
+# Índice compartido por todo el proceso
+artist_suggest_index = ArtistSuggestIndex()
+_build_lock = threading.Lock()
+
+
+def get_artist_suggest_index(db: Session) -> ArtistSuggestIndex:
+    """
+    Devuelve el índice global, construyéndolo la primera vez que se usa
+    """
+    if not artist_suggest_index.built:
+        with _build_lock:
+            if not artist_suggest_index.built:
+                artist_suggest_index.build(db)
+    return artist_suggest_index
@@ -0,0 +1,153 @@
+"""
+Listados de lo guardado en BD (artistas y snapshots de artistas y géneros)
+Todos se paginan por cursor sobre columnas con índice compuesto, así que
+las páginas profundas cuestan lo mismo que la primera
+"""
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.pagination import keyset_page
+from ..models.artist import Artist, ArtistGenre, ArtistSnapshot
+from ..models.genre import GenreSnapshot
+from .genre_catalog import normalize_genre
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _artist_dict(artist: Artist) -> Dict:
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "popularity": artist.popularity,
+        "followers": artist.followers,
+        "genres": artist.genres or [],
+        "updated_at": _isoformat(artist.updated_at)
+    }
+
+
+def _artist_snapshot_dict(snapshot: ArtistSnapshot) -> Dict:
+    return {
+        "id": snapshot.id,
+        "artist_id": snapshot.artist_id,
+        "date": _isoformat(snapshot.date),
+        "popularity": snapshot.popularity,
+        "followers": snapshot.followers,
+        "avg_energy": snapshot.avg_energy,
+        "avg_danceability": snapshot.avg_danceability,
+        "avg_valence": snapshot.avg_valence,
+        "avg_tempo": snapshot.avg_tempo,
+        "consistency_score": snapshot.consistency_score,
+        "avg_track_popularity": snapshot.avg_track_popularity
+    }
+
+
+def _genre_snapshot_dict(snapshot: GenreSnapshot) -> Dict:
+    return {
+        "id": snapshot.id,
+        "genre": snapshot.genre,
+        "date": _isoformat(snapshot.date),
+        "avg_popularity": snapshot.avg_popularity,
+        "tracks_analyzed": snapshot.tracks_analyzed,
+        "playlist_presence": snapshot.playlist_presence,
+        "avg_energy": snapshot.avg_energy,
+        "avg_danceability": snapshot.avg_danceability,
+        "avg_valence": snapshot.avg_valence,
+        "avg_tempo": snapshot.avg_tempo,
+        "top_artists": snapshot.top_artists or []
+    }
+
+
+def list_artists(
+    db: Session,
+    limit: int,
+    cursor: Optional[str] = None,
+    genre: Optional[str] = None,
+    min_popularity: Optional[int] = None,
+    max_popularity: Optional[int] = None
+) -> Dict:
+    """
+    Artistas de más a menos populares
+    Con género se recorre el índice de artist_genres; sin él, (popularity, id) de artists
+    El cursor sale siempre de las columnas ordenadas (ArtistGenre.popularity con género)
+    """
+    if genre:
+        popularity, columns = ArtistGenre.popularity, [ArtistGenre.popularity, ArtistGenre.artist_id]
+        query = db.query(Artist, ArtistGenre.popularity).join(ArtistGenre, ArtistGenre.artist_id == Artist.id).filter(
+            ArtistGenre.genre == normalize_genre(genre)
+        )
+    else:
+        popularity, columns = Artist.popularity, [Artist.popularity, Artist.id]
+        query = db.query(Artist, Artist.popularity)
+
+    if min_popularity is not None:
+        query = query.filter(popularity >= min_popularity)
+    if max_popularity is not None:
+        query = query.filter(popularity <= max_popularity)
+
+    page = keyset_page(query, columns, cursor, limit, key=lambda row: [row[1], row[0].id])
+    page["items"] = [_artist_dict(artist) for artist, _ in page["items"]]
+    return page
+
+
+def list_artist_snapshots(
+    db: Session,
+    limit: int,
+    cursor: Optional[str] = None,
+    artist_id: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_popularity: Optional[int] = None,
+    max_popularity: Optional[int] = None
+) -> Dict:
+    """
+    Snapshots de artistas, del más reciente al más antiguo
+    """
+    query = db.query(ArtistSnapshot)
+    if artist_id:
+        query = query.filter(ArtistSnapshot.artist_id == artist_id)
+    if start_date is not None:
+        query = query.filter(ArtistSnapshot.date >= start_date)
+    if end_date is not None:
+        query = query.filter(ArtistSnapshot.date <= end_date)
+    if min_popularity is not None:
+        query = query.filter(ArtistSnapshot.popularity >= min_popularity)
+    if max_popularity is not None:
+        query = query.filter(ArtistSnapshot.popularity <= max_popularity)
+
+    page = keyset_page(query, [ArtistSnapshot.date, ArtistSnapshot.id], cursor, limit)
+    page["items"] = [_artist_snapshot_dict(snapshot) for snapshot in page["items"]]
+    return page
+
+
+def list_genre_snapshots(
+    db: Session,
+    limit: int,
+    cursor: Optional[str] = None,
+    genre: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    min_popularity: Optional[float] = None,
+    max_popularity: Optional[float] = None
+) -> Dict:
+    """
+    Snapshots de géneros, del más reciente al más antiguo
+    """
+    query = db.query(GenreSnapshot)
+    if genre:
+        query = query.filter(GenreSnapshot.genre == genre.lower())
+    if start_date is not None:
+        query = query.filter(GenreSnapshot.date >= start_date)
+    if end_date is not None:
+        query = query.filter(GenreSnapshot.date <= end_date)
+    if min_popularity is not None:
+        query = query.filter(GenreSnapshot.avg_popularity >= min_popularity)
+    if max_popularity is not None:
+        query = query.filter(GenreSnapshot.avg_popularity <= max_popularity)
+
+    page = keyset_page(query, [GenreSnapshot.date, GenreSnapshot.id], cursor, limit)
+    page["items"] = [_genre_snapshot_dict(snapshot) for snapshot in page["items"]]
+    return page
@@ -0,0 +1,85 @@
+"""
+Estimación determinista de audio features por género
+Se usa cuando Spotify no devuelve audio features (Development Mode)
+"""
+import hashlib
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Tuple
+
+FEATURE_NAMES = ['energy', 'danceability', 'valence', 'tempo', 'acousticness', 'instrumentalness']
+
+# Características base por género (basadas en conocimiento musical típico)
+GENRE_PROFILES = {
+    'breakbeat': {'energy': 0.78, 'danceability': 0.72, 'valence': 0.65, 'tempo': 140, 'acousticness': 0.15, 'instrumentalness': 0.45},
+    'drum-and-bass': {'energy': 0.85, 'danceability': 0.75, 'valence': 0.60, 'tempo': 170, 'acousticness': 0.10, 'instrumentalness': 0.50},
+    'dubstep': {'energy': 0.82, 'danceability': 0.70, 'valence': 0.50, 'tempo': 140, 'acousticness': 0.12, 'instrumentalness': 0.55},
+    'techno': {'energy': 0.80, 'danceability': 0.78, 'valence': 0.55, 'tempo': 128, 'acousticness': 0.08, 'instrumentalness': 0.65},
+    'house': {'energy': 0.75, 'danceability': 0.80, 'valence': 0.70, 'tempo': 125, 'acousticness': 0.10, 'instrumentalness': 0.60},
+    'electronic': {'energy': 0.70, 'danceability': 0.68, 'valence': 0.60, 'tempo': 120, 'acousticness': 0.15, 'instrumentalness': 0.40},
+    'pop': {'energy': 0.65, 'danceability': 0.70, 'valence': 0.65, 'tempo': 118, 'acousticness': 0.25, 'instrumentalness': 0.05},
+    'rock': {'energy': 0.72, 'danceability': 0.55, 'valence': 0.58, 'tempo': 125, 'acousticness': 0.20, 'instrumentalness': 0.10},
+    'hip-hop': {'energy': 0.68, 'danceability': 0.75, 'valence': 0.60, 'tempo': 95, 'acousticness': 0.18, 'instrumentalness': 0.08},
+    'indie': {'energy': 0.62, 'danceability': 0.60, 'valence': 0.55, 'tempo': 115, 'acousticness': 0.35, 'instrumentalness': 0.15},
+    'hardstyle': {'energy': 0.90, 'danceability': 0.75, 'valence': 0.65, 'tempo': 150, 'acousticness': 0.05, 'instrumentalness': 0.50},
+    'psytrance': {'energy': 0.88, 'danceability': 0.70, 'valence': 0.70, 'tempo': 145, 'acousticness': 0.05, 'instrumentalness': 0.70},
+    'darkwave': {'energy': 0.60, 'danceability': 0.50, 'valence': 0.35, 'tempo': 110, 'acousticness': 0.30, 'instrumentalness': 0.40},
+    'industrial': {'energy': 0.85, 'danceability': 0.65, 'valence': 0.40, 'tempo': 130, 'acousticness': 0.08, 'instrumentalness': 0.45},
+    'witch-house': {'energy': 0.65, 'danceability': 0.55, 'valence': 0.30, 'tempo': 105, 'acousticness': 0.20, 'instrumentalness': 0.50},
+}
+
+# Perfil por defecto para géneros desconocidos
+DEFAULT_PROFILE = {'energy': 0.65, 'danceability': 0.65, 'valence': 0.55, 'tempo': 120, 'acousticness': 0.25, 'instrumentalness': 0.30}
+
+# Tablas de ajuste por feature (mismo orden que FEATURE_NAMES)
+# Géneros más populares tienden a ser más bailables y con más valencia
+POPULARITY_WEIGHTS = np.array([0.05, 0.08, 0.10, 0.0, -0.05, 0.0])
+PLAYLIST_WEIGHTS = np.array([0.0, 0.0, 0.0, 5.0, 0.0, 0.0])
+VARIATION = np.array([0.05, 0.05, 0.05, 5.0, 0.03, 0.05])
+LOWER_BOUNDS = np.array([0.0, 0.0, 0.0, 60.0, 0.0, 0.0])
+UPPER_BOUNDS = np.array([1.0, 1.0, 1.0, 200.0, 1.0, 1.0])
+DECIMALS = [3, 3, 3, 1, 3, 3]
+
+_PROFILE_INDEX = {genre: i for i, genre in enumerate(GENRE_PROFILES)}
+_PROFILE_MATRIX = np.array(
+    [[profile[f] for f in FEATURE_NAMES] for profile in GENRE_PROFILES.values()] +
+    [[DEFAULT_PROFILE[f] for f in FEATURE_NAMES]],
+    dtype=float
+)
+
+
+@lru_cache(maxsize=4096)
+def _variation(genre: str, avg_popularity: float, playlist_count: int) -> Tuple[float, ...]:
+    """
+    Variación en [-1, 1) por feature, derivada de un hash estable del género y las entradas
+    """
+    key = f"{genre}|{avg_popularity:.2f}|{playlist_count}".encode()
+    digest = hashlib.blake2b(key, digest_size=8 * len(FEATURE_NAMES)).digest()
+    words = np.frombuffer(digest, dtype='<u8')
+    return tuple((words / 2.0 ** 64) * 2.0 - 1.0)
+
+
+def estimate_audio_features(genre: str, avg_popularity: float, playlist_count: int) -> Dict:
+    """
+    Estima audio features de un género (mismo resultado para las mismas entradas)
+    """
+    genre = genre.lower()
+    avg_popularity = round(float(avg_popularity), 2)
+    playlist_count = int(playlist_count)
+
+    profile = _PROFILE_MATRIX[_PROFILE_INDEX.get(genre, len(GENRE_PROFILES))]
+    popularity_factor = avg_popularity / 100.0
+    playlist_factor = min(playlist_count / 10.0, 1.0)  # Normalizar
+
+    estimated = (
+        profile +
+        popularity_factor * POPULARITY_WEIGHTS +
+        playlist_factor * PLAYLIST_WEIGHTS +
+        np.array(_variation(genre, avg_popularity, playlist_count)) * VARIATION
+    )
+
+    # Asegurar que los valores están en rangos válidos
+    return {
+        name: float(np.clip(round(value, decimals), low, high))
+        for name, value, decimals, low, high in zip(FEATURE_NAMES, estimated, DECIMALS, LOWER_BOUNDS, UPPER_BOUNDS)
+    }
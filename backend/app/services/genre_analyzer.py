@@ -1,13 +1,18 @@
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 import numpy as np
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import List, Dict, Optional, Tuple, Iterator, Set
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
-import os
-import time
+from spotipy.exceptions import SpotifyException
 
-from ..models.genre import GenreSnapshot
+from ..core.metrics import SNAPSHOT_WRITES
+from ..core.spotify_client import throttle
+from ..core.spotify_auth import get_spotify_client_credentials
+from ..core.timing import timed
+from ..models.genre import GenreSnapshot, GenrePlaylist, GenrePlaylistDiscovery
+from .feature_estimator import estimate_audio_features
+from .underground_ranking import genre_entry, genre_leaderboard
 
 class GenreAnalyzer:
     """
@@ -19,19 +24,7 @@ class GenreAnalyzer:
         self.db = db
         
         # Inicializar cliente Spotify
-        client_id = os.getenv("SPOTIFY_CLIENT_ID")
-        client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-        
-        if client_id and client_secret:
-            client_credentials_manager = SpotifyClientCredentials(
-                client_id=client_id,
-                client_secret=client_secret
-            )
-            self.sp = spotipy.Spotify(
-                client_credentials_manager=client_credentials_manager
-            )
-        else:
-            self.sp = None
+        self.sp = get_spotify_client_credentials()
             
         # Géneros objetivo para análisis
         self.target_genres = [
@@ -39,87 +32,78 @@ class GenreAnalyzer:
             'electronic', 'pop', 'rock', 'hip-hop', 'indie'
         ]
         
-        # LÍMITES para Development Mode
+        # LÍMITES por defecto para Development Mode (configurables por petición)
         self.MAX_PLAYLISTS = 8  # Reducido de 15
         self.MAX_TRACKS_PER_PLAYLIST = 8  # Reducido de 25
         self.MAX_TOTAL_TRACKS = 20  # Reducido de 50
-        self.MAX_AUDIO_FEATURES_PER_REQUEST = 20  # Límite seguro
+        self.MAX_AUDIO_FEATURES_PER_REQUEST = 100  # Máximo de Spotify por llamada
+        
+        # Muestreo adaptativo: rondas de tracks hasta que los intervalos de confianza sean estrechos
+        self.ADAPTIVE_BUDGET = {'max_playlists': 20, 'max_tracks_per_playlist': 25, 'max_total_tracks': 500}
+        self.ADAPTIVE_ROUND_SIZE = 20
+        self.ADAPTIVE_PRECISION = 0.05  # Ancho máximo del intervalo (fracción del rango de la métrica)
+        self.BOOTSTRAP_RESAMPLES = 500
+        self.BOOTSTRAP_CONFIDENCE = 0.95
+        
+        # Catálogo de playlists: re-búsqueda semanal, tracks re-descargados si la playlist cambia
+        self.PLAYLIST_DISCOVERY_DAYS = 7
+        self.PLAYLIST_TRACKS_MAX_AGE_DAYS = 7
     
-    def analyze_genre(self, genre: str) -> Dict:
+    @timed("genre_analysis")
+    def analyze_genre(self, genre: str,
+                      max_playlists: Optional[int] = None,
+                      max_tracks_per_playlist: Optional[int] = None,
+                      max_total_tracks: Optional[int] = None,
+                      adaptive: bool = False,
+                      precision: Optional[float] = None) -> Dict:
         """
         Analiza un género específico (versión optimizada para Development mode)
+
+        Los límites de muestreo son configurables por petición; por defecto
+        se usan los límites de Development Mode.
+
+        En modo adaptativo los tracks se piden por rondas y se para en cuanto los
+        intervalos de confianza bootstrap son más estrechos que `precision`
+        (fracción del rango de cada métrica); el presupuesto pasa a ser un máximo.
         """
         if not self.sp:
             return {"error": "Spotify client not configured"}
         
-        print(f"🎵 Analizando género: {genre} (Development mode)")
+        defaults = self.ADAPTIVE_BUDGET if adaptive else {
+            'max_playlists': self.MAX_PLAYLISTS,
+            'max_tracks_per_playlist': self.MAX_TRACKS_PER_PLAYLIST,
+            'max_total_tracks': self.MAX_TOTAL_TRACKS
+        }
+        budget = {
+            'max_playlists': max_playlists or defaults['max_playlists'],
+            'max_tracks_per_playlist': max_tracks_per_playlist or defaults['max_tracks_per_playlist'],
+            'max_total_tracks': max_total_tracks or defaults['max_total_tracks']
+        }
+        
+        print(f"🎵 Analizando género: {genre} (Development mode, hasta {budget['max_total_tracks']} tracks)")
         
         try:
-            # 1. Buscar playlists específicas del género (mejorado)
-            # Usar términos de búsqueda más específicos para cada género
-            search_terms = self._get_genre_search_terms(genre)
-
-            all_tracks = []
-            playlist_count = 0
-
-            # Intentar con diferentes términos de búsqueda
-            for search_term in search_terms[:2]:  # Limitar a 2 búsquedas para evitar rate limiting
-                playlists = self.sp.search(
-                    q=search_term,
-                    type='playlist',
-                    limit=self.MAX_PLAYLISTS // 2  # Dividir entre búsquedas
+            # 1-3. Pipeline playlists → tracks → sin duplicados, que deja de pedir
+            # datos a Spotify en cuanto se alcanza el presupuesto de tracks
+            sampled_playlists = set()
+            tracks_stream = self._iter_genre_tracks(genre, budget, sampled_playlists)
+            unique_stream = self._unique_tracks(tracks_stream)
+
+            valid_features = None
+            sampling = None
+            if adaptive:
+                tracks_list, valid_features, sampling = self._adaptive_sample(
+                    unique_stream, budget['max_total_tracks'], precision or self.ADAPTIVE_PRECISION
                 )
+            else:
+                tracks_list = list(islice(unique_stream, budget['max_total_tracks']))
+            playlist_count = len(sampled_playlists)
 
-                time.sleep(0.5)
-
-                # 2. Recopilar tracks (cantidad reducida)
-                for playlist in playlists['playlists']['items']:
-                    if playlist and playlist['tracks']['total'] > 5:
-                        # Verificar que el nombre de la playlist contenga el género
-                        playlist_name = playlist['name'].lower()
-                        if genre.lower() in playlist_name or any(term.split(':')[0] in playlist_name for term in search_terms):
-                            playlist_count += 1
-
-                            # Obtener menos tracks por playlist
-                            tracks = self.sp.playlist_tracks(
-                                playlist['id'],
-                                limit=self.MAX_TRACKS_PER_PLAYLIST,
-                                fields="items(track(id,name,popularity,artists(name,genres)))"
-                            )
-
-                            time.sleep(0.3)
-
-                            for item in tracks['items']:
-                                if (item['track'] and
-                                    item['track']['id'] and
-                                    item['track']['popularity'] > 0):
-
-                                    # Obtener géneros del artista
-                                    artist_genres = []
-                                    if item['track']['artists']:
-                                        # Nota: artists.genres no está disponible en playlist_tracks
-                                        # Solo obtendremos el nombre del artista
-                                        artist_name = item['track']['artists'][0]['name']
-                                    else:
-                                        artist_name = 'Unknown'
-
-                                    all_tracks.append({
-                                        'id': item['track']['id'],
-                                        'name': item['track']['name'],
-                                        'popularity': item['track']['popularity'],
-                                        'artist': artist_name,
-                                        'from_playlist': playlist['name']
-                                    })
-
-                            if playlist_count >= self.MAX_PLAYLISTS:
-                                break
-
-                if playlist_count >= self.MAX_PLAYLISTS:
-                    break
-            
-            # 3. Remover duplicados y limitar estrictamente
-            unique_tracks = {track['id']: track for track in all_tracks}
-            tracks_list = list(unique_tracks.values())[:self.MAX_TOTAL_TRACKS]
+            try:
+                self.db.commit()
+            except Exception as e:
+                print(f"⚠️ Error guardando catálogo de playlists de {genre}: {e}")
+                self.db.rollback()
             
             if not tracks_list:
                 return {
@@ -135,32 +119,10 @@ class GenreAnalyzer:
             print(f"🎵 Tracks de muestra: {', '.join(sample_tracks)}")
             
             # 4. Intentar obtener audio features (puede fallar en Development Mode)
-            track_ids = [track['id'] for track in tracks_list]
-            audio_features = []
-            audio_features_available = False
-
-            try:
+            if valid_features is None:
                 print(f"📊 Intentando obtener audio features para {len(tracks_list)} tracks...")
-
-                # Dividir en lotes de MAX_AUDIO_FEATURES_PER_REQUEST
-                for i in range(0, len(track_ids), self.MAX_AUDIO_FEATURES_PER_REQUEST):
-                    batch = track_ids[i:i + self.MAX_AUDIO_FEATURES_PER_REQUEST]
-
-                    try:
-                        batch_features = self.sp.audio_features(batch)
-                        if batch_features:
-                            audio_features.extend(batch_features)
-                        time.sleep(0.5)  # Delay entre lotes
-                    except Exception as e:
-                        print(f"⚠️ Audio features no disponibles (Development Mode): {str(e)[:100]}")
-                        break
-
-                valid_features = [f for f in audio_features if f is not None]
-                audio_features_available = len(valid_features) > 0
-
-            except Exception as e:
-                print(f"⚠️ Audio features no disponibles en Development Mode")
-                valid_features = []
+                valid_features = list(self._iter_audio_features([track['id'] for track in tracks_list]))
+            audio_features_available = len(valid_features) > 0
 
             if not audio_features_available:
                 # Calcular métricas estimadas basadas en popularidad y género
@@ -170,7 +132,7 @@ class GenreAnalyzer:
                 # Estimaciones basadas en características típicas del género y popularidad
                 estimated_metrics = self._estimate_audio_features(genre, avg_popularity, playlist_count)
 
-                return {
+                estimated_result = {
                     "genre": genre,
                     "total_tracks": len(tracks_list),
                     "tracks_analyzed": len(tracks_list),
@@ -185,12 +147,18 @@ class GenreAnalyzer:
                     "development_mode": True,
                     "audio_features_available": False,
                     "estimated": True,
+                    "sampling_budget": budget,
                     "note": "⚠️ Audio features estimadas. Tu app Spotify está en Development Mode. Agrega tu usuario en: https://developer.spotify.com/dashboard",
                     "top_tracks": [
                         {"name": t['name'], "artist": t['artist'], "popularity": t['popularity']}
                         for t in sorted(tracks_list, key=lambda x: x['popularity'], reverse=True)[:5]
                     ]
                 }
+                if sampling:
+                    estimated_result['sampling'] = sampling
+                    estimated_result['confidence_intervals'] = sampling.pop('confidence_intervals')
+
+                return estimated_result
             
             # 5. Calcular métricas del género
             genre_metrics = self._calculate_metrics(
@@ -198,7 +166,11 @@ class GenreAnalyzer:
             )
             genre_metrics['genre'] = genre
             genre_metrics['development_mode'] = True
-            genre_metrics['tracks_limit'] = self.MAX_TOTAL_TRACKS
+            genre_metrics['tracks_limit'] = budget['max_total_tracks']
+            genre_metrics['sampling_budget'] = budget
+            if sampling:
+                genre_metrics['sampling'] = sampling
+                genre_metrics['confidence_intervals'] = sampling.pop('confidence_intervals')
             
             # 6. Guardar en base de datos
             self._save_genre_snapshot(genre, genre_metrics, tracks_list[:5])
@@ -215,9 +187,15 @@ class GenreAnalyzer:
                 "suggestion": "Try with a different genre or reduce the number of genres analyzed simultaneously"
             }
     
-    def analyze_multiple_genres(self, genres: Optional[List[str]] = None) -> Dict:
+    def analyze_multiple_genres(self, genres: Optional[List[str]] = None,
+                                sampling: Optional[Dict] = None,
+                                prefetched: Optional[Dict[str, Dict]] = None) -> Dict:
         """
         Analiza múltiples géneros (con delays para Development mode)
+
+        `sampling` acepta los mismos límites de muestreo que analyze_genre.
+        `prefetched` permite pasar análisis ya hechos (p.ej. por AnalysisPlan):
+        esos géneros no se vuelven a analizar.
         """
         if not genres:
             genres = self.target_genres[:4]  # Limitar a 4 géneros por defecto
@@ -228,14 +206,20 @@ class GenreAnalyzer:
             print(f"⚠️ Limitado a 5 géneros para evitar rate limiting")
         
         results = {}
+        prefetched = prefetched or {}
+        pending = [genre for genre in genres if genre not in prefetched]
         
-        for i, genre in enumerate(genres):
-            print(f"🎵 Analizando género {i+1}/{len(genres)}: {genre}")
-            results[genre] = self.analyze_genre(genre)
+        for genre in genres:
+            if genre in prefetched:
+                results[genre] = prefetched[genre]
+                continue
+
+            print(f"🎵 Analizando género {pending.index(genre)+1}/{len(pending)}: {genre}")
+            results[genre] = self.analyze_genre(genre, **(sampling or {}))
             
             # Delay entre géneros
-            if i < len(genres) - 1:
-                time.sleep(1)
+            if genre != pending[-1]:
+                throttle(1)
         
         # Calcular comparaciones
         comparison = self._generate_genre_comparison(results)
@@ -249,6 +233,339 @@ class GenreAnalyzer:
             "note": "Analysis limited by Spotify Development mode quotas"
         }
     
+    def _iter_genre_tracks(self, genre: str, budget: Dict, sampled_playlists: Set[str]) -> Iterator[Dict]:
+        """
+        Etapa playlists → tracks: recorre las playlists del género de forma perezosa
+        """
+        for playlist, check_snapshot in self._iter_genre_playlists(genre, budget['max_playlists']):
+            sampled_playlists.add(playlist.playlist_id)
+
+            try:
+                for track in self._iter_playlist_tracks(playlist, budget['max_tracks_per_playlist'], check_snapshot):
+                    yield {**track, 'from_playlist': playlist.name}
+            except SpotifyException as e:
+                # Playlist borrada o privada: fuera del catálogo y se sigue con la siguiente
+                if e.http_status not in (403, 404):
+                    raise
+                print(f"⚠️ Playlist {playlist.playlist_id} de {genre} no disponible ({e.http_status}), se quita del catálogo")
+                sampled_playlists.discard(playlist.playlist_id)
+                self._remove_playlist(playlist)
+
+    def _remove_playlist(self, playlist: GenrePlaylist):
+        state = inspect(playlist)
+        if state.persistent:
+            self.db.delete(playlist)
+        elif state.pending:
+            self.db.expunge(playlist)
+
+    def _unique_tracks(self, tracks: Iterator[Dict]) -> Iterator[Dict]:
+        """
+        Etapa de deduplicación por ID de track
+        """
+        seen = set()
+        for track in tracks:
+            if track['id'] not in seen:
+                seen.add(track['id'])
+                yield track
+
+    def _iter_genre_playlists(self, genre: str, max_playlists: int) -> Iterator[Tuple[GenrePlaylist, bool]]:
+        """
+        Devuelve las playlists del género desde el catálogo persistente y si hay que
+        comprobar su snapshot_id. Solo se busca en Spotify si el catálogo no tiene
+        suficientes playlists para el presupuesto y la última búsqueda del género
+        está caducada (o se hizo con un presupuesto menor): en géneros nicho con
+        pocas playlists no se repite la búsqueda en cada análisis.
+        """
+        discovery_limit = datetime.utcnow() - timedelta(days=self.PLAYLIST_DISCOVERY_DAYS)
+        catalog = self.db.query(GenrePlaylist).filter(
+            GenrePlaylist.genre == genre,
+            GenrePlaylist.discovered_at >= discovery_limit
+        ).order_by(GenrePlaylist.id).limit(max_playlists).all()
+
+        for playlist in catalog:
+            yield playlist, True
+
+        if len(catalog) >= max_playlists:
+            return
+
+        discovery = self.db.get(GenrePlaylistDiscovery, genre)
+        if (discovery is not None and discovery.searched_at >= discovery_limit and
+                (discovery.requested_playlists or 0) >= max_playlists):
+            return
+
+        if discovery is None:
+            discovery = GenrePlaylistDiscovery(genre=genre)
+            self.db.add(discovery)
+        discovery.searched_at = datetime.utcnow()
+        discovery.requested_playlists = max_playlists
+
+        # Las playlists que no se han vuelto a encontrar en una semana salen del catálogo
+        stale = self.db.query(GenrePlaylist).filter(
+            GenrePlaylist.genre == genre,
+            GenrePlaylist.discovered_at < discovery_limit
+        ).all()
+        for playlist in stale:
+            self.db.delete(playlist)
+        self.db.flush()
+
+        yield from self._discover_playlists(
+            genre, max_playlists - len(catalog), {p.playlist_id for p in catalog}
+        )
+
+    def _discover_playlists(self, genre: str, needed: int, known: Set[str]) -> Iterator[Tuple[GenrePlaylist, bool]]:
+        """
+        Busca playlists nuevas del género en Spotify (paginando si el presupuesto es grande)
+        y las añade al catálogo
+        """
+        print(f"🔎 Descubriendo playlists de {genre} en Spotify")
+
+        # Usar términos de búsqueda más específicos para cada género
+        search_terms = self._get_genre_search_terms(genre)
+
+        # Presupuesto por defecto: 2 búsquedas para evitar rate limiting
+        terms = search_terms[:2] if needed <= self.MAX_PLAYLISTS else search_terms
+        page_size = min(50, max(self.MAX_PLAYLISTS // 2, -(-needed // len(terms))))
+        max_pages = -(-needed // (page_size * len(terms)))
+
+        existing = {
+            p.playlist_id: p for p in self.db.query(GenrePlaylist).filter(GenrePlaylist.genre == genre)
+        }
+        found = 0
+
+        for search_term in terms:
+            for page in range(max_pages):
+                results = self.sp.search(
+                    q=search_term,
+                    type='playlist',
+                    limit=page_size,
+                    offset=page * page_size
+                )
+
+                throttle(0.5)
+
+                items = results['playlists']['items']
+                for playlist in items:
+                    if not playlist or playlist['tracks']['total'] <= 5 or playlist['id'] in known:
+                        continue
+
+                    # Verificar que el nombre de la playlist contenga el género
+                    playlist_name = playlist['name'].lower()
+                    if not (genre.lower() in playlist_name or any(term.split(':')[0] in playlist_name for term in search_terms)):
+                        continue
+
+                    known.add(playlist['id'])
+                    entry = existing.get(playlist['id'])
+                    if entry is None:
+                        entry = GenrePlaylist(genre=genre, playlist_id=playlist['id'])
+                        self.db.add(entry)
+
+                    # Los datos del resultado de búsqueda ya son metadata fresca
+                    entry.name = playlist['name']
+                    entry.track_count = playlist['tracks']['total']
+                    entry.discovered_at = datetime.utcnow()
+                    if entry.snapshot_id != playlist.get('snapshot_id'):
+                        entry.snapshot_id = playlist.get('snapshot_id')
+                        entry.tracks = None
+
+                    found += 1
+                    yield entry, False
+
+                    if found >= needed:
+                        return
+
+                if len(items) < page_size or not results['playlists'].get('next'):
+                    break
+
+    def _iter_playlist_tracks(self, playlist: GenrePlaylist, max_tracks: int,
+                              check_snapshot: bool = True) -> Iterator[Dict]:
+        """
+        Devuelve hasta max_tracks tracks de una playlist del catálogo.
+        Los tracks guardados solo se re-descargan si cambió su snapshot_id (una
+        llamada de metadata barata) o si superan PLAYLIST_TRACKS_MAX_AGE_DAYS.
+        Si el presupuesto pide más tracks de los guardados, se pagina desde donde
+        se quedó la última descarga.
+        """
+        tracks_limit = datetime.utcnow() - timedelta(days=self.PLAYLIST_TRACKS_MAX_AGE_DAYS)
+        has_tracks = (
+            playlist.tracks is not None and
+            playlist.tracks_fetched_at is not None and
+            playlist.tracks_fetched_at >= tracks_limit
+        )
+
+        # Si la playlist se acaba de descubrir la metadata de búsqueda ya es actual
+        if has_tracks and check_snapshot:
+            metadata = self.sp.playlist(
+                playlist.playlist_id,
+                fields="snapshot_id,name,tracks.total"
+            )
+            throttle(0.1)
+
+            playlist.name = metadata.get('name', playlist.name)
+            playlist.track_count = metadata.get('tracks', {}).get('total', playlist.track_count)
+            has_tracks = metadata.get('snapshot_id') == playlist.snapshot_id
+            playlist.snapshot_id = metadata.get('snapshot_id')
+
+        if not has_tracks:
+            playlist.tracks = []
+            playlist.tracks_scanned = 0
+            playlist.tracks_fetched_at = datetime.utcnow()
+
+        stored = playlist.tracks[:max_tracks]
+        yield from stored
+
+        yielded = len(stored)
+        scanned = playlist.tracks_scanned or 0
+
+        while yielded < max_tracks and (playlist.track_count is None or scanned < playlist.track_count):
+            results = self.sp.playlist_tracks(
+                playlist.playlist_id,
+                limit=min(100, max_tracks - yielded),
+                offset=scanned,
+                fields="next,items(track(id,name,popularity,artists(name,genres)))"
+            )
+
+            throttle(0.3)
+
+            page = []
+            for item in results['items']:
+                if (item['track'] and
+                    item['track']['id'] and
+                    item['track']['popularity'] > 0):
+
+                    # Nota: artists.genres no está disponible en playlist_tracks
+                    # Solo obtendremos el nombre del artista
+                    if item['track']['artists']:
+                        artist_name = item['track']['artists'][0]['name']
+                    else:
+                        artist_name = 'Unknown'
+
+                    page.append({
+                        'id': item['track']['id'],
+                        'name': item['track']['name'],
+                        'popularity': item['track']['popularity'],
+                        'artist': artist_name
+                    })
+
+            # Guardar cada página en el catálogo antes de entregarla
+            scanned += len(results['items'])
+            playlist.tracks = playlist.tracks + page
+            playlist.tracks_scanned = scanned
+
+            for track in page:
+                yielded += 1
+                yield track
+
+            if not results['items'] or not results.get('next'):
+                break
+
+    def _adaptive_sample(self, tracks: Iterator[Dict], max_tracks: int,
+                         precision: float) -> Tuple[List[Dict], List[Dict], Dict]:
+        """
+        Consume el pipeline de tracks por rondas (con sus audio features) hasta que
+        todos los intervalos de confianza miden menos de `precision` o se agota el presupuesto
+        """
+        tracks_list = []
+        features = []
+        features_enabled = True
+        intervals = {}
+        rounds = 0
+        converged = False
+
+        while len(tracks_list) < max_tracks:
+            batch = list(islice(tracks, min(self.ADAPTIVE_ROUND_SIZE, max_tracks - len(tracks_list))))
+            if not batch:
+                break
+
+            rounds += 1
+            tracks_list.extend(batch)
+
+            # Si la primera ronda no trae audio features no se vuelven a pedir
+            if features_enabled:
+                batch_features = list(self._iter_audio_features([t['id'] for t in batch]))
+                features.extend(batch_features)
+                features_enabled = bool(features)
+
+            intervals = self._bootstrap_intervals(tracks_list, features)
+            print(f"🔁 Ronda {rounds}: {len(tracks_list)} tracks, "
+                  f"ancho máximo {max(i['relative_width'] for i in intervals.values()):.3f}")
+
+            if (len(tracks_list) >= self.ADAPTIVE_ROUND_SIZE and
+                    all(i['relative_width'] <= precision for i in intervals.values())):
+                converged = True
+                break
+
+        return tracks_list, features, {
+            "adaptive": True,
+            "rounds": rounds,
+            "precision": precision,
+            "confidence": self.BOOTSTRAP_CONFIDENCE,
+            "converged": converged,
+            "confidence_intervals": intervals
+        }
+
+    def _bootstrap_intervals(self, tracks: List[Dict], audio_features: List[Dict]) -> Dict:
+        """
+        Intervalos de confianza bootstrap (percentil) de la media de cada métrica.
+        Vectorizado: cada remuestreo es una fila de conteos (cuántas veces sale cada
+        track), así todas las medias de todas las métricas salen de un único producto matricial.
+        """
+        # Métrica → (valores, rango usado para el ancho relativo)
+        samples = {
+            'avg_popularity': ([t['popularity'] for t in tracks], 100.0)
+        }
+        if audio_features:
+            samples['avg_energy'] = ([f['energy'] for f in audio_features], 1.0)
+            samples['avg_danceability'] = ([f['danceability'] for f in audio_features], 1.0)
+            samples['avg_valence'] = ([f['valence'] for f in audio_features], 1.0)
+            samples['avg_tempo'] = ([f['tempo'] for f in audio_features], 200.0)
+
+        # Semilla fija: mismos datos, mismos intervalos
+        rng = np.random.default_rng(0)
+        alpha = (1 - self.BOOTSTRAP_CONFIDENCE) / 2
+        intervals = {}
+
+        # Las audio features pueden tener distinto tamaño de muestra que los tracks
+        groups = {}
+        for metric, (values, scale) in samples.items():
+            groups.setdefault(len(values), []).append((metric, values, scale))
+
+        for n, group in groups.items():
+            data = np.array([values for _, values, _ in group], dtype=float).T  # (n, métricas)
+            resamples = self.BOOTSTRAP_RESAMPLES
+            picks = rng.integers(0, n, size=(resamples, n)) + np.arange(resamples)[:, None] * n
+            counts = np.bincount(picks.ravel(), minlength=resamples * n).reshape(resamples, n)
+            means = counts @ data / n  # (remuestreos, métricas)
+            lows, highs = np.quantile(means, [alpha, 1 - alpha], axis=0)
+
+            for (metric, _, scale), low, high in zip(group, lows, highs):
+                intervals[metric] = {
+                    "low": round(float(low), 3),
+                    "high": round(float(high), 3),
+                    "width": round(float(high - low), 3),
+                    "relative_width": round(float(high - low) / scale, 4)
+                }
+
+        return intervals
+
+    def _iter_audio_features(self, track_ids: List[str]) -> Iterator[Dict]:
+        """
+        Etapa de audio features en lotes de MAX_AUDIO_FEATURES_PER_REQUEST.
+        Deja de intentarlo en el primer fallo (Development Mode).
+        """
+        for i in range(0, len(track_ids), self.MAX_AUDIO_FEATURES_PER_REQUEST):
+            batch = track_ids[i:i + self.MAX_AUDIO_FEATURES_PER_REQUEST]
+
+            try:
+                batch_features = self.sp.audio_features(batch)
+                throttle(0.5)  # Delay entre lotes
+            except Exception as e:
+                print(f"⚠️ Audio features no disponibles (Development Mode): {str(e)[:100]}")
+                return
+
+            for features in batch_features or []:
+                if features is not None:
+                    yield features
+
     def _get_genre_search_terms(self, genre: str) -> List[str]:
         """
         Genera términos de búsqueda específicos para cada género
@@ -285,55 +602,10 @@ class GenreAnalyzer:
     def _estimate_audio_features(self, genre: str, avg_popularity: float, playlist_count: int) -> Dict:
         """
         Estima audio features basándose en características típicas del género
-        y métricas de popularidad cuando no hay datos reales disponibles
+        y métricas de popularidad cuando no hay datos reales disponibles.
+        Es determinista: las mismas entradas dan siempre la misma estimación.
         """
-        # Características base por género (basadas en conocimiento musical típico)
-        genre_profiles = {
-            'breakbeat': {'energy': 0.78, 'danceability': 0.72, 'valence': 0.65, 'tempo': 140, 'acousticness': 0.15, 'instrumentalness': 0.45},
-            'drum-and-bass': {'energy': 0.85, 'danceability': 0.75, 'valence': 0.60, 'tempo': 170, 'acousticness': 0.10, 'instrumentalness': 0.50},
-            'dubstep': {'energy': 0.82, 'danceability': 0.70, 'valence': 0.50, 'tempo': 140, 'acousticness': 0.12, 'instrumentalness': 0.55},
-            'techno': {'energy': 0.80, 'danceability': 0.78, 'valence': 0.55, 'tempo': 128, 'acousticness': 0.08, 'instrumentalness': 0.65},
-            'house': {'energy': 0.75, 'danceability': 0.80, 'valence': 0.70, 'tempo': 125, 'acousticness': 0.10, 'instrumentalness': 0.60},
-            'electronic': {'energy': 0.70, 'danceability': 0.68, 'valence': 0.60, 'tempo': 120, 'acousticness': 0.15, 'instrumentalness': 0.40},
-            'pop': {'energy': 0.65, 'danceability': 0.70, 'valence': 0.65, 'tempo': 118, 'acousticness': 0.25, 'instrumentalness': 0.05},
-            'rock': {'energy': 0.72, 'danceability': 0.55, 'valence': 0.58, 'tempo': 125, 'acousticness': 0.20, 'instrumentalness': 0.10},
-            'hip-hop': {'energy': 0.68, 'danceability': 0.75, 'valence': 0.60, 'tempo': 95, 'acousticness': 0.18, 'instrumentalness': 0.08},
-            'indie': {'energy': 0.62, 'danceability': 0.60, 'valence': 0.55, 'tempo': 115, 'acousticness': 0.35, 'instrumentalness': 0.15},
-            'hardstyle': {'energy': 0.90, 'danceability': 0.75, 'valence': 0.65, 'tempo': 150, 'acousticness': 0.05, 'instrumentalness': 0.50},
-            'psytrance': {'energy': 0.88, 'danceability': 0.70, 'valence': 0.70, 'tempo': 145, 'acousticness': 0.05, 'instrumentalness': 0.70},
-            'darkwave': {'energy': 0.60, 'danceability': 0.50, 'valence': 0.35, 'tempo': 110, 'acousticness': 0.30, 'instrumentalness': 0.40},
-            'industrial': {'energy': 0.85, 'danceability': 0.65, 'valence': 0.40, 'tempo': 130, 'acousticness': 0.08, 'instrumentalness': 0.45},
-            'witch-house': {'energy': 0.65, 'danceability': 0.55, 'valence': 0.30, 'tempo': 105, 'acousticness': 0.20, 'instrumentalness': 0.50},
-        }
-
-        # Perfil por defecto para géneros desconocidos
-        default_profile = {'energy': 0.65, 'danceability': 0.65, 'valence': 0.55, 'tempo': 120, 'acousticness': 0.25, 'instrumentalness': 0.30}
-
-        # Obtener perfil del género o usar default
-        base_profile = genre_profiles.get(genre.lower(), default_profile)
-
-        # Ajustar basado en popularidad (géneros más populares tienden a ser más bailables y con más valencia)
-        popularity_factor = avg_popularity / 100.0
-
-        # Añadir variación basada en la popularidad y presencia en playlists
-        playlist_factor = min(playlist_count / 10.0, 1.0)  # Normalizar
-
-        estimated = {
-            'energy': round(base_profile['energy'] + (popularity_factor * 0.05) + np.random.uniform(-0.05, 0.05), 3),
-            'danceability': round(base_profile['danceability'] + (popularity_factor * 0.08) + np.random.uniform(-0.05, 0.05), 3),
-            'valence': round(base_profile['valence'] + (popularity_factor * 0.10) + np.random.uniform(-0.05, 0.05), 3),
-            'tempo': round(base_profile['tempo'] + (playlist_factor * 5) + np.random.uniform(-5, 5), 1),
-            'acousticness': round(base_profile['acousticness'] - (popularity_factor * 0.05) + np.random.uniform(-0.03, 0.03), 3),
-            'instrumentalness': round(base_profile['instrumentalness'] + np.random.uniform(-0.05, 0.05), 3)
-        }
-
-        # Asegurar que los valores están en rangos válidos
-        for key in ['energy', 'danceability', 'valence', 'acousticness', 'instrumentalness']:
-            estimated[key] = max(0.0, min(1.0, estimated[key]))
-
-        estimated['tempo'] = max(60.0, min(200.0, estimated['tempo']))
-
-        return estimated
+        return estimate_audio_features(genre, avg_popularity, playlist_count)
 
     def _calculate_metrics(self, tracks: List[Dict],
                           audio_features: List[Dict],
@@ -378,6 +650,7 @@ class GenreAnalyzer:
             ]
         }
     
+    @timed("genre_comparison")
     def _generate_genre_comparison(self, results: Dict) -> Dict:
         """
         Genera comparaciones entre géneros
@@ -405,41 +678,17 @@ class GenreAnalyzer:
             key=lambda x: x[1].get('avg_danceability', 0)
         )
         
-        # Detectar géneros underground (criterios mejorados)
+        # Detectar géneros underground (criterios compartidos con el ranking global)
         underground_candidates = []
         for genre, metrics in valid_results.items():
-            popularity = metrics.get('avg_popularity', 0)
-            energy = metrics.get('avg_energy', 0)
-            danceability = metrics.get('avg_danceability', 0)
-
-            # Criterios más flexibles para detectar underground gems:
-            # 1. Baja popularidad (<50) con alta energía (>0.65)
-            # 2. O muy baja popularidad (<35) con características interesantes
-            is_underground = False
-            reason = ""
-
-            if popularity < 50 and energy > 0.65:
-                is_underground = True
-                reason = f"Alta energía ({energy:.2f}) con popularidad emergente ({popularity:.1f})"
-            elif popularity < 35 and danceability > 0.60:
-                is_underground = True
-                reason = f"Muy bailable ({danceability:.2f}) y poco conocido ({popularity:.1f})"
-            elif popularity < 40 and energy > 0.60 and danceability > 0.65:
-                is_underground = True
-                reason = f"Buena combinación energía/bailabilidad con baja exposición ({popularity:.1f})"
-
-            if is_underground:
-                # Score compuesto: prioriza alta energía y baja popularidad
-                underground_score = (energy * 0.5) + (danceability * 0.3) - (popularity / 100 * 0.2)
-                underground_candidates.append({
-                    'name': genre,
-                    'genre': genre,
-                    'underground_score': round(underground_score, 3),
-                    'avg_popularity': popularity,
-                    'avg_energy': energy,
-                    'avg_danceability': danceability,
-                    'reason': reason
-                })
+            entry = genre_entry(
+                genre,
+                metrics.get('avg_popularity', 0),
+                metrics.get('avg_energy', 0),
+                metrics.get('avg_danceability', 0)
+            )
+            if entry is not None:
+                underground_candidates.append(entry)
 
         underground_candidates.sort(key=lambda x: x['underground_score'], reverse=True)
 
@@ -520,6 +769,16 @@ class GenreAnalyzer:
             
             self.db.add(snapshot)
             self.db.commit()
+            SNAPSHOT_WRITES.inc(table="genre_snapshots")
+            
+            # Mantener actualizado el ranking underground global
+            if genre_leaderboard.built:
+                genre_leaderboard.update(genre, genre_entry(
+                    genre,
+                    metrics.get('avg_popularity', 0),
+                    metrics.get('avg_energy', 0),
+                    metrics.get('avg_danceability', 0)
+                ))
             
             print(f"💾 Snapshot guardado en base de datos para {genre}")
             
@@ -0,0 +1,114 @@
+"""
+Artistas guardados por género
+Consultas sobre la tabla artist_genres (índice genre, popularity, artist_id):
+listar un género por popularidad con paginación por cursor y agregar sus
+popularidades sin recorrer la tabla artists ni decodificar el JSON de géneros
+"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..core.pagination import keyset_page
+from ..models.artist import Artist, ArtistGenre
+
+# Ancho de los tramos del histograma de popularidad
+POPULARITY_BUCKET_SIZE = 10
+
+
+def normalize_genre(genre: str) -> str:
+    return " ".join((genre or "").lower().split())[:100]
+
+
+def genre_rows(artist_id: str, genres: Iterable[str], popularity: int) -> List[Dict]:
+    """
+    Filas de artist_genres de un artista (géneros normalizados y sin repetir)
+    """
+    names = dict.fromkeys(normalize_genre(genre) for genre in genres or [])
+    return [
+        {"artist_id": artist_id, "genre": genre, "popularity": popularity or 0}
+        for genre in names if genre
+    ]
+
+
+def sync_artist_genres(db: Session, artist_id: str, genres: Iterable[str], popularity: int):
+    """
+    Deja artist_genres igual que los géneros actuales del artista (sin commit)
+    """
+    wanted = {row["genre"]: row for row in genre_rows(artist_id, genres, popularity)}
+    existing = db.query(ArtistGenre).filter(ArtistGenre.artist_id == artist_id).all()
+
+    for row in existing:
+        if row.genre not in wanted:
+            db.delete(row)
+        else:
+            row.popularity = wanted.pop(row.genre)["popularity"]
+
+    for row in wanted.values():
+        db.add(ArtistGenre(**row))
+
+
+def artists_by_genre(
+    db: Session,
+    genre: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    min_popularity: Optional[int] = None,
+    max_popularity: Optional[int] = None
+) -> Dict:
+    """
+    Artistas de un género, de más a menos populares
+    """
+    query = (
+        db.query(ArtistGenre.artist_id, ArtistGenre.popularity, Artist.name, Artist.followers)
+        .join(Artist, Artist.id == ArtistGenre.artist_id)
+        .filter(ArtistGenre.genre == normalize_genre(genre))
+    )
+    if min_popularity is not None:
+        query = query.filter(ArtistGenre.popularity >= min_popularity)
+    if max_popularity is not None:
+        query = query.filter(ArtistGenre.popularity <= max_popularity)
+
+    page = keyset_page(query, [ArtistGenre.popularity, ArtistGenre.artist_id], cursor, limit)
+    page["items"] = [
+        {
+            "id": row.artist_id,
+            "name": row.name,
+            "popularity": row.popularity,
+            "followers": row.followers
+        }
+        for row in page["items"]
+    ]
+    return page
+
+
+def genre_artist_stats(db: Session, genre: str) -> Dict:
+    """
+    Agregados de popularidad de los artistas de un género (solo con el índice)
+    """
+    genre = normalize_genre(genre)
+    in_genre = ArtistGenre.genre == genre
+
+    total, average, minimum, maximum = db.query(
+        func.count(), func.avg(ArtistGenre.popularity),
+        func.min(ArtistGenre.popularity), func.max(ArtistGenre.popularity)
+    ).filter(in_genre).one()
+
+    bucket = (ArtistGenre.popularity // POPULARITY_BUCKET_SIZE).label("bucket")
+    histogram = db.query(bucket, func.count()).filter(in_genre).group_by(bucket).order_by(bucket).all()
+
+    return {
+        "genre": genre,
+        "artists": total,
+        "avg_popularity": round(float(average), 2) if average is not None else None,
+        "min_popularity": minimum,
+        "max_popularity": maximum,
+        "popularity_histogram": [
+            {
+                "from": int(start) * POPULARITY_BUCKET_SIZE,
+                "to": min(int(start) * POPULARITY_BUCKET_SIZE + POPULARITY_BUCKET_SIZE - 1, 100),
+                "artists": count
+            }
+            for start, count in histogram
+        ]
+    }
@@ -0,0 +1,163 @@
+"""
+Índice en memoria de artistas similares
+Vecinos más cercanos sobre los vectores de features de ArtistSnapshot
+"""
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.artist import Artist, ArtistSnapshot
+
+# Features usadas en el vector y rango para normalizarlas a [0, 1]
+FEATURE_RANGES = [
+    ('avg_energy', 0.0, 1.0),
+    ('avg_danceability', 0.0, 1.0),
+    ('avg_valence', 0.0, 1.0),
+    ('avg_tempo', 60.0, 200.0),
+    ('popularity', 0.0, 100.0),
+    ('consistency_score', 0.0, 1.0),
+]
+
+
+class ArtistSimilarityIndex:
+    """
+    Índice de vecinos más cercanos (distancia euclídea) sobre vectores normalizados.
+    Los vectores viven en una matriz numpy contigua que crece por duplicación,
+    así una consulta es un único producto matriz-vector (milisegundos con 1M artistas).
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.RLock()
+        self._dim = len(FEATURE_RANGES)
+        self._vectors = np.zeros((initial_capacity, self._dim), dtype=np.float32)
+        self._sq_norms = np.zeros(initial_capacity, dtype=np.float32)
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.version = 0  # Cambia con cada actualización (validador HTTP)
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def vectorize(features: Dict) -> np.ndarray:
+        """
+        Convierte las métricas de un artista en un vector normalizado
+        """
+        vector = np.empty(len(FEATURE_RANGES), dtype=np.float32)
+        for i, (key, low, high) in enumerate(FEATURE_RANGES):
+            value = features.get(key) or 0.0
+            vector[i] = (float(value) - low) / (high - low)
+        return np.clip(vector, 0.0, 1.0)
+
+    def build(self, db: Session):
+        """
+        Construye el índice desde el último snapshot de cada artista
+        """
+        latest = db.query(
+            func.max(ArtistSnapshot.id).label('id')
+        ).group_by(ArtistSnapshot.artist_id).subquery()
+
+        rows = db.query(ArtistSnapshot, Artist.name).join(
+            latest, ArtistSnapshot.id == latest.c.id
+        ).outerjoin(
+            Artist, Artist.id == ArtistSnapshot.artist_id
+        ).yield_per(10000)
+
+        with self._lock:
+            for snapshot, name in rows:
+                self._upsert_vector(
+                    snapshot.artist_id,
+                    name or snapshot.artist_id,
+                    self.vectorize({key: getattr(snapshot, key) for key, _, _ in FEATURE_RANGES})
+                )
+            self.built = True
+            self.version += 1
+
+        print(f"🧭 Índice de similitud construido con {len(self)} artistas")
+
+    def upsert(self, artist_id: str, name: str, features: Dict):
+        """
+        Inserta o actualiza el vector de un artista (actualización incremental)
+        """
+        with self._lock:
+            self._upsert_vector(artist_id, name, self.vectorize(features))
+            self.version += 1
+
+    def query(self, artist_id: str, k: int = 10) -> Optional[List[Dict]]:
+        """
+        Devuelve los k artistas más cercanos, o None si el artista no está indexado
+        """
+        with self._lock:
+            row = self._rows.get(artist_id)
+            if row is None:
+                return None
+
+            n = len(self._ids)
+            target = self._vectors[row]
+
+            # |x - q|² = |x|² - 2·x·q + |q|²
+            distances = self._sq_norms[:n] - 2.0 * (self._vectors[:n] @ target) + self._sq_norms[row]
+            distances[row] = np.inf
+
+            k = min(k, n - 1)
+            if k <= 0:
+                return []
+
+            candidates = np.argpartition(distances, k - 1)[:k]
+            candidates = candidates[np.argsort(distances[candidates])]
+
+            max_distance = np.sqrt(self._dim)
+            results = []
+            for idx in candidates:
+                distance = float(np.sqrt(max(distances[idx], 0.0)))
+                results.append({
+                    'id': self._ids[idx],
+                    'name': self._names[idx],
+                    'distance': round(distance, 4),
+                    'similarity': round(float(1 - distance / max_distance), 4)
+                })
+            return results
+
+    def _upsert_vector(self, artist_id: str, name: str, vector: np.ndarray):
+        row = self._rows.get(artist_id)
+        if row is None:
+            row = len(self._ids)
+            if row >= self._vectors.shape[0]:
+                self._grow()
+            self._ids.append(artist_id)
+            self._names.append(name)
+            self._rows[artist_id] = row
+        else:
+            self._names[row] = name
+
+        self._vectors[row] = vector
+        self._sq_norms[row] = float(vector @ vector)
+
+    def _grow(self):
+        capacity = self._vectors.shape[0] * 2
+        vectors = np.zeros((capacity, self._dim), dtype=np.float32)
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        vectors[:len(self._ids)] = self._vectors[:len(self._ids)]
+        sq_norms[:len(self._ids)] = self._sq_norms[:len(self._ids)]
+        self._vectors = vectors
+        self._sq_norms = sq_norms
+
+
+# Índice compartido por todo el proceso
+similarity_index = ArtistSimilarityIndex()
+_build_lock = threading.Lock()
+
+
+def get_similarity_index(db: Session) -> ArtistSimilarityIndex:
+    """
+    Devuelve el índice global, construyéndolo la primera vez que se usa
+    """
+    if not similarity_index.built:
+        with _build_lock:
+            if not similarity_index.built:
+                similarity_index.build(db)
+    return similarity_index
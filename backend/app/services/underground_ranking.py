@@ -0,0 +1,225 @@
+"""
+Ranking global de underground gems
+Puntúa todos los géneros y artistas del almacén de snapshots y mantiene el top-k
+"""
+import heapq
+import threading
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.artist import Artist, ArtistSnapshot
+from ..models.genre import GenreSnapshot
+
+
+def underground_reason(popularity: float, energy: float, danceability: float) -> Optional[str]:
+    """
+    Devuelve la razón por la que un género/artista es underground, o None si no lo es
+
+    Criterios flexibles para detectar underground gems:
+    1. Baja popularidad (<50) con alta energía (>0.65)
+    2. O muy baja popularidad (<35) con características interesantes
+    """
+    if popularity < 50 and energy > 0.65:
+        return f"Alta energía ({energy:.2f}) con popularidad emergente ({popularity:.1f})"
+    if popularity < 35 and danceability > 0.60:
+        return f"Muy bailable ({danceability:.2f}) y poco conocido ({popularity:.1f})"
+    if popularity < 40 and energy > 0.60 and danceability > 0.65:
+        return f"Buena combinación energía/bailabilidad con baja exposición ({popularity:.1f})"
+    return None
+
+
+def underground_score(popularity: float, energy: float, danceability: float) -> float:
+    """
+    Score compuesto: prioriza alta energía y baja popularidad
+    """
+    return (energy * 0.5) + (danceability * 0.3) - (popularity / 100 * 0.2)
+
+
+def build_underground_entry(name: str, popularity: float, energy: float, danceability: float) -> Optional[Dict]:
+    """
+    Crea la entrada de ranking de un género/artista, o None si no es underground
+    """
+    popularity = float(popularity or 0)
+    energy = float(energy or 0)
+    danceability = float(danceability or 0)
+
+    reason = underground_reason(popularity, energy, danceability)
+    if reason is None:
+        return None
+
+    return {
+        'name': name,
+        'underground_score': round(underground_score(popularity, energy, danceability), 3),
+        'avg_popularity': popularity,
+        'avg_energy': energy,
+        'avg_danceability': danceability,
+        'reason': reason
+    }
+
+
+def _rank_key(entry: Dict):
+    return (entry['underground_score'], entry['name'])
+
+
+class UndergroundLeaderboard:
+    """
+    Ranking incremental de underground gems.
+    Guarda la última entrada de cada elemento y un top-k precalculado:
+    las peticiones leen el top-k en coste constante y las actualizaciones
+    solo recalculan (con un heap acotado) cuando afectan al top-k.
+    """
+
+    def __init__(self, top_k: int = 50):
+        self.top_k = top_k
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict] = {}
+        self._scored = set()
+        self._top: List[Dict] = []
+        self.version = 0
+        self.built = False
+
+    @property
+    def total_scored(self) -> int:
+        return len(self._scored)
+
+    def load(self, rows: Iterable[tuple]):
+        """
+        Carga el ranking desde un stream de filas (key, entry o None), una por elemento,
+        pasándolas por un heap acotado de tamaño top_k
+        """
+        heap = []
+        with self._lock:
+            for key, entry in rows:
+                self._scored.add(key)
+                if entry is None:
+                    self._entries.pop(key, None)
+                    continue
+                self._entries[key] = entry
+                if len(heap) < self.top_k:
+                    heapq.heappush(heap, (_rank_key(entry), key))
+                elif _rank_key(entry) > heap[0][0]:
+                    heapq.heappushpop(heap, (_rank_key(entry), key))
+
+            self._top = [self._entries[key] for _, key in sorted(heap, reverse=True)]
+
+            self.built = True
+            self.version += 1
+
+    def update(self, key: str, entry: Optional[Dict]):
+        """
+        Actualiza un elemento con su último snapshot
+        """
+        with self._lock:
+            self._scored.add(key)
+            previous = self._entries.get(key)
+            in_top = previous is not None and any(e is previous for e in self._top)
+
+            if entry is None:
+                if previous is None:
+                    return
+                del self._entries[key]
+                if in_top:
+                    self._recompute_top()
+                    self.version += 1
+                return
+
+            self._entries[key] = entry
+
+            if in_top:
+                if _rank_key(entry) >= _rank_key(previous):
+                    self._top = [entry if e is previous else e for e in self._top]
+                    self._top.sort(key=_rank_key, reverse=True)
+                else:
+                    self._recompute_top()
+            elif len(self._top) < self.top_k or _rank_key(entry) > _rank_key(self._top[-1]):
+                self._top.append(entry)
+                self._top.sort(key=_rank_key, reverse=True)
+                del self._top[self.top_k:]
+            else:
+                return
+
+            self.version += 1
+
+    def top(self, limit: int) -> List[Dict]:
+        """
+        Devuelve las mejores `limit` entradas (limit <= top_k)
+        """
+        with self._lock:
+            return list(self._top[:limit])
+
+    def _recompute_top(self):
+        self._top = heapq.nlargest(self.top_k, self._entries.values(), key=_rank_key)
+
+
+# Rankings compartidos por todo el proceso
+genre_leaderboard = UndergroundLeaderboard()
+artist_leaderboard = UndergroundLeaderboard()
+_build_lock = threading.Lock()
+
+
+def genre_entry(genre: str, popularity: float, energy: float, danceability: float) -> Optional[Dict]:
+    entry = build_underground_entry(genre, popularity, energy, danceability)
+    if entry is not None:
+        entry['genre'] = genre
+    return entry
+
+
+def artist_entry(artist_id: str, name: str, popularity: float, energy: float, danceability: float) -> Optional[Dict]:
+    entry = build_underground_entry(name, popularity, energy, danceability)
+    if entry is not None:
+        entry['id'] = artist_id
+    return entry
+
+
+def _stream_genre_rows(db: Session):
+    latest = db.query(
+        func.max(GenreSnapshot.id).label('id')
+    ).group_by(GenreSnapshot.genre).subquery()
+
+    rows = db.query(
+        GenreSnapshot.genre,
+        GenreSnapshot.avg_popularity,
+        GenreSnapshot.avg_energy,
+        GenreSnapshot.avg_danceability
+    ).join(latest, GenreSnapshot.id == latest.c.id).yield_per(10000)
+
+    for genre, popularity, energy, danceability in rows:
+        yield genre, genre_entry(genre, popularity, energy, danceability)
+
+
+def _stream_artist_rows(db: Session):
+    latest = db.query(
+        func.max(ArtistSnapshot.id).label('id')
+    ).group_by(ArtistSnapshot.artist_id).subquery()
+
+    rows = db.query(
+        ArtistSnapshot.artist_id,
+        Artist.name,
+        ArtistSnapshot.popularity,
+        ArtistSnapshot.avg_energy,
+        ArtistSnapshot.avg_danceability
+    ).join(
+        latest, ArtistSnapshot.id == latest.c.id
+    ).outerjoin(
+        Artist, Artist.id == ArtistSnapshot.artist_id
+    ).yield_per(10000)
+
+    for artist_id, name, popularity, energy, danceability in rows:
+        yield artist_id, artist_entry(artist_id, name or artist_id, popularity, energy, danceability)
+
+
+def get_underground_leaderboards(db: Session) -> Dict[str, UndergroundLeaderboard]:
+    """
+    Devuelve los rankings globales, cargándolos la primera vez que se usan
+    """
+    if not (genre_leaderboard.built and artist_leaderboard.built):
+        with _build_lock:
+            if not genre_leaderboard.built:
+                genre_leaderboard.load(_stream_genre_rows(db))
+            if not artist_leaderboard.built:
+                artist_leaderboard.load(_stream_artist_rows(db))
+            print(f"💎 Ranking underground cargado: {genre_leaderboard.total_scored} géneros, "
+                  f"{artist_leaderboard.total_scored} artistas")
+
+    return {"genres": genre_leaderboard, "artists": artist_leaderboard}
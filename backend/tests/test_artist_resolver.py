@@ -0,0 +1,44 @@
+"""
+Un artista que deja de estar disponible por ID no vuelve a resolverse por nombre
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.artist import Artist, ArtistAlias, Base
+from app.services.artist_comparator import ArtistComparator
+from app.services.artist_resolver import ArtistResolver
+from app.services import artist_comparator
+
+
+class UnavailableSpotify:
+    """Falla al pedir el artista por ID y no lo encuentra al buscar por nombre"""
+
+    def artist(self, artist_id):
+        raise Exception("http status: 404")
+
+    def search(self, q, type, limit):
+        return {"artists": {"items": []}}
+
+
+def test_forget_drops_alias_row_and_name_keys(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path}/artists.db")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Artist(id="gone", name="The Muse"))
+    db.add(ArtistAlias(alias="muse", artist_id="gone"))
+    db.commit()
+
+    resolver = ArtistResolver()
+    resolver.build(db)
+    monkeypatch.setattr(artist_comparator, "artist_resolver", resolver)
+    monkeypatch.setattr(artist_comparator, "get_artist_resolver", lambda db: resolver)
+
+    comparator = ArtistComparator.__new__(ArtistComparator)
+    comparator.sp, comparator.db = UnavailableSpotify(), db
+
+    assert resolver.resolve("Muse") == "gone"
+    assert comparator.search_artist("Muse") is None
+    assert db.get(ArtistAlias, "muse") is None
+    assert resolver.resolve("Muse") is None
+    db.close()
+    engine.dispose()
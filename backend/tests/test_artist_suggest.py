@@ -0,0 +1,44 @@
+"""
+Los prefijos cortos devuelven los artistas más populares aunque haya miles de
+claves delante en orden alfabético
+"""
+from app.services.artist_suggest import ArtistSuggestIndex
+
+
+def build_index(count: int) -> ArtistSuggestIndex:
+    index = ArtistSuggestIndex()
+    for number in range(count):
+        index.upsert(f"id{number}", f"Aa {number:05d}", 1)
+    index.built = True
+    return index
+
+
+def names(suggestions):
+    return [suggestion["name"] for suggestion in suggestions]
+
+
+def test_short_prefix_ranks_whole_range():
+    index = build_index(2000)
+    index.upsert("star", "Azure Ray", 90)
+    assert names(index.suggest("a", limit=3))[0] == "Azure Ray"
+    assert names(index.suggest("az", limit=3)) == ["Azure Ray"]
+
+
+def test_short_prefix_top_follows_upserts():
+    index = build_index(100)
+    index.upsert("star", "Azure Ray", 90)
+    assert names(index.suggest("a", limit=1)) == ["Azure Ray"]
+
+    index.upsert("rising", "Aa 00099", 95)
+    assert names(index.suggest("a", limit=2)) == ["Aa 00099", "Azure Ray"]
+
+    # Baja al fondo: otro artista fuera del top ocupa su sitio
+    index.upsert("rising", "Aa 00099", 0)
+    index.upsert("star", "Azure Ray", 0)
+    top = names(index.suggest("a", limit=50))
+    assert "Azure Ray" not in top and "Aa 00099" not in top
+    assert len(top) == 50
+
+    index.upsert("star", "Bjork", 90)
+    assert "Azure Ray" not in names(index.suggest("a", limit=50))
+    assert names(index.suggest("b", limit=1)) == ["Bjork"]
@@ -0,0 +1,45 @@
+"""
+La caché HTTP queda por dentro de CORS: las respuestas repetidas y los 304
+también llevan las cabeceras CORS
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/test_http_cache.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.http_cache import response_cache  # noqa: E402
+from app.main import app  # noqa: E402
+
+ORIGIN = {"Origin": "http://dashboard.example"}
+URL = "/api/artists/suggest?q=zzzz&fallback=false"
+
+
+@pytest.fixture
+def client():
+    response_cache.clear()
+    with TestClient(app) as client:
+        yield client
+    response_cache.clear()
+
+
+def test_cached_response_keeps_cors_headers(client):
+    first = client.get(URL, headers=ORIGIN)
+    assert first.status_code == 200
+    assert "access-control-allow-origin" in first.headers
+
+    cached = client.get(URL, headers=ORIGIN)
+    assert cached.status_code == 200
+    assert cached.headers["etag"] == first.headers["etag"]
+    assert "access-control-allow-origin" in cached.headers
+
+
+def test_not_modified_keeps_cors_headers(client):
+    first = client.get(URL, headers=ORIGIN)
+
+    not_modified = client.get(URL, headers={**ORIGIN, "If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert "access-control-allow-origin" in not_modified.headers
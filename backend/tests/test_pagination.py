@@ -0,0 +1,57 @@
+"""
+Cursores de los listados: tipos comprobados y, con género, la popularidad de artist_genres
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.models.artist import Artist, ArtistGenre, ArtistSnapshot, Base
+from app.services.catalog_browser import list_artists
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/catalog.db")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("values", [
+    ["50", "id"],
+    [True, "id"],
+    [50, 7],
+    [{"a": 1}, "id"],
+    [None, "id"],
+    [50],
+])
+def test_decode_cursor_rejects_wrong_types(values):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(values), [Artist.popularity, Artist.id])
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("no-es-un-cursor", [Artist.popularity, Artist.id])
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor([{"dt": "ayer"}, 1]), [ArtistSnapshot.date, ArtistSnapshot.id])
+
+
+def test_genre_cursor_follows_artist_genres_popularity(db):
+    # artists.popularity desfasada respecto a artist_genres (se ordena por la segunda)
+    for number, (stored, indexed) in enumerate([(10, 90), (80, 70), (20, 60), (90, 50)]):
+        db.add(Artist(id=f"a{number}", name=f"Artist {number}", popularity=stored))
+        db.add(ArtistGenre(artist_id=f"a{number}", genre="techno", popularity=indexed))
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = list_artists(db, 1, cursor=cursor, genre="techno")
+        seen += [artist["id"] for artist in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["a0", "a1", "a2", "a3"]
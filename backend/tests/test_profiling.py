@@ -0,0 +1,31 @@
+"""
+?_profile=1 solo cambia la respuesta con PROFILING_TOKEN configurado
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiling import PROFILING_TOKEN_ENV, ProfilingMiddleware
+
+app = FastAPI()
+app.add_middleware(ProfilingMiddleware)
+
+
+@app.get("/ping")
+async def ping():
+    return {"status": "success", "data": "pong"}
+
+
+def test_flag_ignored_when_profiling_disabled(monkeypatch):
+    monkeypatch.delenv(PROFILING_TOKEN_ENV, raising=False)
+    response = TestClient(app).get("/ping?_profile=1")
+    assert response.status_code == 200
+    assert response.json()["data"] == "pong"
+
+
+def test_wrong_token_rejected_when_profiling_enabled(monkeypatch):
+    monkeypatch.setenv(PROFILING_TOKEN_ENV, "secreto")
+    client = TestClient(app)
+    assert client.get("/ping?_profile=1", headers={"X-Profile-Token": "otro"}).status_code == 403
+    profiled = client.get("/ping?_profile=1", headers={"X-Profile-Token": "secreto"})
+    assert profiled.status_code == 200
+    assert "profile_id" in profiled.json()["data"]
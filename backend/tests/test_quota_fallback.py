@@ -0,0 +1,44 @@
+"""
+Si Redis falla, el coordinador de cuota usa la contabilidad local y vuelve a
+probar Redis pasado QUOTA_REDIS_RETRY_SECONDS
+"""
+import time
+
+from app.core import rate_limit
+from app.core.metrics import SPOTIFY_QUOTA_DEGRADED
+from app.core.rate_limit import MemoryQuotaBackend, QuotaCoordinator
+
+
+class FlakyBackend:
+    """Falla las primeras `failures` peticiones de cuota"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    def try_acquire(self, participant, weight, budget, window):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("redis caído")
+        return 0
+
+    def describe(self):
+        return "flaky"
+
+
+def test_falls_back_and_retries_redis(monkeypatch):
+    monkeypatch.setattr(rate_limit, "QUOTA_REDIS_RETRY_SECONDS", 0.05)
+    backend = FlakyBackend(failures=1)
+    quota = QuotaCoordinator(backend=backend, prefix="test:quota:fallback")
+
+    quota.acquire("GET search")
+    assert quota.degraded
+    assert isinstance(quota.backend, MemoryQuotaBackend)
+    assert SPOTIFY_QUOTA_DEGRADED.value(coordinator="test:quota:fallback") == 1
+
+    time.sleep(0.1)
+    quota.acquire("GET search")
+    assert not quota.degraded
+    assert quota.backend is backend
+    assert backend.calls == 2
+    assert SPOTIFY_QUOTA_DEGRADED.value(coordinator="test:quota:fallback") == 0
@@ -0,0 +1,57 @@
+"""
+Sesiones de usuario (caducidad y revocación) y state de OAuth de un solo uso
+"""
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/test_user_sessions.db")
+
+from app.core import user_clients as module  # noqa: E402
+from app.core.user_clients import (  # noqa: E402
+    DatabaseTokenHandler, create_oauth_state, create_session, read_session, verify_oauth_state
+)
+from app.models.user import Base  # noqa: E402
+
+TOKEN = {"access_token": "a", "refresh_token": "r", "token_type": "Bearer", "expires_at": 2_000_000_000}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/users.db")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def login(session_factory, user_id="user1", nonce="n1"):
+    DatabaseTokenHandler(user_id, session_factory).save_token_to_cache(TOKEN, session_nonce=nonce)
+    return create_session(user_id, nonce)
+
+
+def test_session_reads_back(session_factory):
+    session = login(session_factory)
+    assert read_session(session, session_factory) == "user1"
+    assert read_session(session + "x", session_factory) is None
+
+
+def test_new_login_revokes_previous_session(session_factory):
+    old = login(session_factory, nonce="n1")
+    new = login(session_factory, nonce="n2")
+    assert read_session(old, session_factory) is None
+    assert read_session(new, session_factory) == "user1"
+
+
+def test_session_expires(session_factory, monkeypatch):
+    session = login(session_factory)
+    monkeypatch.setattr(module, "SESSION_MAX_AGE_SECONDS", -1)
+    assert read_session(session, session_factory) is None
+
+
+def test_oauth_state_is_single_use(session_factory):
+    state = create_oauth_state(session_factory)
+    assert verify_oauth_state(state, session_factory)
+    assert not verify_oauth_state(state, session_factory)
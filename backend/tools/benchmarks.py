@@ -0,0 +1,254 @@
+"""
+Micro-benchmarks de las funciones de cálculo puro de los servicios
+
+Mide tiempo y pico de memoria de las agregaciones y comparaciones con entradas
+sintéticas de 5 a 100k elementos, y falla (exit 1) si alguna medida empeora
+más de un umbral respecto a una ejecución de referencia.
+
+Uso (desde backend/):
+    python -m tools.benchmarks --output bench_baseline.json
+    python -m tools.benchmarks --baseline bench_baseline.json --threshold 0.25
+    python -m tools.benchmarks --only perform_comparison --sizes 5,1000
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app.services.artist_comparator import ArtistComparator
+from app.services.feature_estimator import GENRE_PROFILES
+from app.services.genre_analyzer import GenreAnalyzer
+
+DEFAULT_SIZES = (5, 100, 1_000, 10_000, 100_000)
+
+# Tiempo mínimo acumulado por medida y repeticiones máximas
+MIN_MEASURE_SECONDS = 0.2
+MAX_REPEATS = 50
+
+# Umbrales de regresión por defecto (fracción sobre la referencia)
+DEFAULT_TIME_THRESHOLD = 0.25
+DEFAULT_MEMORY_THRESHOLD = 0.25
+
+# Por debajo de esto las diferencias son ruido del reloj / del allocator
+MIN_COMPARABLE_SECONDS = 50e-6
+MIN_COMPARABLE_KIB = 16
+
+GENRE_NAMES = list(GENRE_PROFILES)
+
+
+# --- Entradas sintéticas (deterministas) ---
+
+def make_genre_results(n: int, rng: np.random.Generator) -> Dict:
+    popularity = rng.uniform(5, 90, n)
+    energy = rng.uniform(0.3, 0.95, n)
+    danceability = rng.uniform(0.3, 0.9, n)
+    return {
+        f"genre-{i}": {
+            "avg_popularity": round(float(popularity[i]), 2),
+            "avg_energy": round(float(energy[i]), 3),
+            "avg_danceability": round(float(danceability[i]), 3),
+            "tracks_analyzed": 20
+        }
+        for i in range(n)
+    }
+
+
+def make_tracks(n: int, rng: np.random.Generator) -> Tuple[List[Dict], List[Dict]]:
+    popularity = rng.integers(0, 100, n)
+    features = rng.uniform(0, 1, (n, 3))
+    tempos = rng.uniform(80, 180, n)
+    tracks = [
+        {"id": f"t{i}", "name": f"Track {i}", "artist": f"Artist {i % 97}", "popularity": int(popularity[i])}
+        for i in range(n)
+    ]
+    audio_features = [
+        {"energy": float(features[i, 0]), "danceability": float(features[i, 1]),
+         "valence": float(features[i, 2]), "tempo": float(tempos[i])}
+        for i in range(n)
+    ]
+    return tracks, audio_features
+
+
+def make_artists_data(n: int, rng: np.random.Generator) -> Dict:
+    popularity = rng.integers(0, 100, n)
+    followers = rng.integers(0, 5_000_000, n)
+    values = rng.uniform(0, 1, (n, 4))
+    return {
+        f"Artist {i}": {
+            "popularity": int(popularity[i]),
+            "followers": int(followers[i]),
+            "avg_track_popularity": float(values[i, 0] * 100),
+            "avg_energy": float(values[i, 1]),
+            "avg_danceability": float(values[i, 2]),
+            "consistency_score": float(values[i, 3])
+        }
+        for i in range(n)
+    }
+
+
+def make_estimator_inputs(n: int, rng: np.random.Generator) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    genres = [GENRE_NAMES[i % len(GENRE_NAMES)] if i % 3 else f"unknown-{i}" for i in range(n)]
+    return genres, rng.uniform(5, 90, n), rng.integers(1, 12, n)
+
+
+# --- Benchmarks: nombre -> (preparación(n) -> función sin argumentos) ---
+
+def _services():
+    # Sin BD: solo se llaman métodos de cálculo puro
+    return GenreAnalyzer(db=None), ArtistComparator(db=None)
+
+
+def build_benchmarks() -> Dict[str, Callable[[int], Callable[[], object]]]:
+    analyzer, comparator = _services()
+
+    def generate_genre_comparison(n):
+        results = make_genre_results(n, np.random.default_rng(n))
+        return lambda: analyzer._generate_genre_comparison(results)
+
+    def calculate_metrics(n):
+        tracks, audio_features = make_tracks(n, np.random.default_rng(n))
+        return lambda: analyzer._calculate_metrics(tracks, audio_features, playlist_count=8)
+
+    def perform_comparison(n):
+        artists_data = make_artists_data(n, np.random.default_rng(n))
+        return lambda: comparator._perform_comparison(artists_data)
+
+    def generate_insights(n):
+        artists_data = make_artists_data(n, np.random.default_rng(n))
+        comparison = comparator._perform_comparison(artists_data)
+        return lambda: comparator._generate_insights(artists_data, comparison)
+
+    def estimate_audio_features(n):
+        genres, pops, counts = make_estimator_inputs(n, np.random.default_rng(n))
+        estimate = analyzer._estimate_audio_features
+        return lambda: [estimate(g, float(p), int(c)) for g, p, c in zip(genres, pops, counts)]
+
+    return {
+        "generate_genre_comparison": generate_genre_comparison,
+        "calculate_metrics": calculate_metrics,
+        "perform_comparison": perform_comparison,
+        "generate_insights": generate_insights,
+        "estimate_audio_features": estimate_audio_features,
+    }
+
+
+# --- Medición ---
+
+def measure_time(func: Callable[[], object]) -> Dict:
+    func()  # Calentamiento (cachés, imports perezosos)
+    timings = []
+    total = 0.0
+    while len(timings) < MAX_REPEATS and (total < MIN_MEASURE_SECONDS or len(timings) < 3):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+    return {
+        "time_s_min": min(timings),
+        "time_s_median": statistics.median(timings),
+        "repeats": len(timings)
+    }
+
+
+def measure_memory(func: Callable[[], object]) -> float:
+    """
+    Pico de memoria (KiB) asignada durante una llamada
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def run_benchmarks(sizes: List[int], only: List[str]) -> Dict:
+    results = {}
+    for name, setup in build_benchmarks().items():
+        if only and not any(o in name for o in only):
+            continue
+        for n in sizes:
+            func = setup(n)
+            timing = measure_time(func)
+            peak_kib = measure_memory(func)
+            key = f"{name}[{n}]"
+            results[key] = {**timing, "peak_kib": round(peak_kib, 1)}
+            print(f"⏱️  {key:<42} {timing['time_s_min'] * 1000:>10.3f} ms  {peak_kib:>10.1f} KiB  (x{timing['repeats']})")
+    return results
+
+
+def find_regressions(current: Dict, baseline: Dict, time_threshold: float, memory_threshold: float) -> List[str]:
+    regressions = []
+    for key, result in current.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+
+        old_time, new_time = reference["time_s_min"], result["time_s_min"]
+        if max(old_time, new_time) >= MIN_COMPARABLE_SECONDS and new_time > old_time * (1 + time_threshold):
+            regressions.append(
+                f"{key}: tiempo {old_time * 1000:.3f} ms -> {new_time * 1000:.3f} ms "
+                f"({(new_time / old_time - 1) * 100:+.0f}%)"
+            )
+
+        old_peak, new_peak = reference["peak_kib"], result["peak_kib"]
+        if max(old_peak, new_peak) >= MIN_COMPARABLE_KIB and new_peak > old_peak * (1 + memory_threshold):
+            regressions.append(
+                f"{key}: memoria {old_peak:.1f} KiB -> {new_peak:.1f} KiB "
+                f"({(new_peak / old_peak - 1) * 100:+.0f}%)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de las funciones de análisis")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Tamaños de entrada")
+    parser.add_argument("--only", default="", help="Filtrar benchmarks por nombre (separados por coma)")
+    parser.add_argument("--output", default=None, help="Guardar resultados en JSON")
+    parser.add_argument("--baseline", default=None, help="JSON de referencia para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_TIME_THRESHOLD, help="Regresión de tiempo tolerada")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD, help="Regresión de memoria tolerada")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    only = [o.strip() for o in args.only.split(",") if o.strip()]
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": run_benchmarks(sizes, only)
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Resultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = find_regressions(report["results"], baseline, args.threshold, args.memory_threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regresiones respecto a {args.baseline}:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print(f"✅ Sin regresiones respecto a {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
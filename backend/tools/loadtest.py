@@ -0,0 +1,319 @@
+"""
+Test de carga end-to-end de los endpoints de la API
+
+Lanza una mezcla configurable de peticiones con N workers concurrentes y guarda
+un informe JSON (throughput, latencias p50/p95/p99, tasa de error y llamadas a
+Spotify por petición) para comparar versiones.
+
+Uso (desde backend/):
+    # Todo local: levanta el stand-in de Spotify y la API con SQLite
+    python -m tools.loadtest --spawn --concurrency 8 --duration 60 --output results.json
+
+    # Contra una API ya levantada (apuntando a tools/spotify_stub.py)
+    python -m tools.loadtest --base-url http://localhost:8000 --stub-url http://localhost:8090 \\
+        --mix genres_analyze=3,artists_vs=2,genres_underground=1
+
+    # Comparar con una ejecución anterior
+    python -m tools.loadtest --spawn --compare results_v1.json
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+GENRES = ["breakbeat", "techno", "house", "dubstep", "drum-and-bass", "electronic", "psytrance", "darkwave"]
+ARTISTS = ["Stanton Warriors", "Plump DJs", "Freestylers", "Krafty Kuts", "The Chemical Brothers",
+           "The Prodigy", "Fatboy Slim", "Aphex Twin", "Bonobo", "Burial"]
+
+# Escenario -> función (rng) que devuelve (ruta, query params)
+SCENARIOS: Dict[str, Callable[[random.Random], Tuple[str, Dict]]] = {
+    "genres_analyze": lambda rng: (f"/api/genres/analyze/{rng.choice(GENRES)}", {}),
+    "genres_analyze_adaptive": lambda rng: (f"/api/genres/analyze/{rng.choice(GENRES)}", {"adaptive": "true"}),
+    "genres_compare": lambda rng: ("/api/genres/compare", dict(zip(("genre1", "genre2"), rng.sample(GENRES, 2)))),
+    "genres_underground": lambda rng: ("/api/genres/underground", {}),
+    "genres_trending": lambda rng: ("/api/genres/trending", {}),
+    "artists_search": lambda rng: ("/api/artists/search", {"name": rng.choice(ARTISTS)}),
+    "artists_analyze": lambda rng: (f"/api/artists/analyze/{rng.choice(ARTISTS)}", {}),
+    "artists_vs": lambda rng: ("/api/artists/vs", dict(zip(("artist1", "artist2"), rng.sample(ARTISTS, 2)))),
+    "artists_compare": lambda rng: ("/api/artists/compare", {"artists": ",".join(rng.sample(ARTISTS, 3))}),
+}
+
+DEFAULT_MIX = "genres_analyze=3,artists_vs=2,artists_search=2,genres_underground=1"
+
+REQUEST_TIMEOUT = 120
+MAX_ERROR_SAMPLES = 10
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """
+    "genres_analyze=3,artists_vs=1" (o ruta a un JSON con el mismo dict) -> pesos
+    """
+    if os.path.exists(mix):
+        with open(mix) as f:
+            weights = json.load(f)
+    else:
+        weights = {}
+        for part in filter(None, mix.split(",")):
+            name, _, weight = part.partition("=")
+            weights[name.strip()] = float(weight or 1)
+
+    unknown = set(weights) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Escenarios desconocidos: {', '.join(sorted(unknown))} (disponibles: {', '.join(SCENARIOS)})")
+    return weights
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 1),
+        "p95": round(float(p95), 1),
+        "p99": round(float(p99), 1),
+        "mean": round(float(values.mean()), 1),
+        "max": round(float(values.max()), 1)
+    }
+
+
+class SpotifyCallCounter:
+    """
+    Llamadas a Spotify durante el test: del stand-in (/_stub/stats) o,
+    si no hay stand-in, de las métricas Prometheus de la API
+    """
+
+    def __init__(self, base_url: str, stub_url: Optional[str]):
+        self.base_url = base_url
+        self.stub_url = stub_url
+        self.start = self._read()
+
+    def _read(self) -> Optional[float]:
+        try:
+            if self.stub_url:
+                return float(requests.get(f"{self.stub_url}/_stub/stats", timeout=5).json()["total_calls"])
+            text = requests.get(f"{self.base_url}/metrics", timeout=5).text
+            return sum(float(v) for v in re.findall(r"^spotify_requests_total\{.*\} (\S+)$", text, re.M))
+        except (requests.RequestException, ValueError, KeyError):
+            return None
+
+    def delta(self) -> Optional[float]:
+        end = self._read()
+        if self.start is None or end is None:
+            return None
+        return end - self.start
+
+
+def run_load(base_url: str, weights: Dict[str, float], concurrency: int,
+             duration: Optional[float], total_requests: Optional[int],
+             seed: int, bust_cache: bool) -> Dict:
+    names = list(weights)
+    probabilities = np.array([weights[n] for n in names], dtype=float)
+    probabilities /= probabilities.sum()
+
+    results: List[Tuple[str, float, bool]] = []
+    error_samples: List[Dict] = []
+    lock = threading.Lock()
+    counter = itertools.count()
+    deadline = time.monotonic() + duration if duration else None
+
+    def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        np_rng = np.random.default_rng(seed * 1000 + worker_id)
+
+        while True:
+            n = next(counter)
+            if total_requests is not None and n >= total_requests:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+
+            scenario = names[np_rng.choice(len(names), p=probabilities)]
+            path, params = SCENARIOS[scenario](rng)
+            if bust_cache:
+                params["_lt"] = n
+
+            start = time.perf_counter()
+            try:
+                # Conexión nueva por petición: con esperas largas el keep-alive
+                # de uvicorn (5s) cierra las conexiones ociosas y falsea errores
+                response = requests.get(f"{base_url}{path}", params=params, timeout=REQUEST_TIMEOUT)
+                ok = response.status_code < 400 and not _is_error_body(response)
+                detail = f"{response.status_code} {response.text[:200]}"
+            except requests.RequestException as e:
+                ok = False
+                detail = f"{type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - start
+
+            with lock:
+                results.append((scenario, elapsed, ok))
+                if not ok and len(error_samples) < MAX_ERROR_SAMPLES:
+                    error_samples.append({"scenario": scenario, "path": path, "detail": detail})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for worker_id in range(concurrency):
+            pool.submit(worker, worker_id)
+    wall_time = time.perf_counter() - started
+
+    report = {"duration_s": round(wall_time, 2), **_summarize(results, wall_time), "endpoints": {}}
+    for scenario in names:
+        subset = [r for r in results if r[0] == scenario]
+        if subset:
+            report["endpoints"][scenario] = _summarize(subset, wall_time)
+    report["error_samples"] = error_samples
+    return report
+
+
+def _is_error_body(response: requests.Response) -> bool:
+    # Algunos análisis devuelven 200 con {"data": {"error": ...}}
+    try:
+        data = response.json().get("data")
+    except (ValueError, AttributeError):
+        return False
+    return isinstance(data, dict) and "error" in data
+
+
+def _summarize(results: List[Tuple[str, float, bool]], wall_time: float) -> Dict:
+    errors = sum(1 for _, _, ok in results if not ok)
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "throughput_rps": round(len(results) / wall_time, 3) if wall_time else 0.0,
+        "latency_ms": latency_summary([elapsed for _, elapsed, _ in results])
+    }
+
+
+def _wait_until_up(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=2)
+            return
+        except requests.RequestException:
+            time.sleep(0.3)
+    raise SystemExit(f"❌ {url} no responde tras {timeout}s")
+
+
+def spawn_stack(args) -> List[subprocess.Popen]:
+    """
+    Levanta el stand-in de Spotify y la API (uvicorn) con una base de datos local
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}"
+
+    stub_env = dict(os.environ, STUB_LATENCY_MS=str(args.stub_latency_ms),
+                    STUB_RATE_LIMIT_RATE=str(args.stub_rate_limit_rate), STUB_ERROR_RATE=str(args.stub_error_rate))
+    api_env = dict(os.environ, DATABASE_URL=database_url,
+                   SPOTIFY_API_BASE_URL=f"{stub_url}/v1/", SPOTIFY_ACCOUNTS_URL=stub_url,
+                   SPOTIFY_CLIENT_ID="stub", SPOTIFY_CLIENT_SECRET="stub")
+
+    uvicorn = [sys.executable, "-m", "uvicorn", "--log-level", "warning"]
+    processes = [
+        subprocess.Popen(uvicorn + ["tools.spotify_stub:app", "--port", str(args.stub_port)], cwd=backend_dir, env=stub_env),
+        subprocess.Popen(uvicorn + ["app.main:app", "--port", str(args.api_port)], cwd=backend_dir, env=api_env),
+    ]
+    _wait_until_up(f"{stub_url}/_stub/stats")
+    _wait_until_up(f"http://127.0.0.1:{args.api_port}/")
+
+    args.base_url = f"http://127.0.0.1:{args.api_port}"
+    args.stub_url = stub_url
+    print(f"🚀 Stand-in en {stub_url}, API en {args.base_url} ({database_url})")
+    return processes
+
+
+def compare_reports(current: Dict, baseline: Dict) -> List[str]:
+    lines = []
+    for label, path in (("throughput_rps", ("throughput_rps",)), ("p50 ms", ("latency_ms", "p50")),
+                        ("p95 ms", ("latency_ms", "p95")), ("p99 ms", ("latency_ms", "p99")),
+                        ("error_rate", ("error_rate",)), ("spotify/req", ("spotify_calls_per_request",))):
+        old, new = baseline, current
+        for key in path:
+            old = (old or {}).get(key)
+            new = (new or {}).get(key)
+        if old is None or new is None:
+            continue
+        change = f" ({(new - old) / old * 100:+.1f}%)" if old else ""
+        lines.append(f"  {label:<15} {old:>10} -> {new:<10}{change}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de carga de la API de Spotify Analytics")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="URL de la API")
+    parser.add_argument("--stub-url", default=None, help="URL del stand-in de Spotify (para contar llamadas)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pesos por escenario (a=3,b=1) o ruta a un JSON")
+    parser.add_argument("--concurrency", type=int, default=4, help="Peticiones concurrentes")
+    parser.add_argument("--duration", type=float, default=30, help="Segundos de carga (si no se usa --requests)")
+    parser.add_argument("--requests", type=int, default=None, help="Número total de peticiones")
+    parser.add_argument("--bust-cache", action="store_true", help="Evita la caché HTTP con un parámetro único")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default=None, help="Etiqueta de la versión probada")
+    parser.add_argument("--output", default=None, help="Fichero JSON de resultados")
+    parser.add_argument("--compare", default=None, help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--spawn", action="store_true", help="Levantar stand-in + API locales")
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--stub-port", type=int, default=8766)
+    parser.add_argument("--database-url", default=None, help="Base de datos para --spawn (por defecto SQLite temporal)")
+    parser.add_argument("--stub-latency-ms", type=float, default=50)
+    parser.add_argument("--stub-rate-limit-rate", type=float, default=0)
+    parser.add_argument("--stub-error-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    processes = spawn_stack(args) if args.spawn else []
+
+    try:
+        spotify_calls = SpotifyCallCounter(args.base_url, args.stub_url)
+        print(f"🔥 Carga: {weights} · {args.concurrency} workers · "
+              f"{f'{args.requests} peticiones' if args.requests else f'{args.duration}s'}")
+
+        report = run_load(args.base_url, weights, args.concurrency,
+                          None if args.requests else args.duration, args.requests,
+                          args.seed, args.bust_cache)
+
+        calls = spotify_calls.delta()
+        report = {
+            "label": args.label,
+            "timestamp": datetime.utcnow().isoformat(),
+            "config": {"mix": weights, "concurrency": args.concurrency, "duration": args.duration,
+                       "requests": args.requests, "bust_cache": args.bust_cache, "seed": args.seed},
+            **report,
+            "spotify_calls": calls,
+            "spotify_calls_per_request": round(calls / report["requests"], 3) if calls is not None and report["requests"] else None
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"📊 Comparación con {baseline.get('label') or args.compare}:")
+        print("\n".join(compare_reports(report, baseline)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+"""
+Stand-in local de la API de Spotify para tests offline y benchmarks
+
+Sirve respuestas sintéticas (deterministas) o grabadas para los endpoints que usa
+el backend: token, búsqueda, playlists, tracks de playlist, artistas, top tracks,
+álbumes y audio features. Permite inyectar latencia, 429 y errores 5xx.
+
+Uso (desde backend/):
+    uvicorn tools.spotify_stub:app --port 8090
+
+    # Apuntar el backend al stand-in (cualquier client id/secret vale)
+    SPOTIFY_API_BASE_URL=http://localhost:8090/v1/
+    SPOTIFY_ACCOUNTS_URL=http://localhost:8090
+    SPOTIFY_CLIENT_ID=stub SPOTIFY_CLIENT_SECRET=stub
+
+Configuración (variables de entorno, o POST /_stub/config en caliente):
+    STUB_MODE            synthetic | record | replay (por defecto synthetic)
+    STUB_CASSETTE        Fichero JSON de grabación (record/replay)
+    STUB_UPSTREAM        API real para record (https://api.spotify.com)
+    STUB_ACCOUNTS        Servidor de cuentas real para record (https://accounts.spotify.com)
+    STUB_LATENCY_MS      Latencia media añadida por petición
+    STUB_JITTER_MS       Variación uniforme (+/-) sobre la latencia
+    STUB_RATE_LIMIT_RATE Probabilidad de responder 429
+    STUB_RETRY_AFTER     Segundos de Retry-After en los 429
+    STUB_ERROR_RATE      Probabilidad de responder 500/503
+    STUB_AUDIO_FEATURES  ok | forbidden (forbidden imita Development Mode: 403)
+    STUB_SEED            Semilla de la inyección de fallos
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+import requests
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+
+BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+# Tamaños del catálogo sintético
+SEARCH_TOTAL = 200
+PLAYLIST_TRACKS_RANGE = (10, 120)
+ALBUMS_RANGE = (0, 25)
+TOP_TRACKS = 10
+
+GENRE_WORDS = ["breakbeat", "techno", "house", "dubstep", "ambient", "electro", "jungle", "garage"]
+PLAYLIST_FLAVOURS = ["Essentials", "Underground", "Classics", "Fresh Finds", "Mix", "Deep Cuts", "Radio", "Rollers"]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class StubConfig:
+    def __init__(self):
+        self.mode = os.getenv("STUB_MODE", "synthetic")
+        self.cassette = os.getenv("STUB_CASSETTE", "spotify_cassette.json")
+        self.upstream = os.getenv("STUB_UPSTREAM", "https://api.spotify.com").rstrip("/")
+        self.accounts = os.getenv("STUB_ACCOUNTS", "https://accounts.spotify.com").rstrip("/")
+        self.latency_ms = _env_float("STUB_LATENCY_MS", 0)
+        self.jitter_ms = _env_float("STUB_JITTER_MS", 0)
+        self.rate_limit_rate = _env_float("STUB_RATE_LIMIT_RATE", 0)
+        self.retry_after = _env_float("STUB_RETRY_AFTER", 1)
+        self.error_rate = _env_float("STUB_ERROR_RATE", 0)
+        self.audio_features = os.getenv("STUB_AUDIO_FEATURES", "ok")
+        self.seed = int(_env_float("STUB_SEED", 0))
+
+    def as_dict(self) -> Dict:
+        return dict(vars(self))
+
+    def update(self, values: Dict):
+        for key, value in values.items():
+            if hasattr(self, key):
+                setattr(self, key, type(getattr(self, key))(value))
+
+
+class StubStats:
+    """
+    Llamadas recibidas por endpoint y respuestas inyectadas
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls: Dict[str, int] = {}
+            self.injected = {"rate_limited": 0, "errors": 0}
+
+    def record(self, endpoint: str, injected: Optional[str] = None):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            if injected:
+                self.injected[injected] += 1
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "total_calls": sum(self.calls.values()),
+                "calls": dict(self.calls),
+                "injected": dict(self.injected)
+            }
+
+
+class Cassette:
+    """
+    Respuestas grabadas, indexadas por método + ruta + query ordenada
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(method: str, path: str, params: Dict) -> str:
+        return f"{method} {path}?{urlencode(sorted(params.items()))}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.entries.get(key)
+
+    def put(self, key: str, status: int, body):
+        with self._lock:
+            self.entries[key] = {"status": status, "body": body}
+            with open(self.path, "w") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+
+
+config = StubConfig()
+stats = StubStats()
+_cassette: Optional[Cassette] = None
+_fault_rng = random.Random(config.seed)
+
+app = FastAPI(title="Spotify API stand-in", docs_url="/_stub/docs")
+
+
+def get_cassette() -> Cassette:
+    global _cassette
+    if _cassette is None or _cassette.path != config.cassette:
+        _cassette = Cassette(config.cassette)
+    return _cassette
+
+
+# --- Datos sintéticos deterministas ---
+
+def _rng(*parts) -> random.Random:
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, "big"))
+
+
+def spotify_id(*parts) -> str:
+    """ID base62 de 22 caracteres, estable para las mismas entradas"""
+    number = int.from_bytes(hashlib.blake2b("|".join(str(p) for p in parts).encode(), digest_size=17).digest(), "big")
+    chars = []
+    for _ in range(22):
+        number, index = divmod(number, 62)
+        chars.append(BASE62[index])
+    return "".join(chars)
+
+
+def _clean_query(q: str) -> str:
+    # "genre:breakbeat" / "breakbeat playlist" -> "breakbeat ..."
+    return " ".join(part.split(":")[-1] for part in q.split()).strip() or "music"
+
+
+def synthetic_artist(artist_id: str, name: Optional[str] = None, genre: Optional[str] = None) -> Dict:
+    rng = _rng("artist", artist_id)
+    popularity = rng.randint(5, 90)
+    return {
+        "id": artist_id,
+        "name": name or f"Artist {artist_id[:6]}",
+        "type": "artist",
+        "popularity": popularity,
+        "followers": {"href": None, "total": int(popularity ** 2.6 * rng.uniform(0.5, 2.0))},
+        "genres": [genre] if genre else rng.sample(GENRE_WORDS, 2),
+        "images": [{"url": f"https://i.scdn.co/image/{artist_id}", "height": 640, "width": 640}],
+        "uri": f"spotify:artist:{artist_id}"
+    }
+
+
+def synthetic_track(track_id: str, artist_id: Optional[str] = None) -> Dict:
+    rng = _rng("track", track_id)
+    artist_id = artist_id or spotify_id("track-artist", track_id)
+    album_id = spotify_id("album", track_id)
+    return {
+        "id": track_id,
+        "name": f"Track {track_id[:6]}",
+        "type": "track",
+        "popularity": rng.randint(0, 85),
+        "duration_ms": rng.randint(150000, 420000),
+        "artists": [{"id": artist_id, "name": f"Artist {artist_id[:6]}", "type": "artist"}],
+        "album": {"id": album_id, "name": f"Album {album_id[:6]}", "type": "album"},
+        "uri": f"spotify:track:{track_id}"
+    }
+
+
+def synthetic_playlist(playlist_id: str, name: Optional[str] = None) -> Dict:
+    rng = _rng("playlist", playlist_id)
+    total = rng.randint(*PLAYLIST_TRACKS_RANGE)
+    return {
+        "id": playlist_id,
+        "name": name or f"Playlist {playlist_id[:6]}",
+        "type": "playlist",
+        "snapshot_id": spotify_id("snapshot", playlist_id),
+        "owner": {"id": "stub", "display_name": "Stub"},
+        "tracks": {"total": total}
+    }
+
+
+def synthetic_audio_features(track_id: str) -> Dict:
+    rng = _rng("features", track_id)
+    return {
+        "id": track_id,
+        "energy": round(rng.uniform(0.3, 0.95), 3),
+        "danceability": round(rng.uniform(0.3, 0.9), 3),
+        "valence": round(rng.uniform(0.1, 0.9), 3),
+        "tempo": round(rng.uniform(80, 175), 3),
+        "acousticness": round(rng.uniform(0.0, 0.6), 3),
+        "instrumentalness": round(rng.uniform(0.0, 0.9), 3),
+        "type": "audio_features"
+    }
+
+
+def _page(request: Request, items: List, total: int, offset: int, limit: int) -> Dict:
+    next_url = None
+    if offset + limit < total:
+        params = dict(request.query_params)
+        params.update(offset=offset + limit, limit=limit)
+        next_url = f"{str(request.base_url).rstrip('/')}{request.url.path}?{urlencode(params)}"
+    return {"items": items, "total": total, "offset": offset, "limit": limit, "next": next_url}
+
+
+def _spotify_error(status: int, message: str, headers: Optional[Dict] = None) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"error": {"status": status, "message": message}}, headers=headers)
+
+
+# --- Latencia, fallos, estadísticas y record/replay ---
+
+@app.middleware("http")
+async def stand_in(request: Request, call_next):
+    # spotipy pide p.ej. /v1/audio-features/?ids=... (sin redirección 307)
+    path = request.url.path
+    if len(path) > 1 and path.endswith("/"):
+        path = request.scope["path"] = path.rstrip("/")
+    if path.startswith("/_stub"):
+        return await call_next(request)
+
+    endpoint = f"{request.method} " + "/".join("{id}" if len(s) == 22 else s for s in path.split("/"))
+
+    delay = config.latency_ms + _fault_rng.uniform(-config.jitter_ms, config.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    if path.startswith("/v1/"):
+        roll = _fault_rng.random()
+        if roll < config.rate_limit_rate:
+            stats.record(endpoint, "rate_limited")
+            return _spotify_error(429, "API rate limit exceeded", {"Retry-After": str(int(config.retry_after))})
+        if roll < config.rate_limit_rate + config.error_rate:
+            stats.record(endpoint, "errors")
+            return _spotify_error(_fault_rng.choice([500, 503]), "Injected server error")
+
+    stats.record(endpoint)
+
+    if config.mode == "record":
+        return await _record(request)
+    if config.mode == "replay" and path.startswith("/v1/"):
+        entry = get_cassette().get(Cassette.key(request.method, path, dict(request.query_params)))
+        if entry is None:
+            return _spotify_error(404, f"Not recorded: {endpoint}")
+        body = json.dumps(entry["body"]).replace(f"{config.upstream}/v1/", f"{str(request.base_url)}v1/")
+        return JSONResponse(status_code=entry["status"], content=json.loads(body))
+
+    return await call_next(request)
+
+
+async def _record(request: Request) -> JSONResponse:
+    """
+    Reenvía la petición a Spotify y graba la respuesta (el token no se graba)
+    """
+    path = request.url.path
+    upstream = config.accounts if path.startswith("/api/token") else config.upstream
+    headers = {k: v for k, v in request.headers.items() if k.lower() in ("authorization", "content-type")}
+    body = await request.body()
+
+    response = await asyncio.to_thread(
+        requests.request, request.method, f"{upstream}{path}",
+        params=dict(request.query_params), data=body or None, headers=headers, timeout=30
+    )
+    try:
+        payload = response.json()
+    except ValueError:
+        payload = None
+
+    if path.startswith("/v1/"):
+        get_cassette().put(Cassette.key(request.method, path, dict(request.query_params)), response.status_code, payload)
+
+    forward = {k: v for k, v in response.headers.items() if k.lower() == "retry-after"}
+    return JSONResponse(status_code=response.status_code, content=payload, headers=forward)
+
+
+# --- Cuentas ---
+
+@app.post("/api/token")
+async def token():
+    return {"access_token": "stub-access-token", "token_type": "Bearer", "expires_in": 3600,
+            "refresh_token": "stub-refresh-token", "scope": "user-library-read user-top-read"}
+
+
+@app.get("/authorize")
+async def authorize(redirect_uri: str, state: Optional[str] = None):
+    params = {"code": "stub-code"}
+    if state:
+        params["state"] = state
+    return RedirectResponse(f"{redirect_uri}?{urlencode(params)}")
+
+
+# --- API ---
+
+@app.get("/v1/me")
+async def me():
+    return {"id": "stub-user", "display_name": "Stub User", "country": "ES", "product": "premium",
+            "type": "user", "uri": "spotify:user:stub-user"}
+
+
+@app.get("/v1/search")
+async def search(request: Request, q: str, type: str = "track", limit: int = 10, offset: int = 0):
+    query = _clean_query(q)
+    results = {}
+    count = max(0, min(limit, SEARCH_TOTAL - offset))
+
+    for kind in type.split(","):
+        ids = [spotify_id(kind, query.lower(), offset + i) for i in range(count)]
+        if kind == "artist":
+            # El primer resultado es el artista buscado
+            items = [
+                synthetic_artist(spotify_id("artist", query.lower()) if offset + i == 0 else item_id,
+                                 name=query.title() if offset + i == 0 else None)
+                for i, item_id in enumerate(ids)
+            ]
+        elif kind == "playlist":
+            items = [
+                synthetic_playlist(item_id, name=f"{query.title()} {PLAYLIST_FLAVOURS[(offset + i) % len(PLAYLIST_FLAVOURS)]}")
+                for i, item_id in enumerate(ids)
+            ]
+        else:
+            items = [synthetic_track(item_id) for item_id in ids]
+        results[f"{kind}s"] = _page(request, items, SEARCH_TOTAL, offset, limit)
+
+    return results
+
+
+@app.get("/v1/playlists/{playlist_id}")
+async def playlist(playlist_id: str):
+    return synthetic_playlist(playlist_id)
+
+
+@app.get("/v1/playlists/{playlist_id}/tracks")
+async def playlist_tracks(request: Request, playlist_id: str, limit: int = 100, offset: int = 0):
+    total = synthetic_playlist(playlist_id)["tracks"]["total"]
+    count = max(0, min(limit, total - offset))
+    items = [
+        {"added_at": "2024-01-01T00:00:00Z", "track": synthetic_track(spotify_id("pl-track", playlist_id, offset + i))}
+        for i in range(count)
+    ]
+    return _page(request, items, total, offset, limit)
+
+
+@app.get("/v1/artists/{artist_id}")
+async def artist(artist_id: str):
+    return synthetic_artist(artist_id)
+
+
+@app.get("/v1/artists/{artist_id}/top-tracks")
+async def artist_top_tracks(artist_id: str):
+    return {"tracks": [synthetic_track(spotify_id("top", artist_id, i), artist_id) for i in range(TOP_TRACKS)]}
+
+
+@app.get("/v1/artists/{artist_id}/albums")
+async def artist_albums(request: Request, artist_id: str, limit: int = 20, offset: int = 0):
+    total = _rng("albums", artist_id).randint(*ALBUMS_RANGE)
+    count = max(0, min(limit, total - offset))
+    items = []
+    for i in range(count):
+        album_id = spotify_id("artist-album", artist_id, offset + i)
+        items.append({"id": album_id, "name": f"Album {album_id[:6]}", "album_type": "album", "type": "album",
+                      "release_date": f"{2000 + (offset + i) % 25}-01-01"})
+    return _page(request, items, total, offset, limit)
+
+
+@app.get("/v1/audio-features")
+async def audio_features(ids: str):
+    if config.audio_features == "forbidden":
+        return _spotify_error(403, "Forbidden")
+    return {"audio_features": [synthetic_audio_features(track_id) for track_id in ids.split(",") if track_id]}
+
+
+# --- Control del stand-in ---
+
+@app.get("/_stub/stats")
+async def get_stats():
+    return stats.as_dict()
+
+
+@app.post("/_stub/reset")
+async def reset_stats():
+    stats.reset()
+    return stats.as_dict()
+
+
+@app.get("/_stub/config")
+async def get_config():
+    return config.as_dict()
+
+
+@app.post("/_stub/config")
+async def update_config(request: Request):
+    config.update(await request.json())
+    return config.as_dict()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("STUB_PORT", 8090)))
@@ -0,0 +1,386 @@
+"""
+Generador de catálogo sintético para pruebas de escala (almacenamiento y analítica)
+
+Genera artistas, playlists por género con sus tracks y audio features, y años de
+historial de ArtistSnapshot / GenreSnapshot con distribuciones realistas
+(popularidad sesgada hacia el underground, seguidores log-normales correlacionados,
+géneros con reparto Zipf, paseos aleatorios y estacionalidad).
+
+Es determinista: los mismos parámetros, semilla y --end-date dan los mismos datos.
+En PostgreSQL carga con COPY (psycopg2 copy_expert); en otros motores usa executemany.
+
+Uso (desde backend/):
+    python -m tools.synthetic_catalog --artists 1000000 --days 1095 --end-date 2025-01-01
+    python -m tools.synthetic_catalog --artists 5000 --days 90 --database-url sqlite:///scale.db
+    python -m tools.synthetic_catalog --dry-run   # solo muestra cuántas filas generaría
+"""
+import argparse
+import csv
+import io
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from app.models.artist import Base as ArtistBase, Artist, ArtistAlias, ArtistGenre, ArtistSnapshot
+from app.models.genre import Base as GenreBase, GenreSnapshot, GenrePlaylist
+from app.services.feature_estimator import FEATURE_NAMES, GENRE_PROFILES, DEFAULT_PROFILE
+from app.services.genre_catalog import genre_rows
+
+BASE62 = np.array(list("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"))
+
+# Filas generadas por bloque (acota la memoria con millones de artistas)
+CHUNK_SIZE = 20_000
+INSERT_BATCH_SIZE = 5_000
+
+GENRE_SUFFIXES = ["", "-revival", "-fusion", "-core", "-wave", "-step", "-tech", "-minimal", "-dark", "-lofi"]
+NAME_PARTS = ["Neon", "Echo", "Static", "Velvet", "Broken", "Hollow", "Solar", "Rogue", "Lunar", "Acid",
+              "Crystal", "Ghost", "Electric", "Midnight", "Concrete", "Silver", "Analog", "Distant", "Urban", "Wild"]
+NAME_NOUNS = ["Circuit", "Garden", "Signal", "Tribe", "Machine", "Theory", "Collective", "District",
+              "Frequency", "Society", "Pulse", "Ritual", "Avenue", "Assembly", "Method", "Kids"]
+
+# Columnas cargadas por tabla (los IDs autoincrementales los asigna la BD)
+ARTIST_COLUMNS = ("id", "name", "popularity", "followers", "genres", "created_at", "updated_at")
+ARTIST_GENRE_COLUMNS = ("artist_id", "genre", "popularity")
+ARTIST_SNAPSHOT_COLUMNS = ("artist_id", "date", "popularity", "followers", "avg_energy", "avg_danceability",
+                           "avg_valence", "avg_tempo", "consistency_score", "avg_track_popularity")
+GENRE_SNAPSHOT_COLUMNS = ("genre", "date", "avg_popularity", "tracks_analyzed", "playlist_presence",
+                          "avg_energy", "avg_danceability", "avg_valence", "avg_tempo", "top_artists")
+GENRE_PLAYLIST_COLUMNS = ("genre", "playlist_id", "name", "track_count", "snapshot_id", "tracks",
+                          "tracks_scanned", "discovered_at", "tracks_fetched_at")
+
+
+def spotify_ids(rng: np.random.Generator, n: int) -> np.ndarray:
+    """IDs base62 de 22 caracteres (como los de Spotify)"""
+    chars = BASE62[rng.integers(0, 62, (n, 22))]
+    return np.ascontiguousarray(chars).view("<U22").ravel()
+
+
+def genre_names(count: int) -> List[str]:
+    base = list(GENRE_PROFILES)
+    names = []
+    for suffix in GENRE_SUFFIXES:
+        for genre in base:
+            names.append(f"{genre}{suffix}")
+            if len(names) == count:
+                return names
+    return names + [f"genre-{i}" for i in range(len(names), count)]
+
+
+def genre_profile_matrix(genres: Sequence[str]) -> np.ndarray:
+    profiles = []
+    for genre in genres:
+        base = next((GENRE_PROFILES[g] for g in GENRE_PROFILES if genre.startswith(g)), DEFAULT_PROFILE)
+        profiles.append([base[f] for f in FEATURE_NAMES])
+    return np.array(profiles, dtype=float)
+
+
+class CatalogGenerator:
+    """
+    Genera el catálogo por bloques a partir de una única semilla
+    """
+
+    def __init__(self, artists: int, genres: int, days: int, end_date: datetime,
+                 artist_snapshot_every: int, genre_snapshot_every: int,
+                 playlists_per_genre: int, tracks_per_playlist: int, seed: int):
+        self.n_artists = artists
+        self.days = days
+        self.end_date = end_date
+        self.start_date = end_date - timedelta(days=days)
+        self.artist_snapshot_every = artist_snapshot_every
+        self.genre_snapshot_every = genre_snapshot_every
+        self.playlists_per_genre = playlists_per_genre
+        self.tracks_per_playlist = tracks_per_playlist
+        self.seed = seed
+
+        self.genres = genre_names(genres)
+        self.profiles = genre_profile_matrix(self.genres)
+        # Reparto Zipf: pocos géneros concentran la mayoría de artistas
+        weights = 1.0 / np.arange(1, len(self.genres) + 1) ** 1.1
+        self.genre_weights = weights / weights.sum()
+
+        # Acumuladores por género para snapshots y playlists
+        self.genre_artist_count = np.zeros(len(self.genres), dtype=np.int64)
+        self.genre_popularity_sum = np.zeros(len(self.genres))
+        self.genre_top_artists: List[List[Tuple[float, str]]] = [[] for _ in self.genres]
+        self.genre_sample_artists: List[List[str]] = [[] for _ in self.genres]
+
+    def _rng(self, *stream: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, *stream])
+
+    def expected_rows(self) -> Dict[str, int]:
+        artist_snapshots = self.n_artists * (self.days // self.artist_snapshot_every + 1)
+        return {
+            "artists": self.n_artists,
+            "artist_genres": int(self.n_artists * 1.5),  # 1-3 géneros por artista (sin repetir)
+            "artist_snapshots": int(artist_snapshots * 0.75),  # Los artistas se incorporan a lo largo del periodo
+            "genre_snapshots": len(self.genres) * (self.days // self.genre_snapshot_every + 1),
+            "genre_playlists": len(self.genres) * self.playlists_per_genre,
+            "tracks_in_playlists": len(self.genres) * self.playlists_per_genre * self.tracks_per_playlist
+        }
+
+    # --- Artistas e historial ---
+
+    def artist_chunks(self) -> Iterator[Tuple[List[tuple], List[tuple]]]:
+        for chunk_index, start in enumerate(range(0, self.n_artists, CHUNK_SIZE)):
+            n = min(CHUNK_SIZE, self.n_artists - start)
+            yield self._artist_chunk(self._rng(1, chunk_index), n)
+
+    def _artist_chunk(self, rng: np.random.Generator, n: int) -> Tuple[List[tuple], List[tuple]]:
+        ids = spotify_ids(rng, n)
+        names = [
+            f"{NAME_PARTS[a]} {NAME_NOUNS[b]}" + (f" {c}" if c else "")
+            for a, b, c in zip(rng.integers(0, len(NAME_PARTS), n), rng.integers(0, len(NAME_NOUNS), n),
+                               rng.integers(0, 1000, n))
+        ]
+
+        # Popularidad sesgada hacia valores bajos (larga cola underground)
+        popularity = np.clip(rng.beta(2.0, 5.0, n) * 100, 0, 100)
+        followers = np.exp(4.0 + popularity * 0.11 + rng.normal(0, 1.2, n)).astype(np.int64)
+
+        # 1-3 géneros por artista, el primero marca el perfil de audio
+        genre_counts = rng.choice([1, 2, 3], n, p=[0.5, 0.35, 0.15])
+        genre_matrix = rng.choice(len(self.genres), (n, 3), p=self.genre_weights)
+        primary = genre_matrix[:, 0]
+        features = self.profiles[primary] + rng.normal(0, 1, (n, len(FEATURE_NAMES))) * [0.08, 0.08, 0.1, 8, 0.1, 0.1]
+        consistency = np.clip(rng.beta(5, 2, n), 0, 1)
+
+        # Alta escalonada a lo largo del periodo (25% ya existían al inicio)
+        joined_day = np.where(rng.random(n) < 0.25, 0, rng.integers(0, max(self.days, 1), n))
+
+        np.add.at(self.genre_artist_count, primary, 1)
+        np.add.at(self.genre_popularity_sum, primary, popularity)
+        self._track_top_artists(primary, popularity, names)
+
+        artists = []
+        for i in range(n):
+            created_at = self.start_date + timedelta(days=int(joined_day[i]))
+            genres = list(dict.fromkeys(self.genres[g] for g in genre_matrix[i, :genre_counts[i]]))
+            artists.append((ids[i], names[i], int(round(popularity[i])), int(followers[i]), genres,
+                            created_at, self.end_date))
+
+        snapshots = self._artist_history(rng, ids, popularity, followers, features, consistency, joined_day)
+        return artists, snapshots
+
+    def _artist_history(self, rng, ids, popularity, followers, features, consistency, joined_day) -> List[tuple]:
+        steps = np.arange(0, self.days + 1, self.artist_snapshot_every)
+        n, t = len(ids), len(steps)
+
+        # Popularidad: paseo aleatorio que termina en el valor actual
+        walk = np.cumsum(rng.normal(0, 1.5, (n, t)), axis=1)
+        pop_history = np.clip(popularity[:, None] + walk - walk[:, -1:], 0, 100)
+        # Seguidores: crecimiento compuesto hasta el valor actual
+        growth = rng.normal(0.004, 0.003, n)[:, None] * self.artist_snapshot_every
+        follower_history = (followers[:, None] * np.exp(-growth * (t - 1 - np.arange(t)))).astype(np.int64)
+        drift = rng.normal(0, 0.01, (n, t))
+        track_popularity = np.clip(pop_history * rng.uniform(0.7, 1.1, n)[:, None], 0, 100)
+
+        rows = []
+        for i in range(n):
+            energy, dance, valence, tempo = features[i, :4]
+            for j in np.nonzero(steps >= joined_day[i])[0]:
+                rows.append((
+                    ids[i], self.start_date + timedelta(days=int(steps[j])),
+                    int(round(pop_history[i, j])), int(follower_history[i, j]),
+                    round(float(np.clip(energy + drift[i, j], 0, 1)), 3),
+                    round(float(np.clip(dance + drift[i, j], 0, 1)), 3),
+                    round(float(np.clip(valence - drift[i, j], 0, 1)), 3),
+                    round(float(np.clip(tempo, 60, 200)), 1),
+                    round(float(consistency[i]), 3),
+                    round(float(track_popularity[i, j]), 2)
+                ))
+        return rows
+
+    def _track_top_artists(self, primary, popularity, names):
+        for g in np.unique(primary):
+            members = np.nonzero(primary == g)[0]
+            top = members[np.argsort(-popularity[members])[:5]]
+            merged = self.genre_top_artists[g] + [(float(popularity[i]), names[i]) for i in top]
+            self.genre_top_artists[g] = sorted(merged, reverse=True)[:5]
+            samples = self.genre_sample_artists[g]
+            if len(samples) < 200:
+                samples.extend(names[i] for i in members[:200 - len(samples)])
+
+    # --- Géneros (se generan después de los artistas) ---
+
+    def genre_snapshot_rows(self) -> Iterator[tuple]:
+        rng = self._rng(2)
+        steps = np.arange(0, self.days + 1, self.genre_snapshot_every)
+        counts = np.maximum(self.genre_artist_count, 1)
+        base_popularity = np.where(self.genre_artist_count > 0, self.genre_popularity_sum / counts, 30.0)
+
+        for g, genre in enumerate(self.genres):
+            # Tendencia + estacionalidad anual + ruido
+            trend = rng.normal(0, 0.01) * steps
+            season = rng.uniform(1, 4) * np.sin(2 * np.pi * (steps + rng.integers(0, 365)) / 365)
+            popularity = np.clip(base_popularity[g] + trend - trend[-1] + season + rng.normal(0, 1.5, len(steps)), 0, 100)
+            features = self.profiles[g, :4] + rng.normal(0, 1, (len(steps), 4)) * [0.02, 0.02, 0.03, 2]
+            presence = rng.integers(1, self.playlists_per_genre + 1, len(steps))
+            top_artists = [name for _, name in self.genre_top_artists[g]]
+
+            for j, step in enumerate(steps):
+                yield (genre, self.start_date + timedelta(days=int(step)), round(float(popularity[j]), 2), 20,
+                       int(presence[j]), round(float(features[j, 0]), 3), round(float(features[j, 1]), 3),
+                       round(float(features[j, 2]), 3), round(float(features[j, 3]), 1), top_artists)
+
+    def genre_playlist_rows(self) -> Iterator[tuple]:
+        """
+        Playlists por género con sus tracks y audio features (no hay tabla de tracks:
+        se guardan en el JSON `tracks` del catálogo de playlists)
+        """
+        for g, genre in enumerate(self.genres):
+            rng = self._rng(3, g)
+            playlist_ids = spotify_ids(rng, self.playlists_per_genre)
+            artists = self.genre_sample_artists[g] or ["Unknown"]
+            base_popularity = self.genre_popularity_sum[g] / max(self.genre_artist_count[g], 1)
+
+            for p in range(self.playlists_per_genre):
+                n = self.tracks_per_playlist
+                track_ids = spotify_ids(rng, n)
+                popularity = np.clip(rng.normal(base_popularity, 15, n), 0, 100).astype(int)
+                features = self.profiles[g] + rng.normal(0, 1, (n, len(FEATURE_NAMES))) * [0.08, 0.08, 0.1, 8, 0.1, 0.1]
+                features = np.clip(features, [0, 0, 0, 60, 0, 0], [1, 1, 1, 200, 1, 1])
+                artist_picks = rng.integers(0, len(artists), n)
+
+                tracks = [
+                    {
+                        "id": track_ids[i],
+                        "name": f"Track {track_ids[i][:6]}",
+                        "popularity": int(popularity[i]),
+                        "artist": artists[artist_picks[i]],
+                        "audio_features": {f: round(float(v), 3) for f, v in zip(FEATURE_NAMES, features[i])}
+                    }
+                    for i in range(n)
+                ]
+                fetched_at = self.end_date - timedelta(days=int(rng.integers(0, 14)))
+                yield (genre, playlist_ids[p], f"{genre.title()} Selection {p + 1}", n + int(rng.integers(0, 200)),
+                       f"snap-{playlist_ids[p][:10]}", tracks, n, fetched_at, fetched_at)
+
+
+class BulkLoader:
+    """
+    Carga masiva: COPY en PostgreSQL, executemany en el resto
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.use_copy = engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
+        self.loaded: Dict[str, int] = {}
+
+    def load(self, table, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+        total = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= (CHUNK_SIZE if self.use_copy else INSERT_BATCH_SIZE):
+                total += self._flush(table, columns, batch)
+                batch = []
+        if batch:
+            total += self._flush(table, columns, batch)
+        self.loaded[table.name] = self.loaded.get(table.name, 0) + total
+        return total
+
+    def _flush(self, table, columns: Sequence[str], rows: List[tuple]) -> int:
+        if self.use_copy:
+            self._copy(table.name, columns, rows)
+        else:
+            with self.engine.begin() as conn:
+                conn.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+        return len(rows)
+
+    def _copy(self, table_name: str, columns: Sequence[str], rows: List[tuple]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                json.dumps(v) if isinstance(v, (list, dict)) else (v.isoformat() if isinstance(v, datetime) else v)
+                for v in row
+            ])
+        buffer.seek(0)
+
+        raw = self.engine.raw_connection()
+        try:
+            with raw.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            raw.commit()
+        finally:
+            raw.close()
+
+
+def artist_genre_rows(artists: List[tuple]) -> Iterator[tuple]:
+    """
+    Filas de artist_genres de un bloque de artistas (las mismas que sincroniza la app)
+    """
+    for artist_id, _, popularity, _, genres, _, _ in artists:
+        for row in genre_rows(artist_id, genres, popularity):
+            yield row["artist_id"], row["genre"], row["popularity"]
+
+
+def truncate(engine):
+    tables = (ArtistSnapshot, ArtistGenre, ArtistAlias, Artist, GenreSnapshot, GenrePlaylist)
+    with engine.begin() as conn:
+        for table in (model.__table__ for model in tables):
+            conn.execute(table.delete())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera y carga un catálogo sintético a escala")
+    parser.add_argument("--artists", type=int, default=100_000)
+    parser.add_argument("--genres", type=int, default=150)
+    parser.add_argument("--days", type=int, default=730, help="Días de historial")
+    parser.add_argument("--end-date", default=None, help="Último día del historial (YYYY-MM-DD, por defecto hoy)")
+    parser.add_argument("--artist-snapshot-every", type=int, default=7, help="Días entre snapshots de artista")
+    parser.add_argument("--genre-snapshot-every", type=int, default=1, help="Días entre snapshots de género")
+    parser.add_argument("--playlists-per-genre", type=int, default=20)
+    parser.add_argument("--tracks-per-playlist", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=None, help="Por defecto, la DATABASE_URL del backend")
+    parser.add_argument("--truncate", action="store_true", help="Vaciar las tablas antes de cargar")
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar el volumen estimado")
+    args = parser.parse_args()
+
+    end_date = (datetime.strptime(args.end_date, "%Y-%m-%d") if args.end_date
+                else datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0))
+    generator = CatalogGenerator(
+        args.artists, args.genres, args.days, end_date, args.artist_snapshot_every,
+        args.genre_snapshot_every, args.playlists_per_genre, args.tracks_per_playlist, args.seed
+    )
+
+    print(f"📦 Volumen estimado: {generator.expected_rows()}")
+    if args.dry_run:
+        return
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        from app.core.database import engine
+    ArtistBase.metadata.create_all(bind=engine)
+    GenreBase.metadata.create_all(bind=engine)
+    if args.truncate:
+        truncate(engine)
+
+    loader = BulkLoader(engine)
+    print(f"🚚 Cargando en {engine.dialect.name} ({'COPY' if loader.use_copy else 'executemany'})")
+    started = time.perf_counter()
+
+    for artists, snapshots in generator.artist_chunks():
+        loader.load(Artist.__table__, ARTIST_COLUMNS, artists)
+        loader.load(ArtistGenre.__table__, ARTIST_GENRE_COLUMNS, artist_genre_rows(artists))
+        loader.load(ArtistSnapshot.__table__, ARTIST_SNAPSHOT_COLUMNS, snapshots)
+        print(f"   👤 {loader.loaded['artists']:,} artistas · {loader.loaded['artist_snapshots']:,} snapshots")
+
+    loader.load(GenreSnapshot.__table__, GENRE_SNAPSHOT_COLUMNS, generator.genre_snapshot_rows())
+    loader.load(GenrePlaylist.__table__, GENRE_PLAYLIST_COLUMNS, generator.genre_playlist_rows())
+
+    elapsed = time.perf_counter() - started
+    total = sum(loader.loaded.values())
+    print(f"✅ {total:,} filas en {elapsed:.1f}s ({total / elapsed:,.0f} filas/s): {loader.loaded}")
+
+
+if __name__ == "__main__":
+    main()